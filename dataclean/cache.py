@@ -0,0 +1,120 @@
+import sys
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+# Python objects of larger columns are measured from this many elements
+NBYTES_SAMPLE_SIZE = 1000
+
+
+def freeze(value):
+    """Convert value into a hashable equivalent, comparing by value"""
+
+    if isinstance(value, dict):
+        return tuple(
+            sorted((key, freeze(item)) for key, item in value.items())
+        )
+    if isinstance(value, (list, tuple)):
+        return tuple(freeze(item) for item in value)
+    if isinstance(value, np.ndarray):
+        return (value.dtype.str, value.shape, hash(value.tobytes()))
+    return value
+
+
+def _object_nbytes(values):
+    """Estimate the memory held by the python objects of values"""
+
+    if not len(values):
+        return 0
+
+    positions = np.linspace(
+        0, len(values) - 1, min(len(values), NBYTES_SAMPLE_SIZE)
+    ).astype(int)
+    sampled = values.take(positions).to_numpy(dtype=object)
+
+    return sum(sys.getsizeof(value) for value in sampled) * (
+        len(values) / len(sampled)
+    )
+
+
+def _holds_objects(values):
+    dtype = values.dtype
+    return dtype == object or (
+        isinstance(dtype, pd.StringDtype) and dtype.storage == "python"
+    )
+
+
+def dataframe_nbytes(dataframe):
+    """
+    Approximate the memory held by the data of a dataframe.
+
+    Unlike a shallow memory_usage, the python objects of object columns are
+    counted, estimated from evenly spaced elements of longer columns rather
+    than measuring every element as a deep memory_usage does.
+    """
+
+    nbytes = dataframe.memory_usage(index=True, deep=False).sum()
+
+    if _holds_objects(dataframe.index):
+        nbytes += _object_nbytes(dataframe.index)
+
+    for i in range(dataframe.shape[1]):
+        column = dataframe.iloc[:, i]
+        if _holds_objects(column):
+            nbytes += _object_nbytes(column)
+
+    return int(nbytes)
+
+
+class PrefixCache(object):
+    """Least recently used cache of dataframes bounded by a byte budget"""
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key, default=None):
+        if key not in self._entries:
+            self.misses += 1
+            return default
+
+        self.hits += 1
+        value, nbytes = self._entries.pop(key)
+        self._entries[key] = (value, nbytes)
+
+        return value
+
+    def put(self, key, value, nbytes):
+        if key in self._entries:
+            self.nbytes -= self._entries.pop(key)[1]
+
+        if nbytes > self.max_bytes:
+            return
+
+        self._entries[key] = (value, nbytes)
+        self.nbytes += nbytes
+
+        while self.nbytes > self.max_bytes:
+            _, (_, evicted_nbytes) = self._entries.popitem(last=False)
+            self.nbytes -= evicted_nbytes
+
+    def clear(self):
+        self._entries.clear()
+        self.nbytes = 0
+
+    def stats(self):
+        """Return the cache counters, e.g. for diagnostics"""
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "entries": len(self._entries),
+            "nbytes": self.nbytes,
+            "max_bytes": self.max_bytes,
+        }
@@ -1,28 +1,34 @@
-from builtins import int
 from enum import Enum
 
-from sklearn.neighbors import KernelDensity
+import numpy as np
+
+from dataclean.kernels import (
+    ABOVE_CUT,
+    BELOW_CUT,
+    IN_RANGE,
+    classify_outliers,
+    cast_values,
+    instance_mask,
+    kde_sample,
+    numeric_mask,
+    python_scalar,
+    scalar_type,
+)
+
+# Most points kept by a fitted KDE, bounding the size of exported code
+KDE_MAX_POINTS = 1000
 
 
 def outlier_removal_mean(dataframe, colname, low_cut, high_cut):
     """Replace outliers with the mean on dataframe[colname]"""
 
     col = dataframe[colname]
+    codes = classify_outliers(col, low_cut, high_cut)
+    is_outlier = (codes == BELOW_CUT) | (codes == ABOVE_CUT)
 
-    col_numerics = col.loc[
-        col.apply(
-            lambda x: isinstance(x, (int, float))
-            and (x >= low_cut and x <= high_cut)
-        )
-    ]
+    col_numerics = col.loc[codes == IN_RANGE]
 
-    dataframe.loc[
-        col.apply(
-            lambda x: isinstance(x, (int, float))
-            and (x < low_cut or x > high_cut)
-        ),
-        colname,
-    ] = col_numerics.mean()
+    dataframe.loc[is_outlier, colname] = col_numerics.mean()
 
     return dataframe
 
@@ -30,15 +36,10 @@ def outlier_removal_mean(dataframe, colname, low_cut, high_cut):
 def outlier_removal_null(dataframe, colname, low_cut, high_cut):
     """Replace outliers with empty values on dataframe[colname]"""
 
-    col = dataframe[colname]
+    codes = classify_outliers(dataframe[colname], low_cut, high_cut)
+    is_outlier = (codes == BELOW_CUT) | (codes == ABOVE_CUT)
 
-    dataframe.loc[
-        col.apply(
-            lambda x: isinstance(x, (int, float))
-            and (x < low_cut or x > high_cut)
-        ),
-        colname,
-    ] = None
+    dataframe.loc[is_outlier, colname] = None
 
     return dataframe
 
@@ -47,21 +48,12 @@ def outlier_removal_median(dataframe, colname, low_cut, high_cut):
     """Replace outliers with the median on dataframe[colname]"""
 
     col = dataframe[colname]
+    codes = classify_outliers(col, low_cut, high_cut)
+    is_outlier = (codes == BELOW_CUT) | (codes == ABOVE_CUT)
 
-    col_numerics = col.loc[
-        col.apply(
-            lambda x: isinstance(x, (int, float))
-            and (x >= low_cut and x <= high_cut)
-        )
-    ]
+    col_numerics = col.loc[codes == IN_RANGE]
 
-    dataframe.loc[
-        col.apply(
-            lambda x: isinstance(x, (int, float))
-            and (x < low_cut or x > high_cut)
-        ),
-        colname,
-    ] = col_numerics.median()
+    dataframe.loc[is_outlier, colname] = col_numerics.median()
 
     return dataframe
 
@@ -70,21 +62,12 @@ def outlier_removal_mode_numeric(dataframe, colname, low_cut, high_cut):
     """Replace outliers with the modal numeric value on dataframe[colname]"""
 
     col = dataframe[colname]
+    codes = classify_outliers(col, low_cut, high_cut)
+    is_outlier = (codes == BELOW_CUT) | (codes == ABOVE_CUT)
 
-    col_numerics = col.loc[
-        col.apply(
-            lambda x: isinstance(x, (int, float))
-            and (x >= low_cut and x <= high_cut)
-        )
-    ]
+    col_numerics = col.loc[codes == IN_RANGE]
 
-    dataframe.loc[
-        col.apply(
-            lambda x: isinstance(x, (int, float))
-            and (x < low_cut or x > high_cut)
-        ),
-        colname,
-    ] = col_numerics.mode().get(0, None)
+    dataframe.loc[is_outlier, colname] = col_numerics.mode().get(0, None)
 
     return dataframe
 
@@ -92,17 +75,11 @@ def outlier_removal_mode_numeric(dataframe, colname, low_cut, high_cut):
 def outlier_removal_nearest_cut(dataframe, colname, low_cut, high_cut):
     """Clip outliers on dataframe[colname]"""
 
-    col = dataframe[colname]
+    codes = classify_outliers(dataframe[colname], low_cut, high_cut)
 
-    dataframe.loc[
-        col.apply(lambda x: isinstance(x, (int, float)) and x < low_cut),
-        colname,
-    ] = low_cut
+    dataframe.loc[codes == BELOW_CUT, colname] = low_cut
 
-    dataframe.loc[
-        col.apply(lambda x: isinstance(x, (int, float)) and x > high_cut),
-        colname,
-    ] = high_cut
+    dataframe.loc[codes == ABOVE_CUT, colname] = high_cut
 
     return dataframe
 
@@ -110,45 +87,30 @@ def outlier_removal_nearest_cut(dataframe, colname, low_cut, high_cut):
 def outlier_removal_drop(dataframe, colname, low_cut, high_cut):
     """Drop rows with outliers on dataframe[colname]"""
 
-    col = dataframe[colname]
+    codes = classify_outliers(dataframe[colname], low_cut, high_cut)
 
-    dataframe = dataframe.loc[
-        col.isnull()
-        | col.apply(
-            lambda x: not isinstance(x, (int, float))
-            or (x >= low_cut and x <= high_cut)
-        ),
-        :,
-    ]
+    dataframe = dataframe.loc[(codes != BELOW_CUT) & (codes != ABOVE_CUT), :]
 
     return dataframe
 
 
-def outlier_removal_sample(dataframe, colname, low_cut, high_cut):
+def outlier_removal_sample(
+    dataframe, colname, low_cut, high_cut, random_state=None
+):
     """Replace outliers with samples from a KDE on dataframe[colname]"""
 
     col = dataframe[colname]
+    codes = classify_outliers(col, low_cut, high_cut)
+    is_outlier = (codes == BELOW_CUT) | (codes == ABOVE_CUT)
 
-    col_numerics = col.loc[
-        col.apply(
-            lambda x: isinstance(x, (int, float))
-            and (x >= low_cut and x <= high_cut)
-        )
-    ]
+    col_numerics = col.loc[codes == IN_RANGE]
     if col_numerics.empty:
         col_numerics[0] = low_cut
         col_numerics[1] = high_cut
 
-    kde = KernelDensity()
-    kde.fit(col_numerics.values.reshape(-1, 1))
+    samples = kde_sample(col_numerics.values, is_outlier.sum(), random_state)
 
-    is_outlier = col.apply(
-        lambda x: isinstance(x, (int, float)) and (x < low_cut or x > high_cut)
-    )
-
-    samples = kde.sample(n_samples=is_outlier.sum())
-
-    dataframe.loc[is_outlier, colname] = samples.flatten()
+    dataframe.loc[is_outlier, colname] = samples
 
     return dataframe
 
@@ -157,30 +119,25 @@ def null_removal_mean(dataframe, colname):
     """Replace nulls with the mean on dataframe[colname]"""
 
     col = dataframe[colname]
-    col_numerics = col.loc[col.apply(lambda x: isinstance(x, (int, float)))]
+    col_numerics = col.loc[numeric_mask(col)]
 
     dataframe[colname] = col.fillna(col_numerics.mean())
 
     return dataframe
 
 
-def null_removal_sample(dataframe, colname):
+def null_removal_sample(dataframe, colname, random_state=None):
     """Replace nulls with samples from a KDE on dataframe[colname]"""
 
     col = dataframe[colname]
 
-    col_numerics = col.loc[
-        col.notnull() & col.apply(lambda x: isinstance(x, (int, float)))
-    ]
+    col_numerics = col.loc[col.notnull() & numeric_mask(col)]
     if col_numerics.empty:
         col_numerics[0] = 0
 
-    kde = KernelDensity()
-    kde.fit(col_numerics.values.reshape(-1, 1))
+    samples = kde_sample(col_numerics.values, col.isnull().sum(), random_state)
 
-    samples = kde.sample(n_samples=col.isnull().sum())
-
-    dataframe.loc[col.isnull(), colname] = samples.flatten()
+    dataframe.loc[col.isnull(), colname] = samples
 
     return dataframe
 
@@ -189,7 +146,7 @@ def null_removal_median(dataframe, colname):
     """Replace nulls with the median on dataframe[colname]"""
 
     col = dataframe[colname]
-    col_numerics = col.loc[col.apply(lambda x: isinstance(x, (int, float)))]
+    col_numerics = col.loc[numeric_mask(col)]
 
     dataframe[colname] = col.fillna(col_numerics.median())
 
@@ -210,7 +167,7 @@ def null_removal_mode_numeric(dataframe, colname):
     """Replace nulls with the modal numeric value on dataframe[colname]"""
 
     col = dataframe[colname]
-    col_numerics = col.loc[col.apply(lambda x: isinstance(x, (int, float)))]
+    col_numerics = col.loc[numeric_mask(col)]
 
     dataframe[colname] = col.fillna(col_numerics.mode().get(0, None))
 
@@ -229,10 +186,10 @@ def type_convert_mean(dataframe, colname, data_type):
     """Replace mistyped values with the mean on dataframe[colname]"""
 
     col = dataframe[colname]
-    col_numerics = col.loc[col.apply(lambda x: isinstance(x, (int, float)))]
+    col_numerics = col.loc[numeric_mask(col)]
 
     dataframe.loc[
-        col.notnull() & col.apply(lambda x: not isinstance(x, data_type)),
+        col.notnull() & ~instance_mask(col, data_type),
         colname,
     ] = col_numerics.mean()
 
@@ -243,10 +200,10 @@ def type_convert_median(dataframe, colname, data_type):
     """Replace mistyped values with the median on dataframe[colname]"""
 
     col = dataframe[colname]
-    col_numerics = col.loc[col.apply(lambda x: isinstance(x, (int, float)))]
+    col_numerics = col.loc[numeric_mask(col)]
 
     dataframe.loc[
-        col.notnull() & col.apply(lambda x: not isinstance(x, data_type)),
+        col.notnull() & ~instance_mask(col, data_type),
         colname,
     ] = col_numerics.median()
 
@@ -257,10 +214,10 @@ def type_convert_mode(dataframe, colname, data_type):
     """Replace mistyped values with the modal value on dataframe[colname]"""
 
     col = dataframe[colname]
-    col_this_type = col.loc[col.apply(lambda x: isinstance(x, data_type))]
+    col_this_type = col.loc[instance_mask(col, data_type)]
 
     dataframe.loc[
-        col.notnull() & col.apply(lambda x: not isinstance(x, data_type)),
+        col.notnull() & ~instance_mask(col, data_type),
         colname,
     ] = col_this_type.mode().get(0, None)
 
@@ -270,13 +227,9 @@ def type_convert_mode(dataframe, colname, data_type):
 def type_convert_cast(dataframe, colname, data_type):
     """Tries to cast mistyped values on dataframe[colname]"""
 
-    def try_cast(x):
-        try:
-            return data_type(x)
-        except ValueError:
-            return x
-
-    dataframe[colname] = dataframe[colname].apply(try_cast)
+    # columns whose elements are all data_type already cast to themselves
+    if scalar_type(dataframe[colname]) is not data_type:
+        dataframe[colname] = cast_values(dataframe[colname], data_type)
 
     return dataframe
 
@@ -286,36 +239,133 @@ def type_convert_drop(dataframe, colname, data_type):
 
     col = dataframe[colname]
 
-    dataframe = dataframe.loc[
-        col.isnull() | col.apply(lambda x: isinstance(x, data_type)), :
-    ]
+    dataframe = dataframe.loc[col.isnull() | instance_mask(col, data_type), :]
 
     return dataframe
 
 
-def type_convert_sample(dataframe, colname, data_type):
+def type_convert_sample(dataframe, colname, data_type, random_state=None):
     """Replace mistyped values with samples from a KDE on dataframe[colname]"""
 
     col = dataframe[colname]
 
-    col_numerics = col.loc[
-        col.notnull() & col.apply(lambda x: isinstance(x, (int, float)))
-    ]
+    col_numerics = col.loc[col.notnull() & numeric_mask(col)]
     if col_numerics.empty:
         col_numerics[0] = 0
 
-    kde = KernelDensity()
-    kde.fit(col_numerics.values.reshape(-1, 1))
+    is_wrong_type = ~instance_mask(col, data_type)
+
+    samples = kde_sample(
+        col_numerics.values, is_wrong_type.sum(), random_state
+    )
+
+    dataframe.loc[is_wrong_type, colname] = samples
+
+    return dataframe
+
+
+def outlier_removal_fill(dataframe, colname, low_cut, high_cut, fill_value):
+    """Replace outliers with a fitted value on dataframe[colname]"""
+
+    codes = classify_outliers(dataframe[colname], low_cut, high_cut)
+    is_outlier = (codes == BELOW_CUT) | (codes == ABOVE_CUT)
+
+    dataframe.loc[is_outlier, colname] = fill_value
+
+    return dataframe
+
+
+def outlier_removal_kde(
+    dataframe, colname, low_cut, high_cut, kde_points, random_state=None
+):
+    """Replace outliers with samples from a fitted KDE on dataframe[colname]"""
+
+    codes = classify_outliers(dataframe[colname], low_cut, high_cut)
+    is_outlier = (codes == BELOW_CUT) | (codes == ABOVE_CUT)
+
+    samples = kde_sample(
+        kde_points or [low_cut, high_cut], is_outlier.sum(), random_state
+    )
+
+    dataframe.loc[is_outlier, colname] = samples
+
+    return dataframe
+
+
+def null_removal_fill(dataframe, colname, fill_value):
+    """Replace nulls with a fitted value on dataframe[colname]"""
+
+    dataframe[colname] = dataframe[colname].fillna(fill_value)
+
+    return dataframe
+
+
+def null_removal_kde(dataframe, colname, kde_points, random_state=None):
+    """Replace nulls with samples from a fitted KDE on dataframe[colname]"""
 
-    is_wrong_type = col.apply(lambda x: not isinstance(x, data_type))
+    is_null = dataframe[colname].isnull()
 
-    samples = kde.sample(n_samples=is_wrong_type.sum())
+    samples = kde_sample(kde_points or [0], is_null.sum(), random_state)
 
-    dataframe.loc[is_wrong_type, colname] = samples.flatten()
+    dataframe.loc[is_null, colname] = samples
 
     return dataframe
 
 
+def type_convert_fill(dataframe, colname, data_type, fill_value):
+    """Replace mistyped values with a fitted value on dataframe[colname]"""
+
+    col = dataframe[colname]
+
+    dataframe.loc[
+        col.notnull() & ~instance_mask(col, data_type),
+        colname,
+    ] = fill_value
+
+    return dataframe
+
+
+def type_convert_kde(
+    dataframe, colname, data_type, kde_points, random_state=None
+):
+    """Replace mistyped values with fitted KDE samples on dataframe[colname]"""
+
+    is_wrong_type = ~instance_mask(dataframe[colname], data_type)
+
+    samples = kde_sample(kde_points or [0], is_wrong_type.sum(), random_state)
+
+    dataframe.loc[is_wrong_type, colname] = samples
+
+    return dataframe
+
+
+def fit_mean(values, random_state=None):
+    """Fit the mean of values as the replacement value"""
+    return {"fill_value": python_scalar(values.mean())}
+
+
+def fit_median(values, random_state=None):
+    """Fit the median of values as the replacement value"""
+    return {"fill_value": python_scalar(values.median())}
+
+
+def fit_mode(values, random_state=None):
+    """Fit the most common of values as the replacement value"""
+    return {"fill_value": python_scalar(values.mode().get(0, None))}
+
+
+def fit_kde(values, random_state=None):
+    """Fit the points of a KDE replacements are sampled from to values"""
+
+    points = np.asarray(values, dtype=float)
+
+    if len(points) > KDE_MAX_POINTS:
+        rng = np.random.default_rng(random_state)
+        points = rng.choice(points, KDE_MAX_POINTS, replace=False)
+
+    return {"kde_points": points.tolist()}
+
+
 class OutlierRemovalMethod(Enum):
     NONE = "Do Nothing"
     MEAN = "Replace with Mean (excluding outliers)"
@@ -385,6 +435,104 @@ TYPE_CONVERT_METHODS = {
 }
 
 
+# Functions applying fitted parameters, for methods with a fit phase
+OUTLIER_REMOVAL_TRANSFORMS = {
+    OutlierRemovalMethod.MEAN: outlier_removal_fill,
+    OutlierRemovalMethod.MEDIAN: outlier_removal_fill,
+    OutlierRemovalMethod.MODE_NUMERIC: outlier_removal_fill,
+    OutlierRemovalMethod.SAMPLE: outlier_removal_kde,
+}
+
+NULL_REMOVAL_TRANSFORMS = {
+    NullRemovalMethod.MEAN: null_removal_fill,
+    NullRemovalMethod.MEDIAN: null_removal_fill,
+    NullRemovalMethod.MODE: null_removal_fill,
+    NullRemovalMethod.MODE_NUMERIC: null_removal_fill,
+    NullRemovalMethod.SAMPLE: null_removal_kde,
+}
+
+TYPE_CONVERT_TRANSFORMS = {
+    TypeConvertMethod.MEAN: type_convert_fill,
+    TypeConvertMethod.MEDIAN: type_convert_fill,
+    TypeConvertMethod.MODE: type_convert_fill,
+    TypeConvertMethod.SAMPLE: type_convert_kde,
+}
+
+# The statistic fitted by each method with a fit phase
+FIT_STATISTICS = {
+    OutlierRemovalMethod.MEAN: fit_mean,
+    OutlierRemovalMethod.MEDIAN: fit_median,
+    OutlierRemovalMethod.MODE_NUMERIC: fit_mode,
+    OutlierRemovalMethod.SAMPLE: fit_kde,
+    NullRemovalMethod.MEAN: fit_mean,
+    NullRemovalMethod.MEDIAN: fit_median,
+    NullRemovalMethod.MODE: fit_mode,
+    NullRemovalMethod.MODE_NUMERIC: fit_mode,
+    NullRemovalMethod.SAMPLE: fit_kde,
+    TypeConvertMethod.MEAN: fit_mean,
+    TypeConvertMethod.MEDIAN: fit_median,
+    TypeConvertMethod.MODE: fit_mode,
+    TypeConvertMethod.SAMPLE: fit_kde,
+}
+
+# Methods replacing values with random samples
+SAMPLING_METHODS = {
+    OutlierRemovalMethod.SAMPLE,
+    NullRemovalMethod.SAMPLE,
+    TypeConvertMethod.SAMPLE,
+}
+
+# Methods which leave the dataframe unchanged
+NO_OP_METHODS = {
+    OutlierRemovalMethod.NONE,
+    NullRemovalMethod.NONE,
+    TypeConvertMethod.NONE,
+}
+
+# Methods which remove rows rather than replace values
+ROW_DROPPING_METHODS = {
+    OutlierRemovalMethod.DROP,
+    NullRemovalMethod.DROP,
+    TypeConvertMethod.DROP,
+}
+
+# Methods whose result for a row depends only on the values in that row
+ROW_LOCAL_METHODS = (
+    NO_OP_METHODS
+    | ROW_DROPPING_METHODS
+    | {
+        OutlierRemovalMethod.NEAREST_CUT,
+        OutlierRemovalMethod.NULL,
+        TypeConvertMethod.CAST,
+    }
+)
+
+# Methods which have no further effect if applied again with the same
+# parameters, e.g. outliers replaced by a value within the range
+IDEMPOTENT_METHODS = ROW_LOCAL_METHODS | {
+    OutlierRemovalMethod.MEDIAN,
+    OutlierRemovalMethod.MODE_NUMERIC,
+    NullRemovalMethod.MEAN,
+    NullRemovalMethod.MEDIAN,
+    NullRemovalMethod.MODE,
+    NullRemovalMethod.MODE_NUMERIC,
+    TypeConvertMethod.MODE,
+}
+
+# Methods which replace a column with values of an inferred dtype, rather
+# than writing values into the column as it is
+DTYPE_INFERRING_METHODS = {TypeConvertMethod.CAST}
+
+# Methods filling nulls with fillna, which infers the dtype of an object
+# column again, e.g. as float64 once no strings are left in it
+OBJECT_DTYPE_INFERRING_METHODS = DTYPE_INFERRING_METHODS | {
+    NullRemovalMethod.MEAN,
+    NullRemovalMethod.MEDIAN,
+    NullRemovalMethod.MODE,
+    NullRemovalMethod.MODE_NUMERIC,
+}
+
+
 # Encodes which transformations are allowed for which data types
 ALLOWED_TRANSFORMATIONS = {
     CategoricalTypes.CONTINUOUS: [
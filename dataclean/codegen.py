@@ -1,15 +1,14 @@
-from __future__ import division
-
 import builtins
 import re
 from collections import namedtuple
-
-try:
-    from inspect import signature
-except ImportError:  # Python 2
-    from funcsigs import signature
-
-from inspect import getsourcelines, ismethod, isclass, isfunction, ismodule
+from inspect import (
+    getsourcelines,
+    ismethod,
+    isclass,
+    isfunction,
+    ismodule,
+    signature,
+)
 from textwrap import dedent
 
 
@@ -107,11 +106,13 @@ def render_code(function, **params):
     function : function
         Python function to render.
 
-        This function should have any code to be output within lines [2:-1] of
-        the code as written. For intended usage this means that the signature,
-        the one line docstring, and the return statement are ommitted when
-        rendering. One should also take care the function does not use text
-        which may clash with substitutions made when calling this function.
+        This function should have any code to be output between its one line
+        docstring and its final line. For intended usage this means that the
+        signature, the one line docstring, and the return statement are
+        ommitted when rendering. One should also take care the function does
+        not use text which may clash with substitutions made when calling this
+        function. Arguments not passed in params are replaced with their
+        default values.
 
     Returns
     -------
@@ -126,18 +127,34 @@ def render_code(function, **params):
         for line in params["code_comment"].split("\n"):
             comment += "# " + line + "\n"
 
-    code = getsourcelines(function)
+    code = getsourcelines(function)[0]
+
+    # the signature may be wrapped over several lines, so find the docstring
+    docstring_line = next(
+        i
+        for i, line in enumerate(code)
+        if line.strip().startswith(('"""', "'''"))
+    )
 
-    # [2:-1] slice removes signature, docstring and return statement
-    code = dedent("".join(code[0][2:-1]))
+    # slice removes signature, docstring and return statement
+    code = dedent("".join(code[docstring_line + 1 : -1]))
 
-    for arg_name in signature(function).parameters.keys():
+    for arg_name, parameter in signature(function).parameters.items():
         if arg_name in params:
-            # repr of a type, e.g. repr(int) doesn't produce valid python
-            if isinstance(params[arg_name], type):
-                substitutions[arg_name] = params[arg_name].__name__
-            else:
-                substitutions[arg_name] = repr(params[arg_name])
+            value = params[arg_name]
+        elif parameter.default is not parameter.empty:
+            value = parameter.default
+        else:
+            continue
+
+        # repr of a type, e.g. repr(int) doesn't produce valid python
+        if isinstance(value, type):
+            substitutions[arg_name] = value.__name__
+        # nor does repr of a float nan, e.g. a mean of no values
+        elif isinstance(value, float) and value != value:
+            substitutions[arg_name] = "float('nan')"
+        else:
+            substitutions[arg_name] = repr(value)
 
     if substitutions:
         code = replace(code, substitutions)
@@ -0,0 +1,275 @@
+import numpy as np
+import pandas as pd
+
+NUMERIC_TYPES = (int, float)
+
+# Codes assigned to column elements by classify_outliers
+NON_NUMERIC = 0
+IN_RANGE = 1
+BELOW_CUT = 2
+ABOVE_CUT = 3
+
+# Matches the default bandwidth of sklearn.neighbors.KernelDensity
+KDE_BANDWIDTH = 1.0
+
+# The python type of every element of a column with this numpy dtype kind,
+# as seen by a function applied over the column
+SCALAR_TYPE_BY_KIND = {"b": bool, "i": int, "u": int, "f": float}
+
+# Numpy dtypes whose casts from object arrays call int() and float() on
+# each element in C
+CAST_DTYPES = {int: np.int64, float: np.float64}
+
+# Number of elements cast together, falling back to casting one at a time
+# in blocks where any element fails
+CAST_BLOCK_SIZE = 4096
+
+
+def scalar_type(col):
+    """Return the python type shared by all elements of col, if known"""
+
+    if isinstance(col.dtype, np.dtype):
+        return SCALAR_TYPE_BY_KIND.get(col.dtype.kind)
+    return None
+
+
+def python_scalar(value):
+    """Convert a numpy scalar to the equivalent python value"""
+
+    if isinstance(value, np.generic):
+        return value.item()
+    return value
+
+
+def object_values(col):
+    """Return the elements of col as an object array of python values"""
+
+    if col.dtype == object:
+        return np.asarray(col.values, dtype=object)
+
+    # apply converts the elements of other extension columns, passing
+    # those of nullable numeric columns as floats, with nan for NA
+    if not isinstance(col.dtype, (np.dtype, pd.StringDtype)):
+        col = col.apply(lambda x: x)
+
+    return np.asarray(col.astype(object).values, dtype=object)
+
+
+def instance_mask(col, types):
+    """Boolean array of isinstance(x, types) for each element x of col"""
+
+    element_type = scalar_type(col)
+
+    if element_type is not None:
+        return np.full(len(col), issubclass(element_type, types), dtype=bool)
+
+    return np.fromiter(
+        (isinstance(x, types) for x in object_values(col)),
+        dtype=bool,
+        count=len(col),
+    )
+
+
+def numeric_mask(col):
+    """Boolean array marking the int and float elements of col"""
+
+    return instance_mask(col, NUMERIC_TYPES)
+
+
+def _try_cast(x, data_type):
+    try:
+        return data_type(x)
+    except ValueError:
+        return x
+
+
+def _cast_each(values, data_type):
+    """Cast each of values to data_type, keeping those raising ValueError"""
+
+    cast = np.empty(len(values), dtype=object)
+
+    for i, x in enumerate(values):
+        cast[i] = _try_cast(x, data_type)
+
+    return cast
+
+
+def _cast_blocks(values, data_type):
+    """Cast numeric candidates, block by block, as _cast_each does"""
+
+    cast = np.empty(len(values), dtype=object)
+
+    for start in range(0, len(values), CAST_BLOCK_SIZE):
+        block = values[start : start + CAST_BLOCK_SIZE]
+        try:
+            cast[start : start + len(block)] = block.astype(
+                CAST_DTYPES[data_type]
+            )
+        except (ValueError, TypeError, OverflowError):
+            cast[start : start + len(block)] = _cast_each(block, data_type)
+
+    return cast
+
+
+def cast_values(col, data_type):
+    """
+    Cast each element of col to data_type, where possible.
+
+    Elements for which data_type(x) raises a ValueError are left unchanged,
+    and the result has the dtype col.apply would give it. Rather than
+    calling data_type on each element in python, int and float casts are
+    made by numpy on the elements pandas.to_numeric can parse, and str and
+    bool casts through a ufunc.
+
+    Parameters
+    ----------
+    col : pd.Series
+        The column to cast.
+    data_type : type
+        The type to cast to, one of int, float, str or bool.
+
+    Returns
+    -------
+    pd.Series
+        The cast column.
+    """
+
+    # other extension and categorical columns are cast with apply
+    if not isinstance(col.dtype, (np.dtype, pd.StringDtype)):
+        return col.apply(_try_cast, args=(data_type,))
+
+    values = object_values(col)
+
+    if data_type in CAST_DTYPES:
+        # numpy casts None to nan, where float(None) raises a TypeError, so
+        # only columns without nulls are cast in one go
+        if len(col) > 0 and not col.isnull().any():
+            try:
+                return pd.Series(
+                    values.astype(CAST_DTYPES[data_type]),
+                    index=col.index,
+                    name=col.name,
+                )
+            except (ValueError, TypeError, OverflowError):
+                pass
+
+        try:
+            is_candidate = np.asarray(
+                pd.notnull(pd.to_numeric(values, errors="coerce")), dtype=bool
+            )
+        except (TypeError, ValueError):
+            is_candidate = np.zeros(len(values), dtype=bool)
+
+        cast = np.empty(len(values), dtype=object)
+        cast[is_candidate] = _cast_blocks(values[is_candidate], data_type)
+        cast[~is_candidate] = _cast_each(values[~is_candidate], data_type)
+    else:
+        try:
+            cast = np.frompyfunc(data_type, 1, 1)(values)
+        except ValueError:
+            cast = _cast_each(values, data_type)
+
+    return pd.Series(cast, index=col.index, name=col.name).infer_objects()
+
+
+def _classify_values(values, low, high):
+    """Outlier codes for an array of numeric values"""
+
+    codes = np.full(len(values), NON_NUMERIC, dtype=np.int8)
+
+    # nan is neither in range nor an outlier
+    with np.errstate(invalid="ignore"):
+        in_range = np.asarray((values >= low) & (values <= high), dtype=bool)
+        below = np.asarray(values < low, dtype=bool)
+        above = np.asarray(values > high, dtype=bool)
+
+    codes[in_range] = IN_RANGE
+    codes[below] = BELOW_CUT
+    codes[above] = ABOVE_CUT
+
+    return codes
+
+
+def classify_outliers(col, low, high):
+    """
+    Label each element of col relative to the range [low, high].
+
+    Parameters
+    ----------
+    col : pd.Series
+        The column to classify.
+    low, high : float
+        The lower and upper cuts of the range.
+
+    Returns
+    -------
+    np.array of np.int8
+        NON_NUMERIC for elements that are not int or float (including
+        nulls), otherwise IN_RANGE, BELOW_CUT or ABOVE_CUT.
+    """
+
+    if scalar_type(col) is not None:
+        return _classify_values(col.values, low, high)
+
+    is_numeric = numeric_mask(col)
+    codes = np.full(len(col), NON_NUMERIC, dtype=np.int8)
+    numerics = object_values(col)[is_numeric]
+
+    if len(numerics) > 0:
+        codes[is_numeric] = _classify_values(numerics, low, high)
+
+    return codes
+
+
+def spawn_random_states(random_state, n_states):
+    """
+    Derive independent random states from random_state, e.g. for workers.
+
+    Parameters
+    ----------
+    random_state : int, np.random.SeedSequence or np.random.Generator
+        The seed the states are derived from. A generator is advanced.
+    n_states : int
+        The number of states.
+
+    Returns
+    -------
+    list of np.random.SeedSequence
+        The states, which give reproducible, independent random numbers.
+    """
+
+    if isinstance(random_state, np.random.Generator):
+        random_state = random_state.integers(2**63)
+    if not isinstance(random_state, np.random.SeedSequence):
+        random_state = np.random.SeedSequence(random_state)
+
+    return random_state.spawn(n_states)
+
+
+def kde_sample(data, n_samples, random_state=None, bandwidth=KDE_BANDWIDTH):
+    """
+    Draw samples from a gaussian kernel density estimate of data.
+
+    Parameters
+    ----------
+    data : array-like
+        The one dimensional values the density estimate is made from.
+    n_samples : int
+        The number of samples to draw.
+    random_state : None, int, np.random.SeedSequence or Generator, optional
+        Seed or generator for the random numbers, for reproducible samples.
+    bandwidth : float, optional
+        Standard deviation of the gaussian kernel.
+
+    Returns
+    -------
+    np.array
+        n_samples floats, each a random point of data plus kernel noise.
+    """
+
+    rng = np.random.default_rng(random_state)
+    data = np.asarray(data, dtype=float)
+
+    points = data[rng.integers(0, len(data), size=n_samples)]
+
+    return points + rng.normal(scale=bandwidth, size=n_samples)
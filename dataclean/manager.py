@@ -1,24 +1,32 @@
 import json
 import sys
+import weakref
 from base64 import b64encode
+from functools import partial
+from itertools import takewhile
 
 import ipywidgets
 from IPython.display import Javascript, display
-from IPython.utils.py3compat import str_to_bytes, bytes_to_str
 from pandas import DataFrame
 
+from dataclean.cache import dataframe_nbytes
+from dataclean.memory import MemoryAccountant
 from dataclean.pipeline import Pipeline
+from dataclean.profiling import describe_columns
+from dataclean.sampling import TailPreservingSampler
+from dataclean.scheduler import ProcessPoolStepExecutor
 from dataclean.widget import (
     CallbackManager,
     ColumnWidgetController,
     DataFrameWidgetController,
     PipelineWidgetController,
+    clear_categorical_cache,
 )
 
 
 def create_new_code_cell(code):
     """Javascript to create and populate a new code cell in the notebook"""
-    encoded_code = bytes_to_str(b64encode(str_to_bytes(code)))
+    encoded_code = b64encode(code.encode()).decode()
     display(
         Javascript(
             """
@@ -45,19 +53,57 @@ def display_colwidget(col_id):
 
 
 class DataCleaner(object):
-    """Keeps track of DataFrames in the user's kernel"""
+    """
+    Keeps track of DataFrames in the user's kernel
 
-    def __init__(self):
+    sample_rows and sampler are passed on to each DataframeManager, which
+    share a MemoryAccountant with a budget of memory_budget bytes.
+    """
+
+    def __init__(self, sample_rows=None, sampler=None, memory_budget=None):
+        self.sample_rows = sample_rows
+        self.sampler = sampler
+        self.memory = MemoryAccountant(memory_budget)
         self.dataframe_managers = {}
         self._main = sys.modules["__main__"]
         self.refresh()
 
     def refresh(self):
+        namespace = vars(self._main)
         dataframe_managers_new = {}
-        for var_name, var in vars(self._main).items():
-            if isinstance(var, DataFrame) and not var_name.startswith("_"):
-                manager = self._manager_for_dataframe(var, var_name)
-                dataframe_managers_new[id(var)] = manager
+
+        # tracked DataFrames still bound to their names are kept by looking
+        # the names up, so only the other names need their types checked
+        for dataframe_id, manager in self.dataframe_managers.items():
+            dataframe = manager.full_dataframe
+            if (
+                dataframe is not None
+                and namespace.get(manager.name) is dataframe
+            ):
+                dataframe_managers_new[dataframe_id] = manager
+
+        tracked_names = set(
+            manager.name for manager in dataframe_managers_new.values()
+        )
+
+        for var_name, var in namespace.items():
+            if (
+                var_name in tracked_names
+                or var_name.startswith("_")
+                or not isinstance(var, DataFrame)
+                # a DataFrame bound to several names keeps its name
+                or id(var) in dataframe_managers_new
+            ):
+                continue
+
+            manager = self._manager_for_dataframe(var, var_name)
+            dataframe_managers_new[id(var)] = manager
+
+        # managers of DataFrames deleted from the namespace, or collected,
+        # are released so their samples, figures and widgets can be freed
+        for dataframe_id, manager in self.dataframe_managers.items():
+            if dataframe_managers_new.get(dataframe_id) is not manager:
+                manager.release()
 
         self.dataframe_managers = dataframe_managers_new
 
@@ -68,71 +114,225 @@ class DataCleaner(object):
             metadata.append(manager.metadata())
         return json.dumps(metadata)
 
+    def clear_metadata_cache(self):
+        """
+        Describe every column afresh on the next refresh.
+
+        Distinct counts are only counted again once a column's fingerprint
+        changes, which misses values modified in place outside its sample.
+        """
+
+        clear_categorical_cache()
+        for manager in self.dataframe_managers.values():
+            manager.clear_metadata_cache()
+
     def manager_for_id(self, dataframe_id):
         return self.dataframe_managers[dataframe_id]
 
+    def memory_usage(self):
+        """Memory accounted for each DataFrame, e.g. its sample and widgets."""
+        return {
+            manager.name: self.memory.group_nbytes(id(manager))
+            for manager in self.dataframe_managers.values()
+        }
+
     def _manager_for_dataframe(self, dataframe, name):
-        for manager in self.dataframe_managers.values():
-            if manager.full_dataframe is dataframe:
-                manager.name = name
-                break
-        else:
-            manager = DataframeManager(dataframe, name)
+        manager = self.dataframe_managers.get(id(dataframe))
 
-            def export_cleaned_dataframe(new_dataframe, dataframe_name):
-                new_df_name = dataframe_name + "_cleaned"
-                suffix = 0
+        # the id of a collected DataFrame may have been reused
+        if manager is not None and manager.full_dataframe is dataframe:
+            manager.name = name
+            return manager
 
-                # ensures we have a unique name
-                while getattr(self._main, new_df_name, None) is not None:
-                    suffix += 1
-                    new_df_name = dataframe_name + "_cleaned_" + str(suffix)
+        manager = DataframeManager(
+            dataframe, name, self.sample_rows, self.sampler, self.memory
+        )
 
-                setattr(self._main, new_df_name, new_dataframe)
+        def export_cleaned_dataframe(new_dataframe, dataframe_name):
+            new_df_name = dataframe_name + "_cleaned"
+            suffix = 0
 
-            def export_to_code(code):
-                create_new_code_cell(code)
+            # ensures we have a unique name
+            while getattr(self._main, new_df_name, None) is not None:
+                suffix += 1
+                new_df_name = dataframe_name + "_cleaned_" + str(suffix)
 
-            manager.execute_callback.register_callback(
-                export_cleaned_dataframe
-            )
-            manager.export_callback.register_callback(export_to_code)
+            setattr(self._main, new_df_name, new_dataframe)
+
+        def export_to_code(code):
+            create_new_code_cell(code)
+
+        manager.execute_callback.register_callback(export_cleaned_dataframe)
+        manager.export_callback.register_callback(export_to_code)
 
         return manager
 
 
 class DataframeManager(object):
-    """Manages the widget controller classes for a single DataFrame"""
+    """
+    Manages the widget controller classes for a single DataFrame
+
+    DataFrames over sample_rows rows, by default MAX_ROWS, are previewed
+    with a sample chosen by sampler, by default a TailPreservingSampler
+    keeping the nulls, mistyped values and extremes of each column.
+
+    The memory held by the sample, the column widgets and the previews
+    cached by the pipeline is accounted for by memory, a MemoryAccountant.
+    The plot and preview of a collapsed column widget are freed, and it is
+    closed altogether once evicted, being built again when next shown. The
+    cached previews may be evicted at any time, being computed again when
+    next shown.
+    """
 
     MAX_ROWS = 1000
 
-    def __init__(self, dataframe, name):
+    # DataFrames with more rows are profiled approximately until
+    # compute_exact_metadata is called
+    APPROXIMATE_METADATA_ROWS = 1000000
+
+    # DataFrames with more rows are cleaned in parallel processes
+    PARALLEL_EXECUTE_ROWS = 1000000
+
+    def __init__(
+        self, dataframe, name, sample_rows=None, sampler=None, memory=None
+    ):
         self.name = name
         self.column_widget_controller_by_id = {}
+        self._collapsed_col_ids = set()
         self._pipeline_widget_controller = None
         self._dataframe_widget_controller = None
 
         self.execute_callback = CallbackManager()
         self.export_callback = CallbackManager()
 
-        self.full_dataframe = dataframe
+        # the DataFrame is referenced weakly, so the manager does not keep
+        # it alive once deleted from the namespace
+        self._full_dataframe = weakref.ref(dataframe)
+
+        self.sample_rows = sample_rows or self.MAX_ROWS
+        self.sampler = sampler or TailPreservingSampler()
 
-        if dataframe.shape[0] > self.MAX_ROWS:
-            self.dataframe = dataframe.sample(n=self.MAX_ROWS)
+        if dataframe.shape[0] > self.sample_rows:
+            self.dataframe = self.sampler.sample(dataframe, self.sample_rows)
             self.is_sample = True
         else:
-            self.dataframe = dataframe
+            # shares the data, but not the DataFrame object
+            self.dataframe = dataframe.copy(deep=False)
             self.is_sample = False
 
         if not (dataframe.columns.is_unique and dataframe.index.is_unique):
             self.dataframe = DataFrame({"_": []})
 
+        self.memory = memory if memory is not None else MemoryAccountant()
+        self._track_sample()
+
         self.pipeline = Pipeline()
         self.active_step = None
 
+        # the pipeline fitted by the last execution, and the steps it copies
+        self._fitted_pipeline = None
+        self._fitted_steps = None
+
+        # the steps and active step the open widgets were refreshed with,
+        # widgets opened since, and which widgets the last refresh skipped
+        # as unaffected
+        self._shown_steps = []
+        self._shown_step = None
+        self._unrefreshed_col_ids = set()
+        self.last_refresh = {"refreshed": [], "skipped": []}
+        self._description_cache = {}
+        self.exact_metadata = False
+
+        # the columns are identified by the ids of the Series kept here,
+        # as pandas need not return the same Series for every lookup
+        self.column_by_id = {}
+        self._col_id_by_name = {}
+        for colname in self.dataframe.columns:
+            column = self.dataframe[colname]
+            self.column_by_id[id(column)] = column
+            self._col_id_by_name[colname] = id(column)
+
+    @property
+    def full_dataframe(self):
+        """The managed DataFrame, or None once it has been collected"""
+        return self._full_dataframe()
+
+    def release(self):
+        """Close the widgets of the DataFrame and drop its sample"""
+
+        for controller in self.column_widget_controller_by_id.values():
+            controller.close()
+        if self._dataframe_widget_controller is not None:
+            self._dataframe_widget_controller.close()
+        if self._pipeline_widget_controller is not None:
+            self._pipeline_widget_controller.close()
+
+        self.column_widget_controller_by_id = {}
+        self._collapsed_col_ids = set()
+        self._dataframe_widget_controller = None
+        self._pipeline_widget_controller = None
+        self.memory.forget_group(id(self))
+
+        # the callbacks reference the DataCleaner and notebook
+        self.execute_callback = CallbackManager()
+        self.export_callback = CallbackManager()
+
+        self.dataframe = DataFrame()
         self.column_by_id = {}
-        for colname, column in self.dataframe.items():
-            self.column_by_id[id(column)] = self.dataframe[colname]
+        self._col_id_by_name = {}
+        self.pipeline.cache.clear()
+        self._fitted_pipeline = None
+        self._fitted_steps = None
+        self._description_cache = {}
+
+    def _track_sample(self):
+        self.memory.track(
+            (id(self), None), dataframe_nbytes(self.dataframe), group=id(self)
+        )
+
+    def _track_pipeline_cache(self):
+        self.memory.track(
+            (id(self), "pipeline"),
+            self.pipeline.cache.nbytes,
+            self.pipeline.cache.clear,
+            group=id(self),
+        )
+
+    def _track_column_widget(self, col_id):
+        """Account for a column widget, evictable once collapsed"""
+
+        if col_id in self._collapsed_col_ids:
+            evict = partial(self._evict_column_widget, col_id)
+        else:
+            evict = None
+
+        self.memory.track(
+            (id(self), col_id),
+            self.column_widget_controller_by_id[col_id].nbytes(),
+            evict,
+            group=id(self),
+        )
+
+    def _evict_column_widget(self, col_id):
+        self.column_widget_controller_by_id.pop(col_id).close()
+        self._collapsed_col_ids.discard(col_id)
+        self._unrefreshed_col_ids.discard(col_id)
+
+    def collapse_column_widget(self, col_id):
+        """Free the plot and preview of a column widget no longer shown"""
+
+        if col_id not in self.column_widget_controller_by_id:
+            return
+
+        self.column_widget_controller_by_id[col_id].collapse()
+        self._collapsed_col_ids.add(col_id)
+        self._track_column_widget(col_id)
+
+    def _shown_dataframe(self):
+        """The sample as last shown by the column widgets"""
+        return self.pipeline.execute(
+            self.dataframe, up_to_step=self._shown_step
+        )
 
     def metadata(self):
         metadata = {
@@ -145,31 +345,86 @@ class DataframeManager(object):
             "dfCols": [
                 {
                     "colname": colname,
-                    "colId": id(self.full_dataframe[colname]),
-                    "description": {
-                        "dtype": str(column.dtype),
-                        "null_percentage": "{0:.0f}%".format(
-                            100 * column.isnull().sum() / float(len(column))
-                            if len(column) > 0
-                            else 0
-                        ),
-                        "distinct": len(column.value_counts()),
-                    },
+                    "colId": self._column_id(colname),
+                    "description": description,
                 }
-                for colname, column in self.full_dataframe.items()
+                for colname, description in self._column_descriptions()
             ],
         }
         return metadata
 
+    def _column_id(self, colname):
+        if colname in self._col_id_by_name:
+            return self._col_id_by_name[colname]
+        return id(self.full_dataframe[colname])
+
+    def compute_exact_metadata(self):
+        """Stop approximating the metadata of a large DataFrame"""
+        self.exact_metadata = True
+        self.clear_metadata_cache()
+
+    def clear_metadata_cache(self):
+        """Describe every column afresh, e.g. once modified in place"""
+        self._description_cache = {}
+        clear_categorical_cache()
+
+    def _column_descriptions(self):
+        """
+        Describe the full DataFrame columns.
+
+        Distinct counts are reused for columns with an unchanged
+        fingerprint, while null counts are cheap enough to compute on every
+        call, so are never stale.
+        """
+
+        columns = self.full_dataframe.columns
+        approximate = (
+            not self.exact_metadata
+            and len(self.full_dataframe) > self.APPROXIMATE_METADATA_ROWS
+        )
+
+        if not columns.is_unique:
+            self._description_cache = {}
+            return list(
+                zip(
+                    columns,
+                    describe_columns(self.full_dataframe, approximate),
+                )
+            )
+
+        self._description_cache = {
+            colname: cached
+            for colname, cached in self._description_cache.items()
+            if colname in columns
+        }
+
+        return list(
+            zip(
+                columns,
+                describe_columns(
+                    self.full_dataframe,
+                    approximate,
+                    distinct_cache=self._description_cache,
+                ),
+            )
+        )
+
     @property
     def dataframe_widget(self):
         if self._dataframe_widget_controller is None:
             self._dataframe_widget_controller = DataFrameWidgetController(
-                self.pipeline_widget, self.MAX_ROWS if self.is_sample else 0
+                self.pipeline_widget, self.sample_rows if self.is_sample else 0
             )
 
             def resample():
-                self.dataframe = self.full_dataframe.sample(n=self.MAX_ROWS)
+                self.dataframe = self.sampler.sample(
+                    self.full_dataframe, self.sample_rows
+                )
+                self.pipeline.cache.clear()
+                self._dataframe_widget_controller.preview.clear()
+                self._track_sample()
+                self._track_pipeline_cache()
+                self._shown_steps = None
                 self._refresh_colwidgets()
 
             self._dataframe_widget_controller.resample_callback.register_callback(
@@ -210,24 +465,12 @@ class DataframeManager(object):
                 self._refresh_colwidgets(step=active_step)
                 self.active_step = active_step
                 if hasattr(active_step, "colname"):
-                    display_colwidget(
-                        id(self.full_dataframe[active_step.colname])
-                    )
+                    display_colwidget(self._column_id(active_step.colname))
 
             def enter_add_mode():
                 self._refresh_colwidgets()
                 self.active_step = None
 
-            def execute_pipeline():
-                new_dataframe = self.pipeline.execute(
-                    self.full_dataframe.copy(), preview=False
-                )
-                self.execute_callback.send_callbacks(new_dataframe, self.name)
-
-            def export_pipeline():
-                code = self.pipeline.export()
-                self.export_callback.send_callbacks(code)
-
             self._pipeline_widget_controller.add_mode_callback.register_callback(
                 enter_add_mode
             )
@@ -236,10 +479,10 @@ class DataframeManager(object):
             )
 
             self._pipeline_widget_controller.execute_callback.register_callback(
-                execute_pipeline
+                self._execute_pipeline
             )
             self._pipeline_widget_controller.export_callback.register_callback(
-                export_pipeline
+                self._export_pipeline
             )
 
             self._pipeline_widget_controller.delete_step_callback.register_callback(
@@ -248,6 +491,41 @@ class DataframeManager(object):
 
         return self._pipeline_widget_controller.render_widget(self.active_step)
 
+    def _execute_pipeline(self):
+        # the DataFrame may have been modified in place since its columns
+        # were described
+        self.clear_metadata_cache()
+
+        # copies of the steps are fitted to the full DataFrame, so the
+        # previews of the sample are unaffected
+        pipeline = self.pipeline.copy()
+
+        # the executor only runs the steps after those applied in fitting
+        executor = (
+            ProcessPoolStepExecutor()
+            if len(self.full_dataframe) > self.PARALLEL_EXECUTE_ROWS
+            else None
+        )
+        new_dataframe = pipeline.fit_transform(
+            self.full_dataframe, executor=executor
+        )
+
+        # kept for exporting until the steps are changed
+        self._fitted_pipeline = pipeline
+        self._fitted_steps = list(self.pipeline.steps)
+
+        self.execute_callback.send_callbacks(new_dataframe, self.name)
+
+    def _export_pipeline(self):
+        # the values fitted by the last execution are written into the code,
+        # if the steps are unchanged since
+        if self._fitted_steps == self.pipeline.steps:
+            code = self._fitted_pipeline.export()
+        else:
+            code = self.pipeline.export()
+
+        self.export_callback.send_callbacks(code)
+
     def column_widget(self, col_id):
         if self.dataframe.empty:
             widget = ipywidgets.Label(value="")
@@ -256,17 +534,30 @@ class DataframeManager(object):
                 col_widget_controller = self.column_widget_controller_by_id[
                     col_id
                 ]
+
+                # collapsed widgets are not refreshed until shown again
+                if col_id in self._collapsed_col_ids:
+                    self._collapsed_col_ids.discard(col_id)
+                    dataframe = self._shown_dataframe()
+                    col_widget_controller.load_data(
+                        dataframe[self.column_by_id[col_id].name],
+                        dataframe,
+                        self._shown_step,
+                    )
             else:
-                column = self.column_by_id[col_id]
+                # evicted widgets are built again from the shown sample
+                dataframe = self._shown_dataframe()
+                column = dataframe[self.column_by_id[col_id].name]
 
                 col_widget_controller = ColumnWidgetController()
                 col_widget_controller.load_data(
-                    column, self.dataframe, self.active_step
+                    column, dataframe, self.active_step
                 )
 
                 self.column_widget_controller_by_id[
                     col_id
                 ] = col_widget_controller
+                self._unrefreshed_col_ids.add(col_id)
 
                 col_widget_controller.new_step_callback.register_callback(
                     self._new_step
@@ -276,22 +567,106 @@ class DataframeManager(object):
                 )
 
             widget = col_widget_controller.render_widget()
+            self._track_column_widget(col_id)
+            self._track_pipeline_cache()
 
         return widget
 
+    def _changed_columns(self, steps):
+        """
+        Columns which may differ between the shown preview and steps.
+
+        Returns None if every column may differ, as rows may be dropped or
+        the shown steps are unknown.
+        """
+
+        if self._shown_steps is None:
+            return None
+
+        # steps after the first difference may see different inputs
+        first = 0
+        while (
+            first < min(len(steps), len(self._shown_steps))
+            and steps[first] is self._shown_steps[first]
+        ):
+            first += 1
+
+        changed_steps = steps[first:] + self._shown_steps[first:]
+
+        if any(changed.drops_rows for changed in changed_steps):
+            return None
+
+        changed_columns = set()
+        for changed in changed_steps:
+            changed_columns.update(changed.output_columns)
+
+        return changed_columns
+
     def _refresh_colwidgets(self, step=None):
+        steps = list(
+            takewhile(lambda shown: shown is not step, self.pipeline.steps)
+        )
+        changed_columns = self._changed_columns(steps)
+        step_changed = step is not self._shown_step
+
+        self.last_refresh = {"refreshed": [], "skipped": []}
+
+        if changed_columns is not None and not (
+            changed_columns or step_changed or self._unrefreshed_col_ids
+        ):
+            self.last_refresh["skipped"] = [
+                self.column_by_id[col_id].name
+                for col_id in self.column_widget_controller_by_id
+            ]
+            return
+
         new_dataframe = self.pipeline.execute(self.dataframe, up_to_step=step)
+        refreshed_col_ids = []
         for (
             col_id,
             col_widget_controller,
         ) in self.column_widget_controller_by_id.items():
-            col_widget_controller.load_data(
-                new_dataframe[self.column_by_id[col_id].name],
-                new_dataframe,
-                step,
-            )
+            colname = self.column_by_id[col_id].name
+
+            if col_id in self._collapsed_col_ids:
+                self.last_refresh["skipped"].append(colname)
+                continue
+
+            if (
+                changed_columns is None
+                or colname in changed_columns
+                or col_id in self._unrefreshed_col_ids
+            ):
+                col_widget_controller.load_data(
+                    new_dataframe[colname], new_dataframe, step
+                )
+            elif step_changed:
+                # the column is unchanged, but its controls depend on
+                # which step is being modified
+                col_widget_controller.step_being_modified = step
+            else:
+                self.last_refresh["skipped"].append(colname)
+                continue
+
             col_widget_controller.render_widget()
-        self._dataframe_widget_controller.render_widget(new_dataframe, step)
+            self.last_refresh["refreshed"].append(colname)
+            refreshed_col_ids.append(col_id)
+
+        self._dataframe_widget_controller.render_widget(
+            new_dataframe,
+            step,
+            refresh_rbm=changed_columns is None or step_changed,
+            version=self.pipeline.version(self.dataframe, step),
+        )
+
+        self._shown_steps = steps
+        self._shown_step = step
+        self._unrefreshed_col_ids = set()
+
+        # tracked once refreshed, as collapsed widgets may be evicted
+        for col_id in refreshed_col_ids:
+            self._track_column_widget(col_id)
+        self._track_pipeline_cache()
 
     def _new_step(self, new_step):
         self.pipeline.append(new_step)
@@ -0,0 +1,121 @@
+from collections import OrderedDict
+
+# The default budget for the memory held by the samples and widgets of all
+# DataFrames
+MEMORY_BUDGET = 256 * 2**20
+
+
+def figure_nbytes(fig):
+    """Approximate the memory held by the RGBA raster of a figure"""
+
+    width, height = fig.get_size_inches() * fig.dpi
+
+    return int(width * height * 4)
+
+
+class MemoryAccountant(object):
+    """
+    Accounts for the memory held by widget state under a byte budget.
+
+    Entries are kept in least recently used order. Entries tracked without
+    an evict function, such as DataFrame samples and the state of open
+    widgets, are counted but never evicted. While over budget, the other
+    entries are evicted, least recently used first, by calling their evict
+    function.
+
+    Parameters
+    ----------
+    max_bytes : int, optional
+        The budget, by default MEMORY_BUDGET.
+    """
+
+    def __init__(self, max_bytes=None):
+        self.max_bytes = MEMORY_BUDGET if max_bytes is None else max_bytes
+        self.nbytes = 0
+        self.evictions = 0
+        self._entries = OrderedDict()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, key):
+        return key in self._entries
+
+    def track(self, key, nbytes, evict=None, group=None):
+        """
+        Record the memory held for key, as the most recently used.
+
+        Parameters
+        ----------
+        key : hashable
+            Identifies the state, replacing any entry with the same key.
+        nbytes : int
+            The memory held by the state.
+        evict : callable, optional
+            Frees the state once evicted. The entry is never evicted if
+            not given.
+        group : hashable, optional
+            The owner of the state, such as a DataFrame, used to forget
+            and report its entries together.
+        """
+
+        self.forget(key)
+
+        self._entries[key] = (nbytes, evict, group)
+        self.nbytes += nbytes
+
+        self._evict()
+
+    def forget(self, key):
+        """Stop accounting for key, without evicting it"""
+
+        if key in self._entries:
+            self.nbytes -= self._entries.pop(key)[0]
+
+    def forget_group(self, group):
+        """Stop accounting for every entry of group"""
+
+        for key in [
+            key
+            for key, (_, _, entry_group) in self._entries.items()
+            if entry_group == group
+        ]:
+            self.forget(key)
+
+    def group_nbytes(self, group):
+        """The memory held by the entries of group"""
+
+        return sum(
+            nbytes
+            for nbytes, _, entry_group in self._entries.values()
+            if entry_group == group
+        )
+
+    def _evict(self):
+        evictable = [
+            key
+            for key, (_, evict, _) in self._entries.items()
+            if evict is not None
+        ]
+
+        for key in evictable:
+            if self.nbytes <= self.max_bytes:
+                break
+
+            # an evict function may itself forget other entries
+            if key not in self._entries:
+                continue
+
+            evict = self._entries[key][1]
+            self.forget(key)
+            self.evictions += 1
+            evict()
+
+    def stats(self):
+        """Return the accountant counters, e.g. for diagnostics"""
+        return {
+            "entries": len(self._entries),
+            "evictions": self.evictions,
+            "nbytes": self.nbytes,
+            "max_bytes": self.max_bytes,
+        }
@@ -0,0 +1,184 @@
+import numpy as np
+
+
+class PipelinePlan(object):
+    """The steps a pipeline will execute, after optimisation"""
+
+    def __init__(self, steps, notes):
+        self.steps = steps
+        self.notes = notes
+
+    def explain(self):
+        """Return a human readable description of the plan"""
+
+        lines = []
+
+        for i, step in enumerate(self.steps, 1):
+            lines.append("{0}. {1}".format(i, step.description))
+
+        if not self.steps:
+            lines.append("No steps to execute.")
+
+        if self.notes:
+            lines.append("")
+            lines.append("Optimisations:")
+            lines.extend("- " + note for note in self.notes)
+
+        return "\n".join(lines)
+
+
+def _remove_no_ops(steps, notes):
+    planned = []
+
+    for step in steps:
+        if step.is_no_op:
+            notes.append("Removed no-op step: " + step.description)
+        else:
+            planned.append(step)
+
+    return planned
+
+
+def _remove_repeats(steps, notes):
+    """Remove idempotent steps repeating the last step on their columns"""
+
+    planned = []
+
+    for step in steps:
+        columns = set(step.input_columns) | set(step.output_columns)
+        previous = None
+
+        for earlier in reversed(planned):
+            if columns & (
+                set(earlier.input_columns) | set(earlier.output_columns)
+            ):
+                previous = earlier
+                break
+
+        if (
+            previous is not None
+            and step.is_idempotent
+            and previous.fingerprint == step.fingerprint
+        ):
+            notes.append("Removed repeated step: " + step.description)
+        else:
+            planned.append(step)
+
+    return planned
+
+
+def keeps_dtypes(step, dtypes):
+    """
+    Whether the step leaves the dtypes of its columns as they are.
+
+    Writing values into a float64 or object column never changes its
+    dtype, whereas e.g. an int column is upcast, or an object column
+    filled with fillna is inferred again, depending on which rows are
+    present.
+
+    Parameters
+    ----------
+    step : DataCleanStepBase
+        The step.
+    dtypes : mapping
+        The dtype of each column of the dataframe the step runs on.
+    """
+
+    for colname in step.output_columns:
+        dtype = dtypes.get(colname)
+
+        # np.dtype compares equal to None, the dtype of unknown columns
+        if dtype is None:
+            return False
+        if dtype == np.dtype(np.float64):
+            if step.infers_dtype:
+                return False
+        elif dtype == np.dtype(object):
+            if step.infers_object_dtype:
+                return False
+        else:
+            return False
+
+    return True
+
+
+def _hoist_row_drops(steps, notes, dtypes):
+    """Move row dropping steps before steps they do not depend on"""
+
+    planned = []
+    # whether each planned step keeps the dtypes of the columns it writes,
+    # as they are before it runs
+    keeps_planned = []
+    dtypes = dict(dtypes)
+
+    for step in steps:
+        position = len(planned)
+
+        if step.drops_rows:
+            # a step can be passed if its result for each row and the dtype
+            # of its result are unaffected by other rows being removed, and
+            # it does not write the columns deciding which rows are dropped
+            while position > 0:
+                earlier = planned[position - 1]
+                if (
+                    earlier.drops_rows
+                    or not earlier.is_row_local
+                    or not keeps_planned[position - 1]
+                    or set(earlier.output_columns) & set(step.input_columns)
+                ):
+                    break
+                position -= 1
+
+            if position < len(planned):
+                notes.append(
+                    "Moved row dropping step before {0} other step(s): "
+                    "{1}".format(len(planned) - position, step.description)
+                )
+
+        keeps = keeps_dtypes(step, dtypes)
+        if not keeps:
+            for colname in step.output_columns:
+                dtypes.pop(colname, None)
+
+        planned.insert(position, step)
+        keeps_planned.insert(position, keeps)
+
+    return planned
+
+
+def plan(steps, dtypes=None):
+    """
+    Optimise the execution of a sequence of cleaning steps.
+
+    Steps with no effect are removed, as are idempotent steps repeating the
+    previous step on the same column. Row dropping steps are moved ahead of
+    earlier steps whose results, including their dtypes, are unaffected by
+    removing other rows, so fewer rows are processed.
+
+    Steps are never removed for being overwritten by a later step, as
+    every step only replaces the values of its columns which it selects,
+    keeping the others.
+
+    Parameters
+    ----------
+    steps : list of DataCleanStepBase
+        The pipeline steps, in order.
+    dtypes : mapping, optional
+        The dtype of each column of the dataframe the steps will run on.
+        Row dropping steps are only moved if these are given.
+
+    Returns
+    -------
+    PipelinePlan
+        The steps to execute with notes on the optimisations made.
+    """
+
+    notes = []
+
+    planned = _remove_no_ops(steps, notes)
+    planned = _remove_repeats(planned, notes)
+    planned = _hoist_row_drops(
+        planned, notes, {} if dtypes is None else dtypes
+    )
+
+    return PipelinePlan(planned, notes)
@@ -1,46 +1,221 @@
+import copy
 from abc import ABCMeta, abstractproperty
 
 import boltzmannclean
+import numpy as np
+import pandas as pd
 
 import dataclean.codegen as codegen
+import dataclean.optimizer as optimizer
+from dataclean.cache import PrefixCache, dataframe_nbytes, freeze
 from dataclean.cleaning import (
+    DTYPE_INFERRING_METHODS,
+    FIT_STATISTICS,
+    IDEMPOTENT_METHODS,
+    NO_OP_METHODS,
     OUTLIER_REMOVAL_METHODS,
+    OUTLIER_REMOVAL_TRANSFORMS,
     NULL_REMOVAL_METHODS,
+    NULL_REMOVAL_TRANSFORMS,
+    OBJECT_DTYPE_INFERRING_METHODS,
+    ROW_DROPPING_METHODS,
+    ROW_LOCAL_METHODS,
+    SAMPLING_METHODS,
     TYPE_CONVERT_METHODS,
+    TYPE_CONVERT_TRANSFORMS,
+    NullRemovalMethod,
+    TypeConvertMethod,
+)
+from dataclean.kernels import (
+    IN_RANGE,
+    classify_outliers,
+    instance_mask,
+    numeric_mask,
 )
 
 
-class DataCleanStepBase(object):
-    """Base class for a cleaning step to be applied to a dataframe"""
+# Before pandas 2, a shallow copy with a column replaced by isetitem may
+# still copy the other columns, or write into arrays shared with the original
+SHARES_UNWRITTEN_COLUMNS = int(pd.__version__.split(".")[0]) >= 2
+
+
+def copy_on_write(dataframe, colnames):
+    """Copy dataframe, sharing the data of all but the colnames columns"""
+
+    if not SHARES_UNWRITTEN_COLUMNS:
+        return dataframe.copy()
+
+    new_dataframe = dataframe.copy(deep=False)
+
+    for colname in colnames:
+        if colname in new_dataframe.columns:
+            new_dataframe.isetitem(
+                new_dataframe.columns.get_loc(colname),
+                dataframe[colname].copy(),
+            )
+
+    return new_dataframe
+
+
+def fit_steps(steps, dataframe):
+    """
+    Fits each of steps to dataframe as cleaned by the steps before it.
 
-    __metaclass__ = ABCMeta
+    Returns the number of leading steps applied to fit the later ones,
+    and dataframe as cleaned by them, which leaves dataframe unchanged.
+    """
+
+    data_steps = [i for i, step in enumerate(steps) if step.fits_to_data]
+    n_applied = data_steps[-1] if data_steps else 0
+
+    new_dataframe = dataframe
+
+    for i, step in enumerate(steps):
+        step.fit(new_dataframe)
+        # the output of the later steps is not needed for fitting
+        if i < n_applied:
+            new_dataframe = step.execute(new_dataframe, preview=True)
+            # avoids the unnecessary pandas SettingWithCopy warning
+            new_dataframe.is_copy = False
+
+    return n_applied, new_dataframe
+
+
+class DataCleanStepBase(metaclass=ABCMeta):
+    """Base class for a cleaning step to be applied to a dataframe"""
 
     def __init__(self, **params):
         self.params = params
+        # parameters computed by fit, None until the step is fitted
+        self.fitted_params = None
 
     @abstractproperty
     def cleaning_function(self):
         pass
 
-    def execute(self, dataframe, preview=True):
-        return self.cleaning_function(
-            dataframe.copy() if preview else dataframe, **self.params
+    @property
+    def transform_function(self):
+        """Return the function applying the fitted parameters"""
+        return self.cleaning_function
+
+    def fit_values(self, dataframe):
+        """Return the values the statistic of the step is computed from"""
+        return dataframe[self.colname]
+
+    def fit(self, dataframe):
+        """Compute and store the values the step replaces data with"""
+
+        statistic = FIT_STATISTICS.get(self.replacement_method)
+
+        if statistic is None:
+            self.fitted_params = {}
+        else:
+            self.fitted_params = statistic(
+                self.fit_values(dataframe), self.params.get("random_state")
+            )
+
+        return self
+
+    def unfit(self):
+        """Discard the fitted parameters"""
+        self.fitted_params = None
+
+    @property
+    def is_fitted(self):
+        return self.fitted_params is not None
+
+    @property
+    def fits_to_data(self):
+        """Whether the fitted parameters depend on the data"""
+        return self.replacement_method in FIT_STATISTICS
+
+    def _function_and_params(self):
+        if self.fitted_params is None:
+            return self.cleaning_function, self.params
+
+        params = dict(self.params)
+        params.update(self.fitted_params)
+
+        return self.transform_function, params
+
+    @property
+    def input_columns(self):
+        """Return the names of the dataframe columns the step reads"""
+        return [self.colname]
+
+    @property
+    def output_columns(self):
+        """Return the names of the dataframe columns the step writes to"""
+        return [self.colname]
+
+    @property
+    def is_no_op(self):
+        return self.replacement_method in NO_OP_METHODS
+
+    @property
+    def drops_rows(self):
+        return self.replacement_method in ROW_DROPPING_METHODS
+
+    @property
+    def is_row_local(self):
+        """Whether the result for a row depends only on that row"""
+        if self.replacement_method in ROW_LOCAL_METHODS:
+            return True
+
+        # fitted statistics no longer depend on the other rows
+        return (
+            self.is_fitted and self.replacement_method not in SAMPLING_METHODS
         )
 
+    @property
+    def is_idempotent(self):
+        """Whether repeating the step straight after itself has no effect"""
+        return self.replacement_method in IDEMPOTENT_METHODS
+
+    @property
+    def infers_dtype(self):
+        """Whether the dtype of the columns written depends on the values"""
+        return self.replacement_method in DTYPE_INFERRING_METHODS
+
+    @property
+    def infers_object_dtype(self):
+        """Whether the dtype of object columns written depends on values"""
+        return self.replacement_method in OBJECT_DTYPE_INFERRING_METHODS
+
+    @property
+    def fingerprint(self):
+        """Return a hashable value identifying the step by its settings"""
+        return (
+            type(self).__name__,
+            getattr(self, "replacement_method", None),
+            freeze(self.params),
+            freeze(self.fitted_params),
+        )
+
+    def execute(self, dataframe, preview=True):
+        if preview:
+            dataframe = copy_on_write(dataframe, self.output_columns)
+
+        function, params = self._function_and_params()
+
+        return function(dataframe, **params)
+
     @abstractproperty
     def description(self):
         """Return a human readable brief description of the step"""
         pass
 
     def render_code(self):
+        function, params = self._function_and_params()
+
         return codegen.render_code(
-            function=self.cleaning_function,
-            code_comment=self.description,
-            **self.params
+            function=function, code_comment=self.description, **params
         )
 
     def required_import_statements(self):
-        return codegen.get_module_dependencies(self.cleaning_function)
+        function, _ = self._function_and_params()
+
+        return codegen.get_module_dependencies(function)
 
 
 class OutlierRemovalStep(DataCleanStepBase):
@@ -57,6 +232,18 @@ class OutlierRemovalStep(DataCleanStepBase):
     def cleaning_function(self):
         return OUTLIER_REMOVAL_METHODS[self.replacement_method]
 
+    @property
+    def transform_function(self):
+        return OUTLIER_REMOVAL_TRANSFORMS.get(
+            self.replacement_method, self.cleaning_function
+        )
+
+    def fit_values(self, dataframe):
+        col = dataframe[self.colname]
+        codes = classify_outliers(col, self.low_cut, self.high_cut)
+
+        return col.loc[codes == IN_RANGE]
+
     @property
     def description(self):
         description = (
@@ -84,6 +271,21 @@ class NullRemovalStep(DataCleanStepBase):
     def cleaning_function(self):
         return NULL_REMOVAL_METHODS[self.replacement_method]
 
+    @property
+    def transform_function(self):
+        return NULL_REMOVAL_TRANSFORMS.get(
+            self.replacement_method, self.cleaning_function
+        )
+
+    def fit_values(self, dataframe):
+        col = dataframe[self.colname]
+
+        if self.replacement_method == NullRemovalMethod.MODE:
+            return col
+        if self.replacement_method == NullRemovalMethod.SAMPLE:
+            return col.loc[col.notnull() & numeric_mask(col)]
+        return col.loc[numeric_mask(col)]
+
     @property
     def description(self):
         description = (
@@ -109,6 +311,21 @@ class TypeConversionStep(DataCleanStepBase):
     def cleaning_function(self):
         return TYPE_CONVERT_METHODS[self.replacement_method]
 
+    @property
+    def transform_function(self):
+        return TYPE_CONVERT_TRANSFORMS.get(
+            self.replacement_method, self.cleaning_function
+        )
+
+    def fit_values(self, dataframe):
+        col = dataframe[self.colname]
+
+        if self.replacement_method == TypeConvertMethod.MODE:
+            return col.loc[instance_mask(col, self.data_type)]
+        if self.replacement_method == TypeConvertMethod.SAMPLE:
+            return col.loc[col.notnull() & numeric_mask(col)]
+        return col.loc[numeric_mask(col)]
+
     @property
     def description(self):
         description = (
@@ -135,11 +352,189 @@ class RbmStep(DataCleanStepBase):
     def cleaning_function(self):
         return boltzmannclean.clean
 
+    @property
+    def input_columns(self):
+        return self.numerical_columns + self.categorical_columns
+
+    @property
+    def output_columns(self):
+        return self.numerical_columns + self.categorical_columns
+
+    @property
+    def is_no_op(self):
+        return not self.output_columns
+
+    @property
+    def drops_rows(self):
+        return False
+
+    @property
+    def is_row_local(self):
+        return False
+
+    @property
+    def fits_to_data(self):
+        return True
+
+    @property
+    def is_idempotent(self):
+        return False
+
+    @property
+    def infers_dtype(self):
+        return True
+
+    @property
+    def infers_object_dtype(self):
+        return True
+
+    def fit(self, dataframe):
+        """
+        Train the RBM and store the encoding of the columns.
+
+        As in boltzmannclean.clean, numerical columns are only used if
+        some values are numeric and they do not have a bool or other non
+        numeric dtype, so the rest are left unchanged. Unlike it, numerical
+        columns with only null values are left unchanged rather than
+        failing.
+        """
+
+        numerical_columns = [
+            colname
+            for colname in self.numerical_columns
+            if self._has_numeric_values(dataframe[colname])
+        ]
+        numerics = self._numeric_values(dataframe, numerical_columns)
+
+        data_min = np.fmin.reduce(numerics, axis=0, initial=np.inf)
+        data_range = (
+            np.fmax.reduce(numerics, axis=0, initial=-np.inf) - data_min
+        )
+
+        # as for a min max scaler, columns of one value are left unscaled,
+        # and imputing means first would not change the extremes
+        self.fitted_params = {
+            "numerical_columns": numerical_columns,
+            "data_min": data_min,
+            "data_range": np.where(data_range > 0, data_range, 1.0),
+            "categories": [
+                pd.Categorical(dataframe[colname].dropna()).categories.tolist()
+                for colname in self.categorical_columns
+            ],
+            "rbm": None,
+        }
+
+        array = self._encode(dataframe)
+
+        if array.size > 0:
+            self.fitted_params["rbm"] = boltzmannclean.train_rbm(
+                array, tune_hyperparameters=True
+            )
+
+        return self
+
+    @staticmethod
+    def _has_numeric_values(column):
+        dtype = column.dtype
+
+        if dtype == object:
+            return pd.to_numeric(column, errors="coerce").notnull().any()
+
+        return (
+            pd.api.types.is_numeric_dtype(dtype)
+            and not pd.api.types.is_bool_dtype(dtype)
+            and column.notnull().any()
+        )
+
+    @staticmethod
+    def _numeric_values(dataframe, numerical_columns):
+        """Numerical columns as floats, with nan for non-numeric values"""
+
+        numerics = (
+            dataframe[numerical_columns]
+            .apply(pd.to_numeric, errors="coerce")
+            .to_numpy(dtype=float, na_value=np.nan)
+            .reshape(len(dataframe), len(numerical_columns))
+        )
+        numerics[~np.isfinite(numerics)] = np.nan
+
+        return numerics
+
+    def _encode(self, dataframe):
+        """Scale and one hot encode the columns using the fitted encoding"""
+
+        numerics = self._numeric_values(
+            dataframe, self.fitted_params["numerical_columns"]
+        )
+        encoded = [
+            (numerics - self.fitted_params["data_min"])
+            / self.fitted_params["data_range"]
+        ]
+
+        for colname, categories in zip(
+            self.categorical_columns, self.fitted_params["categories"]
+        ):
+            codes = pd.Categorical(
+                dataframe[colname], categories=categories
+            ).codes
+            one_hot = (codes[:, None] == np.arange(len(categories))).astype(
+                float
+            )
+            one_hot[codes == -1] = np.nan
+            encoded.append(one_hot)
+
+        return np.hstack(encoded)
+
+    def _transform(self, dataframe):
+        """Fill missing values with the fitted RBM"""
+
+        rbm = self.fitted_params["rbm"]
+        if rbm is None:
+            return dataframe
+
+        array = self._encode(dataframe)
+        imputed = rbm.transform(array)
+
+        numerical_columns = self.fitted_params["numerical_columns"]
+        n_numerical = len(numerical_columns)
+        numerics = (
+            imputed[:, :n_numerical] * self.fitted_params["data_range"]
+            + self.fitted_params["data_min"]
+        )
+
+        for i, colname in enumerate(numerical_columns):
+            missing = np.isnan(array[:, i])
+            if missing.any():
+                values = numerics[missing, i]
+                # truncated as by the cast to the column dtype in clean
+                if pd.api.types.is_integer_dtype(dataframe[colname].dtype):
+                    values = np.trunc(values)
+                dataframe.loc[missing, colname] = values
+
+        start = n_numerical
+        for colname, categories in zip(
+            self.categorical_columns, self.fitted_params["categories"]
+        ):
+            stop = start + len(categories)
+            missing = dataframe[colname].isnull().values
+            if categories and missing.any():
+                choices = imputed[missing, start:stop].argmax(axis=1)
+                dataframe.loc[missing, colname] = np.asarray(
+                    categories, dtype=object
+                )[choices]
+            start = stop
+
+        return dataframe
+
     def execute(self, dataframe, preview=True):
+        if preview:
+            dataframe = copy_on_write(dataframe, self.output_columns)
+
+        if self.is_fitted:
+            return self._transform(dataframe)
+
         return self.cleaning_function(
-            dataframe.copy() if preview else dataframe,
-            tune_rbm=not preview,
-            **self.params
+            dataframe, tune_rbm=not preview, **self.params
         )
 
     @property
@@ -153,6 +548,7 @@ class RbmStep(DataCleanStepBase):
         return description
 
     def render_code(self):
+        # a trained RBM cannot be written as code, so it is trained again
         return codegen.render_code(
             function=self.cleaning_function,
             tune_rbm=True,
@@ -160,33 +556,166 @@ class RbmStep(DataCleanStepBase):
             **self.params
         )
 
+    def required_import_statements(self):
+        return codegen.get_module_dependencies(self.cleaning_function)
+
 
 class Pipeline(object):
     """Keeps track of which cleaning step the user wishes to apply."""
 
-    def __init__(self):
+    # memory budget for caching the preview result after each step
+    CACHE_MAX_BYTES = 256 * 2**20
+
+    def __init__(self, cache_max_bytes=None):
         self.steps = []
+        self.cache = PrefixCache(
+            self.CACHE_MAX_BYTES
+            if cache_max_bytes is None
+            else cache_max_bytes
+        )
 
     def append(self, step):
         self.steps.append(step)
 
+    def copy(self):
+        """Returns a pipeline of copies of the steps, with an empty cache"""
+
+        pipeline = Pipeline(self.cache.max_bytes)
+        pipeline.steps = [copy.deepcopy(step) for step in self.steps]
+
+        return pipeline
+
     def remove(self, step):
+        index = self.steps.index(step)
         self.steps.remove(step)
+        self._unfit_from(index)
 
     def replace(self, old_step, new_step):
         if old_step in self.steps:
             index = self.steps.index(old_step)
             self.steps.remove(old_step)
             self.steps.insert(index, new_step)
+            self._unfit_from(index + 1)
 
-    def execute(self, dataframe, up_to_step=None, preview=True):
-        """Executes the current pipeline up to up_to_step on dataframe"""
+    def _unfit_from(self, index):
+        # later steps were fitted to the output of the steps now changed
+        for step in self.steps[index:]:
+            step.unfit()
 
-        new_dataframe = dataframe
+    @property
+    def is_fitted(self):
+        return all(step.is_fitted for step in self.steps)
+
+    def fit(self, dataframe):
+        """Fits each step to dataframe as cleaned by the steps before it"""
+        fit_steps(self.steps, dataframe)
+        return self
+
+    def fit_transform(self, dataframe, executor=None):
+        """Fits the pipeline to dataframe and returns it cleaned"""
+
+        if executor is not None:
+            return executor.execute(
+                self.steps, dataframe.copy(), preview=False, fit=True
+            )
+
+        new_dataframe = dataframe.copy()
 
+        for step in self.steps:
+            new_dataframe = self._execute_steps(
+                [step.fit(new_dataframe)], new_dataframe, preview=False
+            )
+
+        return new_dataframe
+
+    def transform(self, dataframe, executor=None):
+        """Cleans dataframe using the values fitted by fit"""
+
+        if not self.is_fitted:
+            raise ValueError("The pipeline must be fitted before transform")
+
+        return self.execute(dataframe.copy(), preview=False, executor=executor)
+
+    def _steps_before(self, up_to_step):
+        steps = []
         for step in self.steps:
             if step is up_to_step:
                 break
+            steps.append(step)
+
+        return steps
+
+    def version(self, dataframe, up_to_step=None):
+        """Returns a hashable value identifying a preview of dataframe"""
+        return (id(dataframe),) + tuple(
+            step.fingerprint for step in self._steps_before(up_to_step)
+        )
+
+    def plan(self, up_to_step=None, dtypes=None):
+        """Returns the optimised steps run by a full execution"""
+        return optimizer.plan(self._steps_before(up_to_step), dtypes)
+
+    def explain(self, up_to_step=None, dtypes=None):
+        """Returns a description of the steps run by a full execution"""
+        return self.plan(up_to_step, dtypes).explain()
+
+    def execute(self, dataframe, up_to_step=None, preview=True, executor=None):
+        """
+        Executes the current pipeline up to up_to_step on dataframe.
+
+        Previews leave dataframe unchanged and cache their result after each
+        step. Full executions modify dataframe, running the steps of
+        the optimised plan, concurrently if an executor such as a
+        scheduler.ThreadPoolStepExecutor is given.
+        """
+
+        steps = self._steps_before(up_to_step)
+
+        if executor is not None:
+            if not preview:
+                steps = self.plan(up_to_step, dataframe.dtypes).steps
+            return executor.execute(steps, dataframe, preview)
+
+        if not preview:
+            return self._execute_steps(
+                self.plan(up_to_step, dataframe.dtypes).steps,
+                dataframe,
+                preview,
+            )
+
+        # previews are cached after every step, so only the steps after the
+        # longest unchanged prefix of the pipeline need to be run again
+        keys = [(id(dataframe),)]
+        for step in steps:
+            keys.append(keys[-1] + (step.fingerprint,))
+
+        new_dataframe = dataframe
+        start = 0
+
+        for i in range(len(steps), 0, -1):
+            cached = self.cache.get(keys[i])
+            # the source dataframe is kept so its id is not reused
+            if cached is not None and cached[0] is dataframe:
+                new_dataframe = cached[1]
+                start = i
+                break
+
+        for i in range(start, len(steps)):
+            new_dataframe = self._execute_steps(
+                [steps[i]], new_dataframe, preview
+            )
+            self.cache.put(
+                keys[i + 1],
+                (dataframe, new_dataframe),
+                dataframe_nbytes(new_dataframe),
+            )
+
+        return new_dataframe
+
+    def _execute_steps(self, steps, dataframe, preview):
+        new_dataframe = dataframe
+
+        for step in steps:
             new_dataframe = step.execute(new_dataframe, preview)
             # avoids the unnecessary pandas SettingWithCopy warning
             new_dataframe.is_copy = False
@@ -0,0 +1,238 @@
+from collections import OrderedDict
+from html import escape
+
+import numpy as np
+
+# Rows of a preview shown on each page
+PAGE_ROWS = 8
+
+# Rows and columns of a DataFrame preview rendered in each block
+BLOCK_ROWS = 20
+BLOCK_COLUMNS = 8
+
+# Most rendered blocks of a DataFrame preview kept
+BLOCK_CACHE_SIZE = 64
+
+
+def preview_text(values):
+    """The text shown for each element of a column or index"""
+    return np.asarray(values, dtype=object).astype(str)
+
+
+def page_count(n_rows, page_rows=PAGE_ROWS):
+    """The number of pages needed to show n_rows, at least one"""
+    return max(-(-n_rows // page_rows), 1)
+
+
+class ColumnPreview(object):
+    """
+    The rows of a column before and after a step, shown a page at a time.
+
+    Only the text of each element is kept, and a page is rendered to HTML
+    as it is shown, so the cost of a preview does not grow with the number
+    of rows shown.
+
+    Parameters
+    ----------
+    column : pd.Series
+        The column before the step.
+    col_modified : pd.Series, optional
+        The column after the step, which may have dropped rows.
+
+    Attributes
+    ----------
+    index, before, after : np.array of str
+        The text of each row label, and element before and after the step.
+        Rows dropped by the step are empty after it.
+    changed : np.array of bool
+        Marks the rows shown differently after the step.
+    """
+
+    def __init__(self, column, col_modified=None):
+        self.index = preview_text(column.index)
+        self.before = preview_text(column)
+
+        if col_modified is None:
+            self.after = self.before
+            self.changed = np.zeros(len(column), dtype=bool)
+        else:
+            kept = np.asarray(column.index.isin(col_modified.index))
+
+            after = np.full(len(column), "", dtype=object)
+            after[kept] = preview_text(
+                col_modified.reindex(column.index[kept])
+            )
+
+            self.after = after.astype(str)
+            self.changed = ~kept | (self.after != self.before)
+
+    @property
+    def nbytes(self):
+        """Approximate the memory held by the preview"""
+        return (
+            self.index.nbytes
+            + self.before.nbytes
+            + self.after.nbytes
+            + self.changed.nbytes
+        )
+
+    def rows(self, changed_only=True):
+        """The positions of the rows shown, by default the changed ones"""
+
+        if changed_only:
+            return np.flatnonzero(self.changed)
+
+        return np.arange(len(self.before))
+
+    def page_html(self, rows):
+        """Render a table of the before and after text of rows"""
+
+        body = "".join(
+            "<tr><th>{}</th><td>{}</td><td>{}</td></tr>".format(
+                escape(self.index[row]),
+                escape(self.before[row]),
+                escape(self.after[row]),
+            )
+            for row in rows
+        )
+
+        return (
+            '<table class="table"><thead><tr><th></th><th>before</th>'
+            "<th>after</th></tr></thead><tbody>" + body + "</tbody></table>"
+        )
+
+
+class DataFramePreview(object):
+    """
+    A window over a DataFrame, rendered a block of rows and columns at once.
+
+    Only the block shown is rendered, so the cost of showing a preview
+    does not grow with the size of the DataFrame. Rendered blocks are
+    cached by the version of the DataFrame they show, such as the steps of
+    the pipeline it was cleaned with, so returning to a block or version
+    does not render it again.
+
+    Parameters
+    ----------
+    block_rows, block_columns : int, optional
+        The number of rows and columns in each block.
+    cache_size : int, optional
+        The most rendered blocks kept.
+    """
+
+    def __init__(
+        self,
+        block_rows=BLOCK_ROWS,
+        block_columns=BLOCK_COLUMNS,
+        cache_size=BLOCK_CACHE_SIZE,
+    ):
+        self.block_rows = block_rows
+        self.block_columns = block_columns
+        self.cache_size = cache_size
+
+        self.dataframe = None
+        self.version = None
+        self.row_block = 0
+        self.column_block = 0
+        self._blocks = OrderedDict()
+
+    @property
+    def n_row_blocks(self):
+        return page_count(len(self.dataframe), self.block_rows)
+
+    @property
+    def n_column_blocks(self):
+        return page_count(self.dataframe.shape[1], self.block_columns)
+
+    def load(self, dataframe, version=None):
+        """
+        Show dataframe, staying on the current block where possible.
+
+        Blocks are only cached for a dataframe with a version, a hashable
+        value which must differ for DataFrames with different values.
+        """
+
+        self.dataframe = dataframe
+        self.version = version
+        self.move()
+
+    def move(self, rows=0, columns=0):
+        """Move the window by a number of blocks of rows and columns"""
+
+        self.row_block = min(
+            max(self.row_block + rows, 0), self.n_row_blocks - 1
+        )
+        self.column_block = min(
+            max(self.column_block + columns, 0), self.n_column_blocks - 1
+        )
+
+    def bounds(self):
+        """The first and last rows and columns shown, and their numbers"""
+
+        first_row = self.row_block * self.block_rows
+        first_column = self.column_block * self.block_columns
+        n_rows, n_columns = self.dataframe.shape
+
+        return (
+            (first_row, min(first_row + self.block_rows, n_rows), n_rows),
+            (
+                first_column,
+                min(first_column + self.block_columns, n_columns),
+                n_columns,
+            ),
+        )
+
+    def block_html(self):
+        """Render the block shown, reusing it if already rendered"""
+
+        key = (self.version, self.row_block, self.column_block)
+
+        if self.version is not None and key in self._blocks:
+            self._blocks.move_to_end(key)
+            return self._blocks[key]
+
+        html = self._render_block()
+
+        if self.version is not None:
+            self._blocks[key] = html
+            while len(self._blocks) > self.cache_size:
+                self._blocks.popitem(last=False)
+
+        return html
+
+    def _render_block(self):
+        (first_row, last_row, _), (first_column, last_column, _) = (
+            self.bounds()
+        )
+        block = self.dataframe.iloc[
+            first_row:last_row, first_column:last_column
+        ]
+
+        header = "".join(
+            "<th>{}</th>".format(escape(str(colname)))
+            for colname in block.columns
+        )
+        columns = [
+            preview_text(block.iloc[:, i]) for i in range(block.shape[1])
+        ]
+        index = preview_text(block.index)
+
+        body = "".join(
+            "<tr><th>{}</th>{}</tr>".format(
+                escape(index[row]),
+                "".join(
+                    "<td>{}</td>".format(escape(column[row]))
+                    for column in columns
+                ),
+            )
+            for row in range(len(block))
+        )
+
+        return (
+            '<table class="table"><thead><tr><th></th>' + header + "</tr>"
+            "</thead><tbody>" + body + "</tbody></table>"
+        )
+
+    def clear(self):
+        """Forget the rendered blocks, e.g. once versions may be reused"""
+        self._blocks.clear()
@@ -0,0 +1,450 @@
+import numpy as np
+import pandas as pd
+from pandas.util import hash_array, hash_pandas_object
+
+from dataclean.kernels import NUMERIC_TYPES, object_values, scalar_type
+
+# Number of evenly spaced values hashed to detect changes to a column
+FINGERPRINT_SAMPLES = 64
+
+
+def column_fingerprint(column):
+    """
+    Cheaply identify the state of the data in a column.
+
+    The fingerprint combines the length, dtype and memory location of the
+    column data with a hash of a fixed number of evenly spaced values. It
+    changes when a column is replaced or resized, or has any of the
+    sampled values modified, without scanning the whole column.
+
+    Values modified in place outside the sample, e.g. by
+    fillna(inplace=True) or an assignment through .loc, leave the
+    fingerprint unchanged, so caches keyed by it must be cleared once a
+    column may have been modified in place.
+
+    Parameters
+    ----------
+    column : pd.Series
+        The column to fingerprint.
+
+    Returns
+    -------
+    tuple
+        A hashable value, equal for two calls only if the column appears
+        unchanged.
+    """
+
+    values = column.values
+
+    if isinstance(values, np.ndarray):
+        location = values.__array_interface__["data"][0]
+    else:
+        location = id(values)
+
+    positions = np.linspace(
+        0, len(values) - 1, min(len(values), FINGERPRINT_SAMPLES)
+    ).astype(int)
+    sampled = np.asarray(values[positions], dtype=object)
+
+    return (
+        len(values),
+        str(column.dtype),
+        location,
+        hash(hash_array(sampled, categorize=False).tobytes()),
+    )
+
+
+def describe_columns(dataframe, approximate=False, distinct_cache=None):
+    """
+    Summarise the columns of a dataframe for the DataFrame listing.
+
+    Null counts and distinct counts for every column are computed in one
+    vectorised call each, rather than one value_counts per column.
+
+    Parameters
+    ----------
+    dataframe : pd.DataFrame
+        The columns to describe.
+    approximate : bool, optional
+        Estimate distinct counts with a HyperLogLog sketch and null
+        percentages from sampled blocks of rows, with error bounds.
+    distinct_cache : dict, optional
+        Distinct counts by column name from earlier calls, reused for
+        columns with an unchanged fingerprint and updated in place. Null
+        counts are cheap, so are always computed afresh.
+
+    Returns
+    -------
+    list of dict
+        A description of each column in order, with its dtype, percentage
+        of null values and number of distinct non-null values.
+    """
+
+    if approximate:
+        distinct_counts = _distinct_counts(
+            dataframe,
+            lambda columns: [
+                approximate_distinct(column) for _, column in columns.items()
+            ],
+            distinct_cache,
+            approximate,
+        )
+
+        return [
+            _describe_column_approximately(column, distinct, distinct_error)
+            for (_, column), (distinct, distinct_error) in zip(
+                dataframe.items(), distinct_counts
+            )
+        ]
+
+    n_rows = len(dataframe)
+    null_counts = dataframe.isnull().sum().values
+    distinct_counts = _distinct_counts(
+        dataframe,
+        lambda columns: columns.nunique().values,
+        distinct_cache,
+        approximate,
+    )
+
+    return [
+        {
+            "dtype": str(dtype),
+            "null_percentage": "{0:.0f}%".format(
+                100 * null_count / float(n_rows) if n_rows > 0 else 0
+            ),
+            "distinct": int(distinct_count),
+            "approximate": False,
+        }
+        for dtype, null_count, distinct_count in zip(
+            dataframe.dtypes, null_counts, distinct_counts
+        )
+    ]
+
+
+def _distinct_counts(dataframe, count, distinct_cache, approximate):
+    """
+    Count the distinct values of each column with count(columns).
+
+    Counts are cached by column name with the column fingerprint, and only
+    counted again for columns whose fingerprint has changed.
+    """
+
+    if distinct_cache is None:
+        return list(count(dataframe))
+
+    keys = {
+        colname: (approximate, column_fingerprint(column))
+        for colname, column in dataframe.items()
+    }
+
+    changed = [
+        colname
+        for colname in dataframe.columns
+        if distinct_cache.get(colname, (None,))[0] != keys[colname]
+    ]
+
+    if changed:
+        for colname, distinct in zip(changed, count(dataframe[changed])):
+            distinct_cache[colname] = (keys[colname], distinct)
+
+    return [distinct_cache[colname][1] for colname in dataframe.columns]
+
+
+def _describe_column_approximately(column, distinct, distinct_error):
+    null_fraction, null_error = sample_null_fraction(column)
+
+    return {
+        "dtype": str(column.dtype),
+        "null_percentage": "{0:.0f}% +/- {1:.1f}%".format(
+            100 * null_fraction, 100 * null_error
+        ),
+        "distinct": "~{0} +/- {1:.1f}%".format(distinct, 100 * distinct_error),
+        "approximate": True,
+    }
+
+
+class HyperLogLog(object):
+    """
+    Mergeable sketch estimating the number of distinct values seen.
+
+    Uses 2 ** precision one byte registers, giving a relative standard
+    error of about 1.04 / sqrt(2 ** precision) on the estimate.
+
+    Parameters
+    ----------
+    precision : int, optional
+        Number of hash bits used to select a register.
+    """
+
+    def __init__(self, precision=12):
+        self.precision = precision
+        self.registers = np.zeros(2**precision, dtype=np.uint8)
+
+    @property
+    def relative_error(self):
+        return 1.04 / np.sqrt(len(self.registers)).item()
+
+    def update(self, column):
+        """Add the non-null values of a pandas series to the sketch"""
+
+        hashes = hash_pandas_object(column.dropna(), index=False).values
+
+        rest_bits = 64 - self.precision
+        indices = (hashes >> np.uint64(rest_bits)).astype(np.intp)
+        rest = hashes & np.uint64(2**rest_bits - 1)
+
+        # position of the leftmost set bit within the remaining hash bits
+        bit_length = np.zeros(len(rest), dtype=np.int64)
+        nonzero = rest > 0
+        bit_length[nonzero] = (
+            np.floor(np.log2(rest[nonzero].astype(float))).astype(np.int64) + 1
+        )
+        ranks = (rest_bits - bit_length + 1).astype(np.uint8)
+
+        np.maximum.at(self.registers, indices, ranks)
+
+    def merge(self, other):
+        """Combine the values seen by another sketch into this one"""
+        np.maximum(self.registers, other.registers, out=self.registers)
+
+    def estimate(self):
+        n_registers = len(self.registers)
+        alpha = 0.7213 / (1 + 1.079 / n_registers)
+
+        estimate = (
+            alpha
+            * n_registers**2
+            / np.sum(np.power(2.0, -self.registers.astype(float)))
+        )
+
+        n_empty = np.count_nonzero(self.registers == 0)
+
+        # linear counting is more accurate for small cardinalities
+        if estimate <= 2.5 * n_registers and n_empty > 0:
+            estimate = n_registers * np.log(n_registers / n_empty)
+
+        return int(round(estimate))
+
+
+def approximate_distinct(column, block_size=2**16, precision=12):
+    """Estimate the number of distinct non-null values in a column"""
+
+    sketch = HyperLogLog(precision)
+
+    for start in range(0, len(column), block_size):
+        sketch.update(column.iloc[start : start + block_size])
+
+    return sketch.estimate(), sketch.relative_error
+
+
+def sample_null_fraction(
+    column, n_blocks=64, block_size=1024, z_score=1.96, random_state=None
+):
+    """
+    Estimate the fraction of null values in a column from sampled blocks.
+
+    Contiguous blocks of rows are sampled without replacement, so memory
+    use and time are independent of the length of the column.
+
+    Parameters
+    ----------
+    column : pd.Series
+        The column to estimate the null fraction of.
+    n_blocks : int, optional
+        The number of blocks to sample.
+    block_size : int, optional
+        The number of rows in each block.
+    z_score : float, optional
+        Number of standard errors in the returned error bound.
+    random_state : None, int or np.random.Generator, optional
+        Seed or generator used to choose the blocks.
+
+    Returns
+    -------
+    fraction : float
+        The estimated fraction of null values.
+    error : float
+        Half width of the confidence interval for the fraction, zero if the
+        whole column was examined.
+    """
+
+    total_blocks = len(column) // block_size
+
+    if total_blocks <= n_blocks:
+        return (column.isnull().mean() if len(column) > 0 else 0.0), 0.0
+
+    rng = np.random.default_rng(random_state)
+    starts = block_size * rng.choice(total_blocks, n_blocks, replace=False)
+
+    fractions = np.array(
+        [
+            column.iloc[start : start + block_size].isnull().mean()
+            for start in starts
+        ]
+    )
+
+    finite_population = 1 - n_blocks / total_blocks
+    error = (
+        z_score
+        * fractions.std(ddof=1)
+        / np.sqrt(n_blocks)
+        * np.sqrt(finite_population)
+    )
+
+    return fractions.mean(), error
+
+
+class ColumnProfile(object):
+    """
+    Summary of a column, shared by the widgets displaying it.
+
+    The python type of each element is found in one pass over the column,
+    or from its dtype without a pass, and the numeric values, their
+    extremes and histogram are derived from it. Value counts are only
+    computed if used.
+
+    Parameters
+    ----------
+    column : pd.Series
+        The column to profile.
+
+    Attributes
+    ----------
+    is_null : np.array of bool
+        Marks the null elements of the column.
+    type_counts : dict
+        The number of non-null elements of each python type.
+    is_numeric : np.array of bool
+        Marks the non-null int and float elements of the column.
+    numeric : pd.Series
+        The non-null int and float elements of the column.
+    sorted_numeric : np.array of float
+        The numeric values in increasing order, so values in a range are
+        counted by binary search.
+    bins, histogram : np.array
+        The bin edges and counts of a histogram of the numeric values.
+    """
+
+    def __init__(self, column):
+        self.column = column
+        self.is_null = np.asarray(column.isnull().values, dtype=bool)
+
+        element_type = scalar_type(column)
+
+        if element_type is not None:
+            n_non_null = np.count_nonzero(~self.is_null)
+            self.type_counts = {element_type: n_non_null} if n_non_null else {}
+            self.is_numeric = (
+                ~self.is_null
+                if issubclass(element_type, NUMERIC_TYPES)
+                else np.zeros(len(column), dtype=bool)
+            )
+        else:
+            self._partition_types(object_values(column))
+
+        self.numeric = column.loc[self.is_numeric]
+        self.sorted_numeric = np.sort(
+            np.asarray(self.numeric.values, dtype=float)
+        )
+        self.bins = np.histogram_bin_edges(self.sorted_numeric)
+
+        # positions in sorted_numeric where each bin starts, and the end of
+        # the last bin, which includes its right edge
+        self._bin_bounds = np.searchsorted(self.sorted_numeric, self.bins)
+        self._bin_bounds[-1] = len(self.sorted_numeric)
+        self.histogram = np.diff(self._bin_bounds)
+
+        self._value_counts = None
+
+    def _partition_types(self, values):
+        # types are compared by identity, as numpy compares arrays of
+        # types by calling their __eq__
+        types = {}
+        type_ids = np.empty(len(values), dtype=np.int64)
+        for i, x in enumerate(values):
+            element_type = type(x)
+            types[id(element_type)] = element_type
+            type_ids[i] = id(element_type)
+
+        self.type_counts = {}
+        self.is_numeric = np.zeros(len(values), dtype=bool)
+
+        for type_id, element_type in types.items():
+            is_type = (type_ids == type_id) & ~self.is_null
+            count = np.count_nonzero(is_type)
+
+            if count:
+                self.type_counts[element_type] = count
+                if issubclass(element_type, NUMERIC_TYPES):
+                    self.is_numeric |= is_type
+
+    @property
+    def min(self):
+        if len(self.sorted_numeric) == 0:
+            return np.nan
+        return self.sorted_numeric[0]
+
+    @property
+    def max(self):
+        if len(self.sorted_numeric) == 0:
+            return np.nan
+        return self.sorted_numeric[-1]
+
+    def count_outside(self, low, high):
+        """The number of numeric values below low or above high"""
+
+        below = np.searchsorted(self.sorted_numeric, low, "left")
+        above = np.searchsorted(self.sorted_numeric, high, "right")
+
+        return below + len(self.sorted_numeric) - above
+
+    def histogram_outside(self, low, high):
+        """Counts in each of bins of the numeric values outside low to high"""
+
+        starts, ends = self._bin_bounds[:-1], self._bin_bounds[1:]
+
+        below = np.searchsorted(self.sorted_numeric, low, "left")
+        above = np.searchsorted(self.sorted_numeric, high, "right")
+
+        return (np.clip(below, starts, ends) - starts) + (
+            ends - np.clip(above, starts, ends)
+        )
+
+    @property
+    def nbytes(self):
+        """Approximate the memory held by the profile and its column"""
+
+        nbytes = (
+            self.column.memory_usage(index=True, deep=False)
+            + self.numeric.memory_usage(index=True, deep=False)
+            + self.is_null.nbytes
+            + self.is_numeric.nbytes
+            + self.sorted_numeric.nbytes
+        )
+
+        if self._value_counts is not None:
+            nbytes += self._value_counts.memory_usage(index=True, deep=False)
+
+        return int(nbytes)
+
+    @property
+    def value_counts(self):
+        """Counts of the distinct non-null values, largest first"""
+
+        if self._value_counts is None:
+            self._value_counts = self.column.dropna().value_counts()
+
+        return self._value_counts
+
+    @property
+    def categorical_fraction(self):
+        """The fraction of non-null elements which are str or bool"""
+
+        n_non_null = sum(self.type_counts.values())
+
+        if n_non_null == 0:
+            return 0
+
+        return (
+            self.type_counts.get(str, 0) + self.type_counts.get(bool, 0)
+        ) / n_non_null
@@ -0,0 +1,169 @@
+import numpy as np
+import pandas as pd
+
+# Fraction of a sample given to the nulls, mistyped values and extremes of
+# each column by TailPreservingSampler
+DIRTY_FRACTION = 0.2
+
+
+def reservoir_positions(n_rows, size, random_state=None):
+    """
+    Choose size of n_rows positions uniformly at random.
+
+    Implements Algorithm L, which skips over rows not kept, so draws
+    O(size * (1 + log(n_rows / size))) random numbers rather than one per
+    row.
+
+    Parameters
+    ----------
+    n_rows : int
+        The number of positions to choose from.
+    size : int
+        The number of positions chosen.
+    random_state : None, int or np.random.Generator, optional
+        Seed or generator used to choose the positions.
+
+    Returns
+    -------
+    np.array of int
+        The chosen positions, in increasing order.
+    """
+
+    rng = np.random.default_rng(random_state)
+
+    if size >= n_rows:
+        return np.arange(n_rows)
+    if size <= 0:
+        return np.arange(0)
+
+    positions = np.arange(size)
+    weight = np.exp(np.log(rng.random()) / size)
+    position = size - 1
+
+    while True:
+        position += int(np.log(rng.random()) / np.log1p(-weight)) + 1
+        if position >= n_rows:
+            break
+        positions[rng.integers(size)] = position
+        weight *= np.exp(np.log(rng.random()) / size)
+
+    return np.sort(positions)
+
+
+class UniformSampler(object):
+    """
+    Samples rows uniformly at random.
+
+    Parameters
+    ----------
+    random_state : None, int or np.random.Generator, optional
+        Seed or generator used to choose the rows.
+    """
+
+    def __init__(self, random_state=None):
+        self.rng = np.random.default_rng(random_state)
+
+    def sample(self, dataframe, n_rows):
+        """Return n_rows rows of dataframe, in their original order"""
+
+        if n_rows >= len(dataframe):
+            return dataframe
+
+        return dataframe.iloc[
+            reservoir_positions(len(dataframe), n_rows, self.rng)
+        ]
+
+
+class TailPreservingSampler(UniformSampler):
+    """
+    Samples rows keeping the dirty values of every column.
+
+    Part of the sample is shared between the columns, each keeping some of
+    its nulls, values which are not numbers in an otherwise numeric column,
+    and its smallest and largest numbers. The rest of the sample is
+    uniform, so the preview still shows typical values.
+
+    Parameters
+    ----------
+    dirty_fraction : float, optional
+        The largest fraction of the sample kept for dirty values.
+    random_state : None, int or np.random.Generator, optional
+        Seed or generator used to choose the rows.
+    """
+
+    def __init__(self, dirty_fraction=DIRTY_FRACTION, random_state=None):
+        super(TailPreservingSampler, self).__init__(random_state)
+        self.dirty_fraction = dirty_fraction
+
+    def _choose(self, positions, n_positions):
+        if len(positions) <= n_positions:
+            return positions
+        return self.rng.choice(positions, n_positions, replace=False)
+
+    def _dirty_positions(self, column, n_positions):
+        """Positions of nulls, mistyped values and extremes of a column"""
+
+        is_null = np.asarray(column.isnull().values, dtype=bool)
+
+        if isinstance(column.dtype, np.dtype) and column.dtype.kind in "iuf":
+            numbers = np.asarray(column.values, dtype=float)
+            is_mistyped = np.zeros(len(column), dtype=bool)
+        elif column.dtype == object:
+            numbers = np.asarray(
+                pd.to_numeric(column, errors="coerce").values, dtype=float
+            )
+            is_mistyped = np.isnan(numbers) & ~is_null
+
+            # strings are only mistyped in a mostly numeric column
+            if np.count_nonzero(is_mistyped) * 2 > np.count_nonzero(~is_null):
+                is_mistyped[:] = False
+        else:
+            numbers = None
+            is_mistyped = np.zeros(len(column), dtype=bool)
+
+        n_kinds = 3 if numbers is not None else 1
+        per_kind = max(n_positions // n_kinds, 1)
+
+        chosen = [
+            self._choose(np.flatnonzero(is_null), per_kind),
+            self._choose(np.flatnonzero(is_mistyped), per_kind),
+        ]
+
+        if numbers is not None:
+            number_positions = np.flatnonzero(~np.isnan(numbers))
+            n_tail = min(per_kind // 2 + 1, len(number_positions))
+
+            if n_tail > 0:
+                values = numbers[number_positions]
+                smallest = np.argpartition(values, n_tail - 1)[:n_tail]
+                largest = np.argpartition(values, -n_tail)[-n_tail:]
+                chosen.append(number_positions[smallest])
+                chosen.append(number_positions[largest])
+
+        return np.concatenate(chosen).astype(int)
+
+    def sample(self, dataframe, n_rows):
+        """Return n_rows rows of dataframe, in their original order"""
+
+        if n_rows >= len(dataframe):
+            return dataframe
+
+        n_dirty = int(n_rows * self.dirty_fraction)
+        n_per_column = max(n_dirty // max(dataframe.shape[1], 1), 1)
+
+        dirty = [np.arange(0)]
+        if n_dirty > 0:
+            dirty.extend(
+                self._dirty_positions(dataframe.iloc[:, i], n_per_column)
+                for i in range(dataframe.shape[1])
+            )
+        dirty = self._choose(np.unique(np.concatenate(dirty)), n_dirty)
+
+        # fills the rest of the sample uniformly, drawing enough rows to
+        # replace any already kept as dirty
+        uniform = reservoir_positions(len(dataframe), n_rows, self.rng)
+        uniform = self.rng.permutation(uniform[~np.isin(uniform, dirty)])
+
+        positions = np.concatenate([dirty, uniform[: n_rows - len(dirty)]])
+
+        return dataframe.iloc[np.sort(positions)]
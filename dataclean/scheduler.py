@@ -0,0 +1,433 @@
+import copy
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from itertools import takewhile
+
+import numpy as np
+import pandas as pd
+
+try:
+    from multiprocessing.shared_memory import SharedMemory
+except ImportError:  # Python < 3.8
+    SharedMemory = None
+
+from dataclean.kernels import spawn_random_states
+from dataclean.optimizer import keeps_dtypes
+from dataclean.pipeline import copy_on_write, fit_steps
+
+
+def is_barrier(step):
+    """Whether a step must run on its own, after all steps before it"""
+
+    # dropping rows changes every column, and steps on several columns
+    # would tie groups of independent steps together
+    return step.drops_rows or len(step.output_columns) != 1
+
+
+def _columns(step):
+    return set(step.input_columns) | set(step.output_columns)
+
+
+def group_steps(steps):
+    """
+    Split a sequence of steps into stages which run one after another.
+
+    Each stage is either a single barrier step, or a list of groups of
+    steps. Steps in a group share columns, so run in order, while the
+    groups of a stage touch disjoint columns and may run concurrently.
+
+    Parameters
+    ----------
+    steps : list of DataCleanStepBase
+        The steps, in the order they are applied.
+
+    Returns
+    -------
+    list
+        The stages, each a step or a list of lists of steps.
+    """
+
+    stages = []
+    groups = []
+
+    for step in steps:
+        if is_barrier(step):
+            if groups:
+                stages.append([group for _, group in groups])
+                groups = []
+            stages.append(step)
+            continue
+
+        columns = _columns(step)
+        connected = [
+            (group_columns, group)
+            for group_columns, group in groups
+            if group_columns & columns
+        ]
+
+        # merges every group sharing a column with the step, keeping the
+        # steps of each merged group in pipeline order
+        merged_columns = set(columns)
+        merged_steps = []
+        for group_columns, group in connected:
+            merged_columns |= group_columns
+            merged_steps.extend(group)
+
+        groups = [
+            (group_columns, group)
+            for group_columns, group in groups
+            if not group_columns & columns
+        ]
+        merged_steps.sort(key=steps.index)
+        groups.append((merged_columns, merged_steps + [step]))
+
+    if groups:
+        stages.append([group for _, group in groups])
+
+    return stages
+
+
+def _set_column(dataframe, colname, column):
+    if hasattr(dataframe, "isetitem"):
+        dataframe.isetitem(dataframe.columns.get_loc(colname), column)
+    else:
+        dataframe[colname] = column
+
+
+def _group_columns(steps, dataframe):
+    """Copy the columns of dataframe a group of steps uses"""
+
+    colnames = set()
+    for step in steps:
+        colnames |= _columns(step)
+
+    # keeps the dataframe column order
+    return dataframe.loc[
+        :, [colname for colname in dataframe.columns if colname in colnames]
+    ].copy()
+
+
+def _run_group(steps, sub_dataframe, fit):
+    """Run steps on a private copy of the columns they use, returning them"""
+
+    for step in steps:
+        if fit:
+            step.fit(sub_dataframe)
+        sub_dataframe = step.execute(sub_dataframe, preview=False)
+
+    return sub_dataframe
+
+
+class ThreadPoolStepExecutor(object):
+    """
+    Runs steps on independent columns concurrently in a thread pool.
+
+    Steps are grouped by group_steps, and each group is run on a copy of
+    just its columns, which are then written back in the main thread.
+    The results are identical to running the steps one after another.
+
+    Parameters
+    ----------
+    max_workers : int, optional
+        The number of threads, by default as for ThreadPoolExecutor.
+    """
+
+    def __init__(self, max_workers=None):
+        self.max_workers = max_workers
+
+    def execute(self, steps, dataframe, preview=True, fit=False):
+        """
+        Apply steps to dataframe, as Pipeline.execute does.
+
+        Parameters
+        ----------
+        steps : list of DataCleanStepBase
+            The steps to apply, in order.
+        dataframe : pd.DataFrame
+            The data to clean, modified in place unless preview is set.
+        preview : bool, optional
+            Leave dataframe unchanged, returning a cleaned copy.
+        fit : bool, optional
+            Fit each step to its input before applying it.
+
+        Returns
+        -------
+        pd.DataFrame
+            The cleaned data.
+        """
+
+        if preview:
+            # columns are replaced rather than written to, so can be shared
+            dataframe = copy_on_write(dataframe, [])
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            for stage in group_steps(steps):
+                if not isinstance(stage, list):
+                    if fit:
+                        stage.fit(dataframe)
+                    dataframe = stage.execute(dataframe, preview)
+                    continue
+
+                # pandas is not thread safe, so the columns are copied for
+                # each group here rather than in the threads
+                futures = [
+                    pool.submit(
+                        _run_group,
+                        group,
+                        _group_columns(group, dataframe),
+                        fit,
+                    )
+                    for group in stage
+                ]
+
+                for sub_dataframe in [future.result() for future in futures]:
+                    for colname in sub_dataframe.columns:
+                        _set_column(dataframe, colname, sub_dataframe[colname])
+
+        return dataframe
+
+
+def _is_shareable(column):
+    return isinstance(column.dtype, np.dtype) and column.dtype.kind in "biuf"
+
+
+def _shared_array(block, shared_column):
+    """View a shared memory block as the array of a shared column"""
+
+    _, dtype, length = shared_column
+
+    return np.ndarray((length,), dtype=dtype, buffer=block.buf)
+
+
+def _run_partition(steps, partition, shared_columns, columns, start, stop):
+    """
+    Apply steps to the rows start to stop of a dataframe, in a worker.
+
+    Columns in shared_columns are read from shared memory, and written back
+    to it if the steps keep every row and the column dtype. The rest of
+    the cleaned partition is returned with the names of the columns
+    written back.
+    """
+
+    blocks = []
+
+    for colname, shared_column in shared_columns.items():
+        block = SharedMemory(name=shared_column[0])
+        blocks.append(block)
+        partition[colname] = _shared_array(block, shared_column)[
+            start:stop
+        ].copy()
+
+    partition = partition[columns]
+
+    for step in steps:
+        partition = step.execute(partition, preview=False)
+
+    written = []
+
+    if len(partition) == stop - start:
+        for colname, block in zip(shared_columns, blocks):
+            column = partition[colname]
+            if column.dtype == shared_columns[colname][1]:
+                _shared_array(block, shared_columns[colname])[
+                    start:stop
+                ] = column.values
+                written.append(colname)
+
+    for block in blocks:
+        block.close()
+
+    return partition.drop(columns=written), written
+
+
+def _partition_steps(steps, n_partitions):
+    """
+    Copies of steps for each partition, drawing independent random numbers.
+
+    Steps seeded with a random_state would otherwise sample the same
+    replacements in every partition.
+    """
+
+    partition_steps = [list(steps) for _ in range(n_partitions)]
+
+    for i, step in enumerate(steps):
+        random_state = getattr(step, "params", {}).get("random_state")
+        if random_state is None:
+            continue
+
+        for partition, state in zip(
+            partition_steps, spawn_random_states(random_state, n_partitions)
+        ):
+            partition[i] = copy.copy(step)
+            partition[i].params = dict(step.params, random_state=state)
+
+    return partition_steps
+
+
+def _process_pool(max_workers):
+    """
+    A process pool whose workers are not forked from this process.
+
+    Forking a process with other threads running, such as a Jupyter
+    kernel, can deadlock the children on locks held by those threads.
+    """
+
+    methods = multiprocessing.get_all_start_methods()
+    context = multiprocessing.get_context(
+        "forkserver" if "forkserver" in methods else "spawn"
+    )
+
+    try:
+        return ProcessPoolExecutor(max_workers=max_workers, mp_context=context)
+    except TypeError:  # Python < 3.7
+        return ProcessPoolExecutor(max_workers=max_workers)
+
+
+class ProcessPoolStepExecutor(object):
+    """
+    Runs fitted steps on partitions of the rows in a pool of processes.
+
+    Unlike threads, processes run python level per element logic, such as
+    casting values of object columns, in parallel. Numeric columns are
+    passed to and from the workers through shared memory rather than being
+    pickled. The steps are fitted to the whole dataframe first, so every
+    partition replaces values with the same statistics. Steps giving a
+    column a dtype which depends on the rows present, such as casts or
+    fillna on object columns, are run on the whole dataframe in this
+    process instead, between the partitioned runs of the other steps.
+
+    Parameters
+    ----------
+    max_workers : int, optional
+        The number of processes, by default the number of CPUs.
+    n_partitions : int, optional
+        The number of row partitions, by default one for each process.
+    """
+
+    def __init__(self, max_workers=None, n_partitions=None):
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.n_partitions = n_partitions or self.max_workers
+
+    def execute(self, steps, dataframe, preview=True, fit=False):
+        """
+        Apply fitted steps to dataframe, as Pipeline.execute does.
+
+        The dataframe is not modified, and the cleaned partitions are
+        returned joined in their original order. If fit is set, the steps
+        are first fitted to the whole dataframe in this process, and the
+        steps already applied to fit later ones are not run again.
+        """
+
+        new_dataframe = dataframe
+
+        if fit:
+            n_applied, new_dataframe = fit_steps(steps, dataframe)
+            steps = steps[n_applied:]
+        elif not all(
+            step.is_fitted or not step.fits_to_data for step in steps
+        ):
+            raise ValueError(
+                "Steps must be fitted to the whole dataframe before they are "
+                "run on partitions"
+            )
+
+        while steps:
+            dtypes = dict(new_dataframe.dtypes)
+            # steps only run on partitions while the dtypes of their results
+            # cannot depend on which rows are in a partition
+            n_partitioned = len(
+                list(
+                    takewhile(
+                        lambda step: step.drops_rows
+                        or keeps_dtypes(step, dtypes),
+                        steps,
+                    )
+                )
+            )
+
+            if n_partitioned:
+                new_dataframe = self._execute_partitioned(
+                    steps[:n_partitioned], new_dataframe
+                )
+                steps = steps[n_partitioned:]
+            else:
+                new_dataframe = steps[0].execute(new_dataframe, preview=True)
+                # avoids the unnecessary pandas SettingWithCopy warning
+                new_dataframe.is_copy = False
+                steps = steps[1:]
+
+        if new_dataframe is dataframe:
+            return dataframe.copy()
+
+        return new_dataframe
+
+    def _execute_partitioned(self, steps, dataframe):
+        bounds = np.linspace(
+            0, len(dataframe), min(self.n_partitions, len(dataframe)) + 1
+        ).astype(int)
+
+        shared = [
+            colname
+            for colname, column in dataframe.items()
+            if SharedMemory is not None and _is_shareable(column)
+        ]
+
+        blocks = []
+        shared_columns = {}
+
+        try:
+            for colname in shared:
+                values = dataframe[colname].values
+                block = SharedMemory(create=True, size=max(values.nbytes, 1))
+                blocks.append(block)
+                shared_columns[colname] = (
+                    block.name,
+                    values.dtype,
+                    len(values),
+                )
+                _shared_array(block, shared_columns[colname])[:] = values
+
+            unshared = dataframe.drop(columns=shared)
+
+            partition_steps = _partition_steps(steps, len(bounds) - 1)
+
+            with _process_pool(self.max_workers) as pool:
+                futures = [
+                    pool.submit(
+                        _run_partition,
+                        partition_steps[i],
+                        unshared.iloc[start:stop],
+                        shared_columns,
+                        list(dataframe.columns),
+                        start,
+                        stop,
+                    )
+                    for i, (start, stop) in enumerate(
+                        zip(bounds[:-1], bounds[1:])
+                    )
+                ]
+
+                partitions = []
+
+                for (start, stop), future in zip(
+                    zip(bounds[:-1], bounds[1:]), futures
+                ):
+                    partition, written = future.result()
+
+                    for colname in written:
+                        partition[colname] = _shared_array(
+                            blocks[shared.index(colname)],
+                            shared_columns[colname],
+                        )[start:stop].copy()
+
+                    partitions.append(partition[list(dataframe.columns)])
+        finally:
+            for block in blocks:
+                block.close()
+                block.unlink()
+
+        if not partitions:
+            return dataframe.copy()
+
+        return pd.concat(partitions)
@@ -165,7 +165,13 @@ define(["require", "jquery", "base/js/namespace", 'services/config',
                     + col.colname + '</a></td><td>'
                     + col.description.dtype + '</td><td>'
                     + col.description.null_percentage + '</td><td>'
-                    + col.description.distinct + '</td><td>'
+                    + col.description.distinct
+                    + (col.description.approximate ?
+                        ' <a href="#" class="computeExact" '
+                        +'data-frame-id="' + dfList[i].dfId + '" '
+                        +'title="Approximate values, click to compute exactly">'
+                        +'(exact)</a>' : '')
+                    + '</td><td>'
                     + '<tr class="tablesorter-childRow"><td colspan="4"'
                     + 'id="' + col.colId + '_row" class="';
 
@@ -229,6 +235,18 @@ define(["require", "jquery", "base/js/namespace", 'services/config',
 
     }
 
+    function collapse_column_widget(selector) {
+        var dataframe_id = $(selector).attr('data-frame-id');
+
+        var column_id = $(selector).attr('id');
+
+        // the kernel frees the plot and preview, so the widget is
+        // displayed again when reopened
+        $('#'+column_id+'_row').html('Loading widget...');
+
+        Jupyter.notebook.kernel.execute('_datacleaner.dataframe_managers['+dataframe_id+'].collapse_column_widget('+column_id+')');
+    }
+
     function display_pipeline_widget(selector) {
         if($('#datacleaner-wrapper').is(':visible')){
 
@@ -269,7 +287,17 @@ define(["require", "jquery", "base/js/namespace", 'services/config',
                     $(this).closest('tr').nextUntil('tr:not(.tablesorter-childRow)').children('td').toggleClass('hidden');
                     $(this).toggleClass('arrow-right');
                     $(this).toggleClass('arrow-down');
-                    display_column_widget(this);
+                    if ($(this).hasClass('arrow-right'))
+                        collapse_column_widget(this);
+                    else
+                        display_column_widget(this);
+                    return false;
+                });
+
+                $('.tablesorter').on('click', '.computeExact' ,function(){
+                    var dataframe_id = $(this).attr('data-frame-id');
+                    Jupyter.notebook.kernel.execute('_datacleaner.dataframe_managers['+dataframe_id+'].compute_exact_metadata()');
+                    varRefresh();
                     return false;
                 });
 
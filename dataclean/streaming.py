@@ -0,0 +1,814 @@
+from collections import Counter
+from queue import Full, Queue
+from threading import Event, Thread
+
+import numpy as np
+import pandas as pd
+
+from dataclean.cleaning import (
+    FIT_STATISTICS,
+    KDE_MAX_POINTS,
+    fit_kde,
+    fit_mean,
+    fit_median,
+    fit_mode,
+)
+from dataclean.kernels import python_scalar
+from dataclean.pipeline import RbmStep, TypeConversionStep
+
+# Rows sampled from the stream to train an RBM on
+RBM_SAMPLE_ROWS = 10000
+
+# Leading bytes identifying the formats read by read_row_groups
+PARQUET_MAGIC = b"PAR1"
+ARROW_MAGIC = b"ARROW1"
+
+
+class Reservoir(object):
+    """
+    Uniform sample of fixed size from a stream read in chunks.
+
+    Implements Algorithm R, vectorised over each chunk. The reservoir only
+    decides which items are kept, callers store the items themselves.
+
+    Parameters
+    ----------
+    size : int
+        The number of items kept.
+    random_state : None, int or np.random.Generator, optional
+        Seed or generator used to choose the items.
+    """
+
+    def __init__(self, size, random_state=None):
+        self.size = size
+        self.seen = 0
+        self.rng = np.random.default_rng(random_state)
+
+    def offer(self, n_items):
+        """
+        Choose which of the next n_items are kept.
+
+        Returns
+        -------
+        slots : np.array
+            The reservoir slots to be written, in increasing order.
+        positions : np.array
+            The position within the chunk of the item for each slot.
+        """
+
+        positions = np.arange(n_items)
+        seen = self.seen + positions
+
+        slots = np.where(
+            seen < self.size, seen, self.rng.integers(0, seen + 1)
+        )
+        kept = slots < self.size
+        slots, positions = slots[kept], positions[kept]
+
+        self.seen += n_items
+
+        # a slot chosen twice in one chunk holds the later item
+        slots, last = np.unique(slots[::-1], return_index=True)
+
+        return slots, positions[::-1][last]
+
+
+def _non_null(values):
+    """The values as a float array, skipping nulls as pandas statistics do"""
+
+    values = np.asarray(values, dtype=float)
+
+    return values[~np.isnan(values)]
+
+
+class MeanAccumulator(object):
+    """Running mean of a stream of numbers"""
+
+    def __init__(self, random_state=None):
+        self.total = 0.0
+        self.count = 0
+
+    def update(self, values):
+        values = _non_null(values)
+        self.total += values.sum()
+        self.count += len(values)
+
+    def merge(self, other):
+        self.total += other.total
+        self.count += other.count
+
+    def result(self):
+        mean = self.total / self.count if self.count > 0 else np.nan
+        return {"fill_value": python_scalar(mean)}
+
+
+class QuantileSketch(object):
+    """
+    Mergeable sketch of the distribution of a stream of numbers.
+
+    Values are kept in levels, those on level i standing for 2 ** i values
+    of the stream. When a level holds more than capacity values, a random
+    half of them in sorted order moves up a level. Quantiles are exact until
+    the first compaction, after which their rank error is roughly
+    proportional to the number of levels over capacity.
+
+    Parameters
+    ----------
+    capacity : int, optional
+        The most values held by each level.
+    random_state : None, int or np.random.Generator, optional
+        Seed or generator used when compacting levels.
+    """
+
+    def __init__(self, capacity=4096, random_state=None):
+        self.capacity = capacity
+        self.levels = [np.empty(0)]
+        self.rng = np.random.default_rng(random_state)
+
+    def update(self, values):
+        self.levels[0] = np.concatenate([self.levels[0], _non_null(values)])
+        self._compact()
+
+    def merge(self, other):
+        for i, level in enumerate(other.levels):
+            if i == len(self.levels):
+                self.levels.append(np.empty(0))
+            self.levels[i] = np.concatenate([self.levels[i], level])
+        self._compact()
+
+    def _compact(self):
+        i = 0
+
+        while i < len(self.levels):
+            level = self.levels[i]
+
+            if len(level) > self.capacity:
+                level = np.sort(level)
+                n_paired = len(level) - len(level) % 2
+                offset = self.rng.integers(2)
+
+                if i + 1 == len(self.levels):
+                    self.levels.append(np.empty(0))
+
+                self.levels[i + 1] = np.concatenate(
+                    [self.levels[i + 1], level[offset:n_paired:2]]
+                )
+                self.levels[i] = level[n_paired:]
+
+            i += 1
+
+    def quantile(self, q):
+        if len(self.levels) == 1:
+            if len(self.levels[0]) == 0:
+                return np.nan
+            return np.quantile(self.levels[0], q)
+
+        values = np.concatenate(self.levels)
+        weights = np.concatenate(
+            [np.full(len(level), 2**i) for i, level in enumerate(self.levels)]
+        )
+
+        order = np.argsort(values)
+        ranks = np.cumsum(weights[order])
+
+        return values[order][np.searchsorted(ranks, q * ranks[-1])]
+
+    def result(self):
+        return {"fill_value": python_scalar(self.quantile(0.5))}
+
+
+class ModeAccumulator(object):
+    """Counts of each value in a stream, for its most common value"""
+
+    def __init__(self, random_state=None):
+        self.counts = Counter()
+
+    def update(self, values):
+        # kept in order of first appearance, which pd.Series.mode falls back
+        # to for tied values of types which cannot be sorted
+        if values.dtype == object:
+            # the index of value_counts could infer e.g. floats for ints
+            codes, uniques = pd.factorize(values.values)
+            counts = np.bincount(codes[codes >= 0], minlength=len(uniques))
+            self.counts.update(dict(zip(uniques, counts.tolist())))
+        else:
+            self.counts.update(values.value_counts(sort=False).to_dict())
+
+    def merge(self, other):
+        self.counts.update(other.counts)
+
+    def result(self):
+        if not self.counts:
+            return {"fill_value": None}
+
+        max_count = max(self.counts.values())
+        candidates = [
+            value for value, count in self.counts.items() if count == max_count
+        ]
+
+        # values equal in python, such as 1, 1.0 and True, are counted
+        # together under the first seen, as by pd.Series.mode, and ties are
+        # broken as it does, sorting the modes if their types allow it
+        modes = pd.Series(candidates, dtype=object).mode()
+
+        return {"fill_value": python_scalar(modes.get(0))}
+
+
+class KdeAccumulator(object):
+    """Reservoir sample of a stream of numbers for a KDE"""
+
+    def __init__(self, random_state=None):
+        self.reservoir = Reservoir(KDE_MAX_POINTS, random_state)
+        self.points = np.empty(0)
+
+    def update(self, values):
+        values = np.asarray(values, dtype=float)
+        slots, positions = self.reservoir.offer(len(values))
+
+        if len(slots) > 0 and slots[-1] >= len(self.points):
+            self.points = np.concatenate(
+                [self.points, np.empty(slots[-1] + 1 - len(self.points))]
+            )
+
+        self.points[slots] = values[positions]
+
+    def merge(self, other):
+        # each side contributes in proportion to the number of values seen
+        rng = self.reservoir.rng
+        total = self.reservoir.seen + other.reservoir.seen
+        n_points = min(len(self.points) + len(other.points), KDE_MAX_POINTS)
+
+        if total == 0:
+            return
+
+        n_own = rng.hypergeometric(
+            self.reservoir.seen, other.reservoir.seen, n_points
+        )
+        n_own = min(max(n_own, n_points - len(other.points)), len(self.points))
+
+        self.points = np.concatenate(
+            [
+                rng.choice(self.points, n_own, replace=False),
+                rng.choice(other.points, n_points - n_own, replace=False),
+            ]
+        )
+        self.reservoir.seen = total
+
+    def result(self):
+        return {"kde_points": self.points.tolist()}
+
+
+class RowSampleAccumulator(object):
+    """Reservoir sample of the rows of a stream of dataframes"""
+
+    def __init__(self, colnames, random_state=None):
+        self.colnames = colnames
+        self.reservoir = Reservoir(RBM_SAMPLE_ROWS, random_state)
+        self.rows = None
+
+    def update(self, dataframe):
+        chunk = dataframe[self.colnames]
+        slots, positions = self.reservoir.offer(len(chunk))
+
+        if self.rows is None:
+            self.rows = chunk.iloc[:0].copy()
+
+        n_rows = len(self.rows)
+        replaced = slots < n_rows
+
+        if replaced.any():
+            self.rows.iloc[slots[replaced]] = chunk.iloc[
+                positions[replaced]
+            ].values
+
+        self.rows = pd.concat(
+            [self.rows, chunk.iloc[positions[~replaced]]], ignore_index=True
+        )
+
+
+# Mergeable equivalent of each statistic fitted by a step
+ACCUMULATORS = {
+    fit_mean: MeanAccumulator,
+    fit_median: QuantileSketch,
+    fit_mode: ModeAccumulator,
+    fit_kde: KdeAccumulator,
+}
+
+ACCUMULATE = "accumulate"
+APPLY = "apply"
+
+
+def _read(chunks):
+    """Start reading the chunks, from a callable or a re-iterable"""
+    return iter(chunks() if callable(chunks) else chunks)
+
+
+def _accumulator(step):
+    random_state = step.params.get("random_state")
+
+    if isinstance(step, RbmStep):
+        return RowSampleAccumulator(step.input_columns, random_state)
+
+    statistic = FIT_STATISTICS.get(step.replacement_method)
+    if statistic is None:
+        return None
+
+    return ACCUMULATORS[statistic](random_state=random_state)
+
+
+def _schedule(steps):
+    """
+    Plan one pass over the data.
+
+    Unfitted steps whose input is final are accumulated, fitted steps are
+    applied, and everything downstream of a step still being fitted waits
+    for a later pass.
+    """
+
+    schedule = []
+    pending = set()
+
+    for step in steps:
+        if pending & set(step.input_columns):
+            if step.drops_rows or isinstance(step, RbmStep):
+                # every later step would see rows or values not yet final
+                break
+            pending.update(step.output_columns)
+        elif step.is_fitted:
+            schedule.append((APPLY, step))
+        else:
+            schedule.append((ACCUMULATE, step))
+            pending.update(step.output_columns)
+
+    return schedule
+
+
+class _ChunkDtypes(object):
+    """
+    Checks the columns used by steps have the same dtype in every chunk.
+
+    pandas infers dtypes from the rows present, e.g. fillna gives an object
+    column of numbers float64 in chunks without strings in them, so those
+    chunks would be cleaned differently than the whole data. Ints and
+    floats may differ between chunks unless a type conversion reads them.
+    """
+
+    def __init__(self, steps):
+        self.steps = list(steps)
+        self.dtypes = {}
+
+    def check_input(self, step, chunk):
+        self._check(chunk, step, "read by", step.input_columns)
+
+    def check_output(self, step, chunk):
+        self._check(chunk, step, "written by", step.output_columns)
+
+    def _check(self, chunk, step, usage, colnames):
+        # empty chunks have no rows to infer dtypes from
+        if chunk.empty:
+            return
+
+        later_steps = self.steps[self.steps.index(step) :]
+        if usage == "written by":
+            later_steps = later_steps[1:]
+
+        for colname in colnames:
+            dtype = chunk[colname].dtype
+            first_dtype = self.dtypes.setdefault((step, usage, colname), dtype)
+
+            if dtype == first_dtype:
+                continue
+
+            if (
+                first_dtype.kind in "iuf"
+                and dtype.kind in "iuf"
+                and not any(
+                    isinstance(later, TypeConversionStep)
+                    and colname in later.input_columns
+                    for later in later_steps
+                )
+            ):
+                continue
+
+            raise ValueError(
+                "Column {0!r} is {1} in one chunk but {2} in another when "
+                "{3} the step: {4}. Its dtype is inferred from the rows in "
+                "each chunk, so it cannot be cleaned in chunks as the whole "
+                "data would be".format(
+                    colname, first_dtype, dtype, usage, step.description
+                )
+            )
+
+
+def fit_chunks(pipeline, chunks):
+    """
+    Fit a pipeline over data read in chunks, with bounded memory.
+
+    Statistics are accumulated with mergeable aggregates: a running mean,
+    a quantile sketch for the median, value counts for the mode and a
+    reservoir sample for the KDE and RBM. A step can only be fitted once the
+    steps before it are, so the chunks are read once for every level of
+    dependent steps, usually just once or twice. Raises ValueError if a
+    column has different dtypes in different chunks, as described for
+    execute_chunks.
+
+    Parameters
+    ----------
+    pipeline : Pipeline
+        The pipeline to fit.
+    chunks : callable or iterable of pd.DataFrame
+        A function returning an iterator over the chunks, such as
+        ``lambda: pd.read_csv(path, chunksize=100000)``, or a collection
+        of dataframes which may be iterated over more than once.
+
+    Returns
+    -------
+    Pipeline
+        The fitted pipeline.
+    """
+
+    if not callable(chunks) and iter(chunks) is chunks:
+        raise ValueError(
+            "The chunks may be read more than once, so must be given as a "
+            "function returning an iterator or as a collection"
+        )
+
+    for step in pipeline.steps:
+        if not step.is_fitted and _accumulator(step) is None:
+            # steps without a statistic need no data to fit
+            step.fitted_params = {}
+
+    dtypes = _ChunkDtypes(pipeline.steps)
+
+    while not pipeline.is_fitted:
+        schedule = _schedule(pipeline.steps)
+
+        accumulators = {
+            step: _accumulator(step)
+            for action, step in schedule
+            if action == ACCUMULATE
+        }
+
+        for chunk in _read(chunks):
+            for action, step in schedule:
+                dtypes.check_input(step, chunk)
+                if action == APPLY:
+                    chunk = step.execute(chunk, preview=True)
+                    dtypes.check_output(step, chunk)
+                elif isinstance(step, RbmStep):
+                    accumulators[step].update(chunk)
+                else:
+                    accumulators[step].update(step.fit_values(chunk))
+
+        for step, accumulator in accumulators.items():
+            if isinstance(step, RbmStep):
+                step.fit(accumulator.rows)
+            else:
+                step.fitted_params = accumulator.result()
+
+    return pipeline
+
+
+def transform_chunks(pipeline, chunks):
+    """
+    Clean each of the chunks with a fitted pipeline, one at a time.
+
+    Raises ValueError if a column has different dtypes in different
+    chunks, as described for execute_chunks.
+    """
+
+    if not pipeline.is_fitted:
+        raise ValueError("The pipeline must be fitted before transform")
+
+    dtypes = _ChunkDtypes(pipeline.steps)
+
+    for chunk in _read(chunks):
+        chunk = chunk.copy()
+
+        for step in pipeline.plan(dtypes=chunk.dtypes).steps:
+            dtypes.check_input(step, chunk)
+            chunk = step.execute(chunk, preview=False)
+            # avoids the unnecessary pandas SettingWithCopy warning
+            chunk.is_copy = False
+            dtypes.check_output(step, chunk)
+
+        yield chunk
+
+
+def execute_chunks(pipeline, chunks):
+    """
+    Clean data too large to fit in memory, read in chunks.
+
+    The pipeline is fitted to all of the data by fit_chunks if it is not
+    already fitted, then each chunk is cleaned as it is read.
+
+    pandas infers the dtype of a column from the rows of each chunk, so
+    ValueError is raised once a column read or written by a step has
+    different dtypes in different chunks, e.g. an object column of numbers
+    filled with fillna, which is downcast to float64 only in chunks
+    without strings. Ints and floats are allowed to differ, unless a type
+    conversion reads the column. Chunks cleaned before the error have
+    already been yielded.
+
+    Parameters
+    ----------
+    pipeline : Pipeline
+        The pipeline to apply.
+    chunks : callable or iterable of pd.DataFrame
+        The data, as described for fit_chunks. An iterator may only be
+        given if the pipeline is fitted, as it is read once.
+
+    Returns
+    -------
+    generator of pd.DataFrame
+        The cleaned chunks, in the order they were read.
+    """
+
+    if not pipeline.is_fitted:
+        fit_chunks(pipeline, chunks)
+
+    return transform_chunks(pipeline, chunks)
+
+
+def _put(queue, entry, stop):
+    """Put entry on the queue unless stop is set first"""
+
+    while not stop.is_set():
+        try:
+            queue.put(entry, timeout=0.1)
+            return True
+        except Full:
+            pass
+
+    return False
+
+
+def read_ahead(iterable, depth=1):
+    """
+    Iterate over iterable, producing the next items in a background thread.
+
+    At most depth items are read ahead of the one being consumed, so
+    reading overlaps with processing while memory stays bounded.
+    """
+
+    entries = Queue(maxsize=depth)
+    stop = Event()
+
+    def produce():
+        try:
+            for item in iterable:
+                if not _put(entries, (True, item), stop):
+                    return
+        except Exception as error:
+            _put(entries, (False, error), stop)
+        else:
+            _put(entries, (False, None), stop)
+
+    thread = Thread(target=produce)
+    thread.daemon = True
+    thread.start()
+
+    try:
+        while True:
+            is_item, item = entries.get()
+            if not is_item:
+                if item is not None:
+                    raise item
+                return
+            yield item
+    finally:
+        stop.set()
+
+
+def _file_format(path):
+    with open(path, "rb") as fp:
+        magic = fp.read(len(ARROW_MAGIC))
+
+    if magic.startswith(PARQUET_MAGIC):
+        return "parquet"
+    if magic == ARROW_MAGIC:
+        return "arrow"
+
+    raise ValueError("{0} is not a Parquet or Arrow IPC file".format(path))
+
+
+def read_row_groups(path):
+    """
+    Read a Parquet or Arrow IPC file one row group or record batch at a time.
+
+    The file is memory mapped, so only the data of the current row group is
+    read into memory.
+
+    Parameters
+    ----------
+    path : str
+        The file to read.
+
+    Returns
+    -------
+    generator of pd.DataFrame
+        The row groups of the file, in order.
+    """
+
+    import pyarrow as pa
+
+    file_format = _file_format(path)
+    source = pa.memory_map(path, "r")
+
+    try:
+        if file_format == "parquet":
+            import pyarrow.parquet as pq
+
+            reader = pq.ParquetFile(source)
+            n_groups = reader.num_row_groups
+            read_group = reader.read_row_group
+        else:
+            reader = pa.ipc.open_file(source)
+            n_groups = reader.num_record_batches
+            read_group = reader.get_batch
+
+        start = 0
+        for i in range(n_groups):
+            chunk = read_group(i).to_pandas()
+
+            # a default index continues from the previous row group, as
+            # when the whole file is read
+            if isinstance(chunk.index, pd.RangeIndex):
+                chunk.index = pd.RangeIndex(start, start + len(chunk))
+            start += len(chunk)
+
+            yield chunk
+    finally:
+        source.close()
+
+
+def _file_schema(path):
+    import pyarrow as pa
+
+    if _file_format(path) == "parquet":
+        import pyarrow.parquet as pq
+
+        return pq.read_schema(path)
+
+    with pa.memory_map(path, "r") as source:
+        return pa.ipc.open_file(source).schema
+
+
+class _FileWriter(object):
+    """
+    Appends dataframes to a Parquet or Arrow IPC file.
+
+    The schema is inferred from the first dataframe with rows, as the type
+    of an empty object column is unknown. Columns whose type is still
+    unknown, having only nulls, take their type from source_schema. Later
+    dataframes whose columns infer other types, e.g. an int column turned
+    float by nulls, are cast to the schema where no values are lost.
+    """
+
+    def __init__(self, path, file_format, preserve_index, source_schema=None):
+        self.path = path
+        self.file_format = file_format
+        self.preserve_index = preserve_index
+        self.source_schema = source_schema
+        self.writer = None
+        self.schema = None
+        self._empty = None
+
+    def _open(self, dataframe):
+        import pyarrow as pa
+
+        schema = pa.Table.from_pandas(
+            dataframe, preserve_index=self.preserve_index
+        ).schema
+
+        if self.source_schema is not None:
+            for i, field in enumerate(schema):
+                if (
+                    pa.types.is_null(field.type)
+                    and field.name in self.source_schema.names
+                ):
+                    source_field = self.source_schema.field(field.name)
+                    schema = schema.set(i, field.with_type(source_field.type))
+
+        self.schema = schema
+
+        if self.file_format == "parquet":
+            import pyarrow.parquet as pq
+
+            self.writer = pq.ParquetWriter(self.path, self.schema)
+        else:
+            self.writer = pa.ipc.new_file(self.path, self.schema)
+
+    def write(self, dataframe):
+        import pyarrow as pa
+
+        if self.writer is None:
+            if len(dataframe) == 0:
+                self._empty = dataframe
+                return
+            self._open(dataframe)
+
+        table = pa.Table.from_pandas(
+            dataframe, preserve_index=self.preserve_index
+        )
+        if not table.schema.equals(self.schema):
+            table = self._cast(table)
+
+        self.writer.write_table(table)
+
+    def _cast(self, table):
+        import pyarrow as pa
+
+        try:
+            return table.cast(self.schema)
+        except (
+            pa.ArrowInvalid,
+            pa.ArrowNotImplementedError,
+            pa.ArrowTypeError,
+            ValueError,
+        ):
+            changed = []
+            for field in table.schema:
+                if field.name not in self.schema.names:
+                    changed.append(field.name)
+                elif self.schema.field(field.name).type != field.type:
+                    changed.append(
+                        "{0} ({1} to {2})".format(
+                            field.name,
+                            self.schema.field(field.name).type,
+                            field.type,
+                        )
+                    )
+            raise ValueError(
+                "Cannot write a cleaned row group to {0} as the types of its "
+                "columns changed from the first row group: {1}".format(
+                    self.path, ", ".join(changed)
+                )
+            )
+
+    def close(self):
+        # a file of only empty dataframes is still written
+        if self.writer is None and self._empty is not None:
+            self._open(self._empty)
+            self._empty = None
+
+        if self.writer is not None:
+            self.writer.close()
+
+
+def clean_file(pipeline, source, destination, read_ahead_depth=1):
+    """
+    Clean a Parquet or Arrow IPC file into a new file of the same format.
+
+    Row groups are read from the memory mapped source in a background
+    thread while the previous one is cleaned, and each is written out as
+    soon as it is cleaned, so memory use is bounded by a few row groups
+    however large the file. An unfitted pipeline is first fitted with
+    fit_chunks over the row groups. Requires pyarrow.
+
+    Parameters
+    ----------
+    pipeline : Pipeline
+        The pipeline to apply.
+    source : str
+        The path of the file to clean.
+    destination : str
+        The path of the file to write.
+    read_ahead_depth : int, optional
+        The number of row groups read ahead of the one being cleaned.
+
+    Returns
+    -------
+    int
+        The number of rows written.
+    """
+
+    if not pipeline.is_fitted:
+        fit_chunks(
+            pipeline,
+            lambda: read_ahead(read_row_groups(source), read_ahead_depth),
+        )
+
+    writer = None
+    n_rows = 0
+
+    try:
+        for chunk in read_ahead(read_row_groups(source), read_ahead_depth):
+            if writer is None:
+                # a default index in the source is not written out, as
+                # the index left after dropping rows would be written
+                writer = _FileWriter(
+                    destination,
+                    _file_format(source),
+                    not isinstance(chunk.index, pd.RangeIndex),
+                    _file_schema(source),
+                )
+
+            chunk = pipeline.transform(chunk)
+            writer.write(chunk)
+            n_rows += len(chunk)
+    finally:
+        if writer is not None:
+            writer.close()
+
+    return n_rows
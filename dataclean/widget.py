@@ -1,8 +1,10 @@
-from __future__ import division
-
+import sys
+import threading
 from abc import ABCMeta, abstractmethod
-from builtins import int
+from collections import OrderedDict
 from functools import wraps
+from html import escape
+from weakref import WeakKeyDictionary
 
 import ipywidgets
 import numpy as np
@@ -18,12 +20,51 @@ from dataclean.cleaning import (
     TypeConvertMethod,
     ALLOWED_TRANSFORMATIONS,
 )
+from dataclean.kernels import object_values
+from dataclean.memory import figure_nbytes
 from dataclean.pipeline import (
     OutlierRemovalStep,
     NullRemovalStep,
     TypeConversionStep,
     RbmStep,
 )
+from dataclean.preview import (
+    PAGE_ROWS,
+    ColumnPreview,
+    DataFramePreview,
+    page_count,
+)
+from dataclean.profiling import ColumnProfile, column_fingerprint
+
+# Values inferred by pandas.api.types.infer_dtype for columns of which no
+# element, or every element, is a str or bool
+NON_CATEGORICAL_INFERRED_TYPES = {
+    "empty",
+    "integer",
+    "floating",
+    "mixed-integer-float",
+    "decimal",
+    "complex",
+    "datetime64",
+    "datetime",
+    "date",
+    "timedelta64",
+    "timedelta",
+    "time",
+    "period",
+    "interval",
+    "bytes",
+}
+CATEGORICAL_INFERRED_TYPES = {"string", "boolean"}
+
+# Object columns are sampled to decide if they are categorical
+CATEGORICAL_SAMPLE_SIZE = 1000
+CATEGORICAL_Z_SCORE = 3.0
+
+# Most column versions whose categorical type is remembered
+CATEGORICAL_CACHE_SIZE = 1024
+
+_categorical_cache = OrderedDict()
 
 
 def render_inactive_widget(step):
@@ -44,17 +85,77 @@ def render_inactive_widget(step):
     return inactive_widget
 
 
-def is_categorical(series, categorical_threshold=0.8):
+def _categorical_fraction(values):
+    """Fraction of an array of non-null values which are str or bool"""
+
+    if len(values) == 0:
+        return 0
+
+    return np.fromiter(
+        (type(x) is str or type(x) is bool for x in values),
+        dtype=bool,
+        count=len(values),
+    ).mean()
+
+
+def _fraction_categorical(series, categorical_threshold):
+    """The fraction of non-null values of series which are str or bool"""
+
+    dtype = series.dtype
+
+    # the type of every element follows from a native or extension dtype
+    if isinstance(dtype, np.dtype) and dtype.kind != "O":
+        return 1 if dtype.kind == "b" and len(series) > 0 else 0
+    if isinstance(dtype, (pd.StringDtype, pd.BooleanDtype)):
+        return 1 if series.notnull().any() else 0
+    if not isinstance(dtype, np.dtype) and not isinstance(
+        dtype, pd.CategoricalDtype
+    ):
+        return 0
+
+    inferred_type = pd.api.types.infer_dtype(series, skipna=True)
+
+    if inferred_type in CATEGORICAL_INFERRED_TYPES:
+        return 1
+    if inferred_type in NON_CATEGORICAL_INFERRED_TYPES:
+        return 0
+
+    values = object_values(series.dropna())
+
+    if len(values) > CATEGORICAL_SAMPLE_SIZE:
+        rng = np.random.default_rng(0)
+        sample = values[
+            rng.choice(len(values), CATEGORICAL_SAMPLE_SIZE, replace=False)
+        ]
+        fraction = _categorical_fraction(sample)
+        error = CATEGORICAL_Z_SCORE * np.sqrt(
+            max(fraction * (1 - fraction), 1 / len(sample)) / len(sample)
+        )
+
+        # the whole column is only scanned if the sample is inconclusive
+        if abs(fraction - categorical_threshold) > error:
+            return fraction
+
+    return _categorical_fraction(values)
+
+
+def is_categorical(series, categorical_threshold=0.8, profile=None):
     """Decide whether a pandas series is categorical or continuous"""
 
-    type_counts = {str: 0, bool: 0}
+    # a profile has already counted the type of every element
+    if profile is not None:
+        if profile.categorical_fraction >= categorical_threshold:
+            return CategoricalTypes.CATEGORICAL
+        return CategoricalTypes.CONTINUOUS
 
-    type_counts.update(series.dropna().apply(type).value_counts().to_dict())
+    key = (column_fingerprint(series), categorical_threshold)
 
-    fraction_categorical = (
-        ((type_counts[str] + type_counts[bool]) / sum(type_counts.values()))
-        if sum(type_counts.values()) > 0
-        else 0
+    if key in _categorical_cache:
+        _categorical_cache[key] = _categorical_cache.pop(key)
+        return _categorical_cache[key]
+
+    fraction_categorical = _fraction_categorical(
+        series, categorical_threshold
     )
 
     if fraction_categorical >= categorical_threshold:
@@ -62,9 +163,18 @@ def is_categorical(series, categorical_threshold=0.8):
     else:
         categorical_type = CategoricalTypes.CONTINUOUS
 
+    _categorical_cache[key] = categorical_type
+    if len(_categorical_cache) > CATEGORICAL_CACHE_SIZE:
+        _categorical_cache.popitem(last=False)
+
     return categorical_type
 
 
+def clear_categorical_cache():
+    """Forget the categorical types of columns, e.g. once modified in place"""
+    _categorical_cache.clear()
+
+
 class CallbackManager(object):
     """For registering and triggering callbacks between classes"""
 
@@ -79,10 +189,174 @@ class CallbackManager(object):
         self.callbacks.append(callback)
 
 
-class StepWidgetControllerBase(object):
-    """Widget controls to create a cleaning step"""
+def close_widgets(widgets):
+    """Close widgets, and the widgets they contain"""
+
+    for widget in widgets:
+        if isinstance(widget, ipywidgets.Widget):
+            close_widgets(getattr(widget, "children", ()))
+            widget.close()
+
+
+def _kernel_callback_scheduler():
+    """Function running a callback on the kernel's event loop, if any"""
+
+    try:
+        from IPython import get_ipython
+
+        return get_ipython().kernel.io_loop.add_callback
+    except (ImportError, AttributeError):
+        return None
+
+
+class PreviewWorker(object):
+    """
+    Computes widget previews in a background thread, latest first.
+
+    Each request is keyed by the widget it updates, and replaces any request
+    for that widget not yet started, so a burst of events computes only the
+    last. A request superseded while it is computed is discarded: its
+    result is never displayed, but the work under way, such as executing a
+    step, is not interrupted. compute may poll its is_stale argument between
+    stages to skip the rest of its work.
+
+    Results are displayed by schedule, by default on the kernel's event
+    loop between widget events, as widgets and plots must not be touched
+    from other threads. Without an event loop, e.g. outside a kernel,
+    previews are computed and displayed in submit instead.
+
+    Parameters
+    ----------
+    schedule : function, optional
+        Runs a callback on the thread owning the widgets.
+    """
+
+    def __init__(self, schedule=None):
+        self._condition = threading.Condition()
+        self._pending = OrderedDict()
+        self._generations = WeakKeyDictionary()
+        self._thread = None
+        self._schedule = schedule
+
+    def _scheduler(self):
+        if self._schedule is not None:
+            return self._schedule
+        return _kernel_callback_scheduler()
+
+    def submit(self, key, compute, display, show_error=None):
+        """
+        Compute and display a preview for the widget key.
+
+        Parameters
+        ----------
+        key : object
+            The widget controller updated, hashable and weakly referenceable.
+        compute : function
+            Called as compute(is_stale) in the worker thread, or in submit
+            without an event loop, returning the preview.
+        display : function
+            Called with the preview, unless it has become stale.
+        show_error : function, optional
+            Called with the exception raised by compute or display, unless
+            the preview has become stale, as errors raised on the kernel's
+            event loop are only logged. By default the error is raised.
+        """
+
+        schedule = self._scheduler()
+
+        with self._condition:
+            generation = self._generations.get(key, 0) + 1
+            self._generations[key] = generation
+
+            self._pending.pop(key, None)
+
+            if schedule is not None:
+                self._pending[key] = (
+                    generation,
+                    compute,
+                    display,
+                    show_error,
+                )
+
+                if self._thread is None:
+                    self._thread = threading.Thread(
+                        target=self._run, name="dataclean-preview"
+                    )
+                    self._thread.daemon = True
+                    self._thread.start()
+
+                self._condition.notify()
 
-    __metaclass__ = ABCMeta
+        if schedule is None:
+            self._show_function(
+                key, generation, compute, display, show_error
+            )()
+
+    def cancel(self, key):
+        """Discard pending and in-flight previews for the widget key"""
+
+        with self._condition:
+            self._generations[key] = self._generations.get(key, 0) + 1
+            self._pending.pop(key, None)
+
+    def _is_stale(self, key, generation):
+        with self._condition:
+            return self._generations.get(key) != generation
+
+    def _run(self):
+        while True:
+            with self._condition:
+                while not self._pending:
+                    self._condition.wait()
+                key, request = self._pending.popitem(last=False)
+
+            show = self._show_function(key, *request)
+
+            # the result is dropped if the event loop has since gone
+            schedule = self._scheduler()
+            if schedule is not None:
+                schedule(show)
+
+            # the worker must not keep a controller alive while it waits
+            del key, request, show
+
+    def _show_function(
+        self, key, generation, compute, display, show_error=None
+    ):
+        def is_stale():
+            return self._is_stale(key, generation)
+
+        def report(error):
+            if show_error is None:
+                raise error
+            show_error(error)
+
+        try:
+            result = compute(is_stale)
+        except Exception:
+            error = sys.exc_info()[1]
+
+            def show():
+                if not is_stale():
+                    report(error)
+
+            return show
+
+        def show():
+            if not is_stale():
+                try:
+                    display(result)
+                except Exception:
+                    report(sys.exc_info()[1])
+
+        return show
+
+
+_preview_worker = PreviewWorker()
+
+
+class StepWidgetControllerBase(metaclass=ABCMeta):
+    """Widget controls to create a cleaning step"""
 
     def __init__(self):
         self.update_step_callback = CallbackManager()
@@ -93,10 +367,11 @@ class StepWidgetControllerBase(object):
         # for controls that go into the column widgets
         self.transform_type = "A unique string or an enum class"
 
-    def load_data(self, column, numerical_data):
-        self.column = column
-        self.colname = column.name
-        self.numerical_data = numerical_data
+    def load_data(self, profile):
+        self.profile = profile
+        self.column = profile.column
+        self.colname = profile.column.name
+        self.numerical_data = profile.numeric
 
     def create_widgets(self):
         """Create your control widgets"""
@@ -118,6 +393,10 @@ class StepWidgetControllerBase(object):
         """For use as a widget observer"""
         return self.update_step()
 
+    def close(self):
+        """Close the control widgets"""
+        close_widgets(vars(self).values())
+
     @abstractmethod
     def render_widget(self, step=None):
         """Return the overall parent widget for your controls in the state
@@ -287,12 +566,12 @@ class OutlierReplaceWidgetController(StepWidgetControllerBase):
         )
 
         with self.outlier_range_slider.hold_trait_notifications():
-            self.outlier_range_slider.min = self.numerical_data.min()
-            self.outlier_range_slider.max = self.numerical_data.max()
+            self.outlier_range_slider.min = self.profile.min
+            self.outlier_range_slider.max = self.profile.max
 
         self.outlier_range_slider.value = [
-            self.numerical_data.min(),
-            self.numerical_data.max(),
+            self.profile.min,
+            self.profile.max,
         ]
 
         allowed_transforms = {
@@ -317,10 +596,10 @@ class OutlierReplaceWidgetController(StepWidgetControllerBase):
         else:
             self.submit_button.disabled = False
 
-        num_values_cut = self.numerical_data[
-            (self.numerical_data < self.outlier_range_slider.value[0])
-            | (self.numerical_data > self.outlier_range_slider.value[1])
-        ].count()
+        num_values_cut = self.profile.count_outside(
+            self.outlier_range_slider.value[0],
+            self.outlier_range_slider.value[1],
+        )
 
         percent_values_cut = (
             (100 * num_values_cut / len(self.column))
@@ -357,16 +636,10 @@ class TypeConvertWidgetController(StepWidgetControllerBase):
         self.transform_type = TypeConvertMethod
         self.tab_title = "Mismatched Types"
 
-    def load_data(self, column, numerical_data):
-        super(TypeConvertWidgetController, self).load_data(
-            column, numerical_data
-        )
+    def load_data(self, profile):
+        super(TypeConvertWidgetController, self).load_data(profile)
         self.type_count_dict = {float: 0, int: 0, str: 0}
-
-        for (data_type, count) in (
-            self.column.dropna().apply(type).value_counts().iteritems()
-        ):
-            self.type_count_dict[data_type] = count
+        self.type_count_dict.update(profile.type_counts)
 
     def create_widgets(self):
         super(TypeConvertWidgetController, self).create_widgets()
@@ -709,16 +982,21 @@ class PlotWidgetController(object):
     CUT_LINE_COLOUR = "red"
     CUT_BINS_COLOUR = "orange"
 
+    # matches the bars drawn by pandas bar plots of value counts
+    CATEGORY_BAR_WIDTH = 0.5
+
     def __init__(self):
         self.output_widget = ipywidgets.Output(
             layout=ipywidgets.Layout(min_width="300px", height="160px")
         )
+        self.fig = None
         self.create_figure()
 
-    def load_data(self, column, numerical_data):
-        self.column = column
-        self.colname = column.name
-        self.numerical_data = numerical_data
+    def load_data(self, profile):
+        self.profile = profile
+        self.column = profile.column
+        self.colname = profile.column.name
+        self.numerical_data = profile.numeric
 
     @_noninteractive
     def create_figure(self):
@@ -728,9 +1006,6 @@ class PlotWidgetController(object):
 
         self.ax_mod = self.fig.add_subplot(self.gs_two_plots[1])
 
-        pyplot.setp(self.ax_mod.get_xticklabels(), visible=False)
-        pyplot.setp(self.ax_mod.get_yticklabels(), visible=False)
-
         self.ax_cut = self.ax_main.twinx()
 
         # enforces desired drawing order
@@ -744,7 +1019,27 @@ class PlotWidgetController(object):
         self.ax_main.tick_params(axis="y", which="major", labelsize=12)
         self.ax_mod.tick_params(axis="y", which="major", labelsize=12)
 
+        self.low_cut_line, = self.ax_main.plot(
+            [None, None], [0, 0], color=self.CUT_LINE_COLOUR
+        )
+        self.high_cut_line, = self.ax_main.plot(
+            [None, None], [0, 0], color=self.CUT_LINE_COLOUR
+        )
+
+        # the bars drawn on each axis, by name, with the bins or categories
+        # they were laid out for
+        self._bars = {}
+        self._layout = None
+        self._two_plots = None
+        self._stale = True
+
+        self._show_two_plots(False)
+
     def display_figure(self):
+        # the figure is only rasterized again if its artists have changed
+        if not self._stale:
+            return
+
         self.output_widget.clear_output(wait=True)
 
         # Magic numbers came from testing using categorical columns
@@ -756,177 +1051,291 @@ class PlotWidgetController(object):
         self.output_widget.layout.width = "{}px".format(fig_width * 70)
         self.output_widget.layout.height = "{}px".format(fig_height * 80)
 
-        if self.categorical_type is CategoricalTypes.CONTINUOUS:
-            self.ax_main.xaxis.set_major_locator(
-                matplotlib.ticker.AutoLocator()
-            )
-
         with self.output_widget:
             display(self.fig)
 
+        self._stale = False
+
     def reset_plots(self, categorical_type):
+        # the figure is closed while its column widget is collapsed
+        if self.fig is None:
+            self.create_figure()
+
         self.categorical_type = categorical_type
         self.draw_main_plot()
         self.update_plots()
 
+    @staticmethod
+    def _category_counts(value_counts):
+        """Value counts labelled and ordered as the bar plots show them"""
+
+        counts = pd.Series(
+            value_counts.values,
+            index=[str(label) for label in value_counts.index],
+        )
+        return counts.groupby(level=0, sort=True).sum()
+
     @_noninteractive
-    def draw_main_plot(self):
-        self.ax_main.clear()
-        self.ax_mod.clear()
+    def _set_bars(self, ax, name, layout, positions, heights, **kwargs):
+        """
+        Draw named bars on ax, or update their heights in place.
 
-        if self.categorical_type is CategoricalTypes.CATEGORICAL:
-            col = self.column.dropna().value_counts()
-            col.index = col.index.format()
-            if len(col) > 0:
-                col.sort_index().plot(kind="bar", ax=self.ax_main, alpha=0.4)
-        else:
-            hist_orig, self.bins = np.histogram(self.numerical_data)
-            self.bin_width = self.bins[1] - self.bins[0]
+        The bars are only drawn again if their layout, the bins or
+        categories they show, has changed.
+        """
+
+        heights = np.asarray(heights, dtype=float)
+        bottom = np.asarray(kwargs.pop("bottom", 0), dtype=float)
+        bottom = np.broadcast_to(bottom, heights.shape)
+
+        if name in self._bars and self._bars[name][0] == layout:
+            for bar, height, y in zip(self._bars[name][1], heights, bottom):
+                if bar.get_height() != height or bar.get_y() != y:
+                    bar.set_height(height)
+                    bar.set_y(y)
+                    self._stale = True
+            return
+
+        if name in self._bars:
+            self._bars[name][1].remove()
+
+        self._bars[name] = (
+            layout,
+            ax.bar(positions, heights, bottom=bottom, **kwargs),
+        )
+        self._stale = True
+
+    def _show_two_plots(self, two_plots):
+        """Show the modified data below the original data, or hide it"""
+
+        if two_plots == self._two_plots:
+            return
 
-            margin = (self.bins[-1] - self.bins[0]) * self.ax_main.margins()[0]
+        gridspec = self.gs_two_plots if two_plots else self.gs_one_plot
 
-            self.ax_main.set_xlim(
-                (self.bins[0] - margin, self.bins[-1] + margin)
+        self.ax_main.set_position(gridspec[0].get_position(self.fig))
+        self.ax_cut.set_position(gridspec[0].get_position(self.fig))
+
+        self.ax_main.tick_params(labelbottom=not two_plots)
+        self.ax_mod.tick_params(labelbottom=two_plots, labelleft=two_plots)
+        self.ax_mod.set_visible(two_plots)
+
+        self._two_plots = two_plots
+        self._stale = True
+
+    def _rescale_main_plot(self):
+        # the cut lines span the bars, so are left out of the scaling
+        for line in (self.low_cut_line, self.high_cut_line):
+            line.set_ydata([0, 0])
+
+        self.ax_main.relim()
+        self.ax_main.autoscale_view(scalex=False)
+        self.ymax = self.ax_main.get_ylim()[1]
+
+        for line in (self.low_cut_line, self.high_cut_line):
+            line.set_ydata([self.ymax, 0])
+
+    def draw_main_plot(self):
+        if self.categorical_type is CategoricalTypes.CATEGORICAL:
+            counts = self._category_counts(self.profile.value_counts)
+            layout = (self.categorical_type, tuple(counts.index))
+
+            self._set_bars(
+                self.ax_main,
+                "main",
+                layout,
+                np.arange(len(counts)),
+                counts.values,
+                width=self.CATEGORY_BAR_WIDTH,
+                color="C0",
+                alpha=0.4,
             )
 
-            self.ax_main.bar(
+            if layout != self._layout:
+                self.ax_main.set_xticks(np.arange(len(counts)))
+                self.ax_main.set_xticklabels(counts.index)
+                self.ax_main.tick_params(axis="x", labelrotation=90)
+                self.ax_main.set_xlim((-0.5, len(counts) - 0.5))
+        else:
+            self.bins = self.profile.bins
+            self.bin_width = self.bins[1] - self.bins[0]
+            layout = (self.categorical_type, tuple(self.bins))
+
+            self._set_bars(
+                self.ax_main,
+                "main",
+                layout,
                 self.bins[:-1],
-                hist_orig,
+                self.profile.histogram,
                 width=self.bin_width,
                 align="edge",
+                color="C0",
                 alpha=0.4,
             )
 
-        self.ymax = self.ax_main.get_ylim()[1]
-        self.low_cut_line, = self.ax_main.plot(
-            [None, None], [self.ymax, 0], color=self.CUT_LINE_COLOUR
-        )
+            if layout != self._layout:
+                margin = (
+                    self.bins[-1] - self.bins[0]
+                ) * self.ax_main.margins()[0]
 
-        self.high_cut_line, = self.ax_main.plot(
-            [None, None], [self.ymax, 0], color=self.CUT_LINE_COLOUR
-        )
+                self.ax_main.xaxis.set_major_locator(
+                    matplotlib.ticker.AutoLocator()
+                )
+                self.ax_main.xaxis.set_major_formatter(
+                    matplotlib.ticker.ScalarFormatter()
+                )
+                self.ax_main.tick_params(axis="x", labelrotation=0)
+                self.ax_main.set_xlim(
+                    (self.bins[0] - margin, self.bins[-1] + margin)
+                )
+
+        self._layout = layout
+        self._rescale_main_plot()
 
-    def update_plots(self, step=None, col_mod=None):
+    def update_plots(self, step=None, col_mod=None, profile_mod=None):
         if isinstance(step, OutlierRemovalStep):
-            self.low_cut_line.set_xdata([[step.low_cut, step.low_cut]])
-            self.high_cut_line.set_xdata([[step.high_cut, step.high_cut]])
+            self._set_cut_lines(step.low_cut, step.high_cut)
             self.draw_cut_plot(step.low_cut, step.high_cut)
         else:
             self.hide_cut_plot()
 
         self.draw_modified_plot(
-            col_mod if col_mod is not None else self.column
+            col_mod if col_mod is not None else self.column, profile_mod
         )
 
         self.display_figure()
 
-    @_noninteractive
-    def draw_modified_plot(self, col_mod):
-        self.ax_mod.clear()
-
-        data_mod = col_mod.loc[
-            col_mod.apply(lambda x: isinstance(x, (int, float)))
-        ]
-        data_mod = data_mod.dropna()
-        col_mod = col_mod.dropna().value_counts()
+    def draw_modified_plot(self, col_mod, profile_mod=None):
+        if col_mod is self.column:
+            profile_mod = self.profile
+        elif profile_mod is None:
+            profile_mod = ColumnProfile(col_mod)
 
-        if self.categorical_type is CategoricalTypes.CATEGORICAL and not self.column.dropna().value_counts().equals(
-            col_mod
-        ):
-            self.ax_main.set_position(
-                self.gs_two_plots[0].get_position(self.fig)
-            )
-            self.ax_cut.set_position(
-                self.gs_two_plots[0].get_position(self.fig)
-            )
+        data_mod = profile_mod.numeric
 
-            pyplot.setp(self.ax_main.get_xticklabels(), visible=False)
-            pyplot.setp(self.ax_mod.get_xticklabels(), visible=True)
-            pyplot.setp(self.ax_mod.get_yticklabels(), visible=True)
+        # value counts are only computed for categorical columns
+        categorical = self.categorical_type is CategoricalTypes.CATEGORICAL
 
-            col_orig = self.column.dropna().value_counts()
+        if categorical and not self.profile.value_counts.equals(
+            profile_mod.value_counts
+        ):
+            self._show_two_plots(True)
 
-            col_mod.index = col_mod.index.format()
-            col_orig.index = col_orig.index.format()
+            col_mod = self._category_counts(profile_mod.value_counts)
+            col_orig = self._category_counts(self.profile.value_counts)
 
             col_delta = col_mod.sub(col_orig, fill_value=0)
             col_delta = col_delta[col_delta > 0]
 
             col_mod = col_mod.sub(col_delta, fill_value=0)
-
-            col_mod = pd.concat([col_mod, col_delta], axis=1)
-
-            col_mod.sort_index().plot(
-                kind="bar",
-                ax=self.ax_mod,
+            col_delta = col_delta.reindex(col_mod.index, fill_value=0)
+
+            layout = (self.categorical_type, tuple(col_mod.index))
+            positions = np.arange(len(col_mod))
+
+            if ("mod" not in self._bars) or self._bars["mod"][0] != layout:
+                self.ax_mod.set_xticks(positions)
+                self.ax_mod.set_xticklabels(col_mod.index)
+                self.ax_mod.tick_params(axis="x", labelrotation=90)
+                self.ax_mod.set_xlim((-0.5, len(col_mod) - 0.5))
+
+            self._set_bars(
+                self.ax_mod,
+                "mod",
+                layout,
+                positions,
+                col_mod.values,
+                width=self.CATEGORY_BAR_WIDTH,
+                color="C0",
+                alpha=0.4,
+            )
+            self._set_bars(
+                self.ax_mod,
+                "delta",
+                layout,
+                positions,
+                col_delta.values,
+                bottom=col_mod.values,
+                width=self.CATEGORY_BAR_WIDTH,
+                color="C1",
                 alpha=0.4,
-                stacked=True,
-                legend=False,
             )
+            self._rescale_plot(self.ax_mod)
 
         elif (
             self.categorical_type is not CategoricalTypes.CATEGORICAL
             and not data_mod.equals(self.numerical_data)
         ):
-            self.ax_main.set_position(
-                self.gs_two_plots[0].get_position(self.fig)
-            )
-            self.ax_cut.set_position(
-                self.gs_two_plots[0].get_position(self.fig)
-            )
+            self._show_two_plots(True)
 
-            pyplot.setp(self.ax_main.get_xticklabels(), visible=False)
-            pyplot.setp(self.ax_mod.get_xticklabels(), visible=True)
-            pyplot.setp(self.ax_mod.get_yticklabels(), visible=True)
-
-            hist_mod, _ = np.histogram(data_mod, self.bins)
-            hist_orig, _ = np.histogram(self.numerical_data, self.bins)
+            hist_mod, _ = np.histogram(profile_mod.sorted_numeric, self.bins)
+            hist_orig = self.profile.histogram
 
             hist_delta = hist_mod - hist_orig
             hist_delta[hist_delta < 0] = 0
 
-            self.ax_mod.bar(
+            layout = (self.categorical_type, tuple(self.bins))
+
+            if ("mod" not in self._bars) or self._bars["mod"][0] != layout:
+                self.ax_mod.xaxis.set_major_locator(
+                    matplotlib.ticker.AutoLocator()
+                )
+                self.ax_mod.xaxis.set_major_formatter(
+                    matplotlib.ticker.ScalarFormatter()
+                )
+                self.ax_mod.tick_params(axis="x", labelrotation=0)
+                self.ax_mod.set_xlim(self.ax_main.get_xlim())
+
+            self._set_bars(
+                self.ax_mod,
+                "mod",
+                layout,
                 self.bins[:-1],
                 hist_mod - hist_delta,
                 width=self.bin_width,
                 align="edge",
+                color="C0",
                 alpha=0.4,
             )
-            self.ax_mod.bar(
+            self._set_bars(
+                self.ax_mod,
+                "delta",
+                layout,
                 self.bins[:-1],
                 hist_delta,
-                width=self.bin_width,
-                color="g",
                 bottom=hist_mod - hist_delta,
+                width=self.bin_width,
                 align="edge",
+                color="g",
                 alpha=0.4,
             )
+            self._rescale_plot(self.ax_mod)
         else:
-            self.ax_main.set_position(
-                self.gs_one_plot[0].get_position(self.fig)
-            )
-            self.ax_cut.set_position(
-                self.gs_one_plot[0].get_position(self.fig)
-            )
-            pyplot.setp(self.ax_main.get_xticklabels(), visible=True)
-            pyplot.setp(self.ax_mod.get_xticklabels(), visible=False)
-            pyplot.setp(self.ax_mod.get_yticklabels(), visible=False)
+            self._show_two_plots(False)
 
-    @_noninteractive
-    def draw_cut_plot(self, low_cut, high_cut):
-        self.ax_cut.set_visible(True)
+    def _rescale_plot(self, ax):
+        ax.relim()
+        ax.autoscale_view(scalex=False)
 
-        ticks = self.ax_cut.get_xticks()
-        self.ax_cut.clear()
-        self.ax_cut.set_xticks(ticks)
+    def _set_cut_lines(self, low_cut, high_cut):
+        if list(self.low_cut_line.get_xdata()) != [low_cut, low_cut] or list(
+            self.high_cut_line.get_xdata()
+        ) != [high_cut, high_cut]:
+            self.low_cut_line.set_xdata([low_cut, low_cut])
+            self.high_cut_line.set_xdata([high_cut, high_cut])
+            self._stale = True
 
-        cut_data = self.numerical_data.loc[
-            self.numerical_data.apply(lambda x: x < low_cut or x > high_cut)
-        ]
+    def draw_cut_plot(self, low_cut, high_cut):
+        if not self.ax_cut.get_visible():
+            self.ax_cut.set_visible(True)
+            self._stale = True
 
-        hist_cut, _ = np.histogram(cut_data, self.bins)
+        hist_cut = self.profile.histogram_outside(low_cut, high_cut)
 
-        self.ax_cut.bar(
+        self._set_bars(
+            self.ax_cut,
+            "cut",
+            self._layout,
             self.bins[:-1],
             hist_cut,
             width=self.bin_width,
@@ -938,17 +1347,40 @@ class PlotWidgetController(object):
         self.ax_cut.set_ylim(self.ax_main.get_ylim())
 
     def hide_cut_plot(self):
-        self.low_cut_line.set_xdata([[None, None]])
-        self.high_cut_line.set_xdata([[None, None]])
-        self.ax_cut.set_visible(False)
+        if self.ax_cut.get_visible():
+            self.low_cut_line.set_xdata([None, None])
+            self.high_cut_line.set_xdata([None, None])
+            self.ax_cut.set_visible(False)
+            self._stale = True
 
     def render_widget(self):
-        if self.fig:
-            pyplot.close(self.fig)
-        self.create_figure()
+        # the figure and its artists are kept, and updated in place
+        if self.fig is None:
+            self.create_figure()
 
         return self.output_widget
 
+    def close_figure(self):
+        """Free the figure, which is created again when next drawn"""
+
+        if self.fig is not None:
+            pyplot.close(self.fig)
+            self.fig = None
+            self._bars = {}
+
+    def nbytes(self):
+        """Approximate the memory held by the figure"""
+
+        if self.fig is None:
+            return 0
+
+        return figure_nbytes(self.fig)
+
+    def close(self):
+        """Close the output widget and free the figure"""
+        close_widgets([self.output_widget])
+        self.close_figure()
+
 
 class ColumnWidgetController(object):
     """Container widget for column-specific step creation control widgets"""
@@ -961,14 +1393,49 @@ class ColumnWidgetController(object):
         self.modify_step_callback = CallbackManager()
         self.active_callback = self.new_step_callback
         self.categorical_type = None
+        self.preview = None
+        self.preview_page = 0
 
         self.plot_widget_controller = PlotWidgetController()
+        self.preview_worker = _preview_worker
 
         def update_active_step(new_step):
             self.active_step = new_step
-            col_mod = new_step.execute(self.dataframe)[self.colname]
-            self.redraw_preview(col_mod)
-            self.plot_widget_controller.update_plots(new_step, col_mod)
+
+            # pandas is not thread safe, so the columns the step reads are
+            # copied here rather than in the worker
+            colnames = set(new_step.input_columns) | {self.column.name}
+            dataframe = self.dataframe.loc[
+                :,
+                [
+                    colname
+                    for colname in self.dataframe.columns
+                    if colname in colnames
+                ],
+            ].copy()
+            column = self.column.copy()
+
+            def compute_preview(is_stale):
+                col_mod = new_step.execute(dataframe)[column.name]
+                if is_stale():
+                    return None
+                column_preview = ColumnPreview(column, col_mod)
+                if is_stale():
+                    return None
+                return col_mod, column_preview, ColumnProfile(col_mod)
+
+            def display_preview(preview):
+                col_mod, column_preview, profile_mod = preview
+                self.show_preview(column_preview)
+                self.plot_widget_controller.update_plots(
+                    new_step, col_mod, profile_mod
+                )
+
+            # the step is run off the kernel's main thread, so the controls
+            # stay responsive while it runs
+            self.preview_worker.submit(
+                self, compute_preview, display_preview, self.show_error
+            )
 
         self.step_creation_controls = [
             NullReplaceWidgetController(),
@@ -1015,8 +1482,44 @@ class ColumnWidgetController(object):
         )
 
         self.preview_widget = ipywidgets.HTML()
+
+        self.changed_only_checkbox = ipywidgets.Checkbox(
+            value=True,
+            description="Changed rows only",
+            indent=False,
+            layout=ipywidgets.Layout(width="140px"),
+        )
+        self.changed_only_checkbox.observe(
+            lambda _: self.show_preview_page(0), names="value"
+        )
+
+        self.previous_page_button = ipywidgets.Button(
+            description="<", layout=ipywidgets.Layout(width="30px")
+        )
+        self.previous_page_button.on_click(
+            lambda _: self.show_preview_page(self.preview_page - 1)
+        )
+        self.next_page_button = ipywidgets.Button(
+            description=">", layout=ipywidgets.Layout(width="30px")
+        )
+        self.next_page_button.on_click(
+            lambda _: self.show_preview_page(self.preview_page + 1)
+        )
+        self.page_label = ipywidgets.Label(value="")
+
         self.preview_widget_container = ipywidgets.VBox(
-            [ipywidgets.Label(value="Current Step"), self.preview_widget],
+            [
+                ipywidgets.Label(value="Current Step"),
+                ipywidgets.HBox(
+                    [
+                        self.previous_page_button,
+                        self.page_label,
+                        self.next_page_button,
+                        self.changed_only_checkbox,
+                    ]
+                ),
+                self.preview_widget,
+            ],
             layout=ipywidgets.Layout(max_height="200px"),
         )
 
@@ -1068,47 +1571,75 @@ class ColumnWidgetController(object):
         self.reset_controls()
 
     def load_data(self, series, dataframe, step=None):
+        self.preview_worker.cancel(self)
+
         self.dataframe = dataframe
         self.column = series
         self.colname = series.name
 
-        if not self.categorical_type:
-            self.categorical_type = is_categorical(series)
+        # profiles the column once for every controller
+        self.profile = ColumnProfile(series)
 
-        self.numerical_data = series.loc[
-            series.apply(lambda x: isinstance(x, (int, float)))
-        ]
+        if not self.categorical_type:
+            self.categorical_type = is_categorical(
+                series, profile=self.profile
+            )
 
-        self.numerical_data = self.numerical_data.dropna()
+        self.numerical_data = self.profile.numeric
 
         for controller in self.step_creation_controls:
-            controller.load_data(
-                column=self.column, numerical_data=self.numerical_data
-            )
-        self.plot_widget_controller.load_data(
-            column=self.column, numerical_data=self.numerical_data
-        )
+            controller.load_data(self.profile)
+        self.plot_widget_controller.load_data(self.profile)
 
+        self.preview_page = 0
         self.redraw_preview()
         self.step_being_modified = step
 
     def redraw_preview(self, col_modified=None):
+        self.show_preview(ColumnPreview(self.column, col_modified))
 
-        if col_modified is not None:
-            col_mod = col_modified.reindex(
-                index=self.column.index, fill_value="<br>"
-            )
-        else:
-            col_mod = self.column
+    def show_preview(self, preview):
+        """Show a preview, staying on the current page where possible"""
+        self.preview = preview
+        self.show_preview_page(self.preview_page)
 
-        self.preview_widget.value = (
-            "<center>This Step</center>"
-            + pd.concat(
-                [self.column.rename("before"), col_mod.rename("after")], axis=1
-            )
-            .style.set_table_attributes('class="table"')
-            .render()
+    def show_error(self, error):
+        """Show why a preview could not be computed in place of it"""
+
+        self.preview = None
+        self.preview_widget.value = "<pre>{0}</pre>".format(
+            escape("Preview failed: {0!r}".format(error))
         )
+        self.page_label.value = ""
+        self.previous_page_button.disabled = True
+        self.next_page_button.disabled = True
+
+    def show_preview_page(self, page):
+        """Show one page of rows of the preview"""
+
+        if self.preview is None:
+            return
+
+        rows = self.preview.rows(self.changed_only_checkbox.value)
+        n_pages = page_count(len(rows))
+
+        self.preview_page = min(max(page, 0), n_pages - 1)
+        start = self.preview_page * PAGE_ROWS
+        page_rows = rows[start : start + PAGE_ROWS]
+
+        # only the changed widget values are sent to the notebook, so
+        # moving between steps which change the same rows sends little
+        self.preview_widget.value = self.preview.page_html(page_rows)
+
+        if len(rows) == 0:
+            self.page_label.value = "No rows changed"
+        else:
+            self.page_label.value = "Rows {}-{} of {}".format(
+                start + 1, start + len(page_rows), len(rows)
+            )
+
+        self.previous_page_button.disabled = self.preview_page == 0
+        self.next_page_button.disabled = self.preview_page == n_pages - 1
 
     def render_widget(self):
         self.reset_controls()
@@ -1119,7 +1650,36 @@ class ColumnWidgetController(object):
 
         return self.widget
 
+    def collapse(self):
+        """Free the plot and preview while the widget is not shown"""
+        self.preview_worker.cancel(self)
+
+        self.plot_widget_controller.close_figure()
+        self.preview = None
+        self.preview_widget.value = ""
+
+    def nbytes(self):
+        """Approximate the memory held by the column, plot and preview"""
+        return (
+            self.profile.nbytes
+            + self.plot_widget_controller.nbytes()
+            + (self.preview.nbytes if self.preview is not None else 0)
+            + len(self.preview_widget.value)
+        )
+
+    def close(self):
+        """Close the widgets, and stop any preview being computed"""
+        self.preview_worker.cancel(self)
+
+        for controller in self.step_creation_controls:
+            controller.close()
+        self.plot_widget_controller.close()
+
+        close_widgets(vars(self).values())
+
     def reset_controls(self):
+        self.preview_worker.cancel(self)
+
         self.tab_widget.unobserve(
             self.tab_widget_onchange, names="selected_index"
         )
@@ -1222,7 +1782,9 @@ class DataFrameWidgetController(object):
         )
         self.pipeline_widget_container.set_title(0, "Pipeline")
         self.pipeline_widget_container.selected_index = None
-        self.preview_widget = ipywidgets.Output(
+
+        self.preview = DataFramePreview()
+        self.preview_widget = ipywidgets.HTML(
             layout=ipywidgets.Layout(
                 overflow_y="scroll",
                 overflow_x="scroll",
@@ -1230,6 +1792,22 @@ class DataFrameWidgetController(object):
                 height="190px",
             )
         )
+        self.preview_label = ipywidgets.Label(value="")
+
+        preview_buttons = []
+        for description, rows, columns in [
+            ("Previous rows", -1, 0),
+            ("Next rows", 1, 0),
+            ("Previous columns", 0, -1),
+            ("Next columns", 0, 1),
+        ]:
+            button = ipywidgets.Button(description=description)
+            button.on_click(
+                lambda _, rows=rows, columns=columns: self._move_preview(
+                    rows, columns
+                )
+            )
+            preview_buttons.append(button)
 
         self.rbm_widget_container = ipywidgets.Accordion(
             children=[self.rbm_widget_controller.render_widget()]
@@ -1238,11 +1816,25 @@ class DataFrameWidgetController(object):
         self.rbm_widget_container.selected_index = None
 
         self.preview_widget_container = ipywidgets.Accordion(
-            children=[self.preview_widget]
+            children=[
+                ipywidgets.VBox(
+                    [
+                        ipywidgets.HBox(
+                            preview_buttons + [self.preview_label]
+                        ),
+                        self.preview_widget,
+                    ]
+                )
+            ]
         )
         self.preview_widget_container.set_title(0, "DataFrame Preview")
         self.preview_widget_container.selected_index = None
 
+        # the preview is only rendered once it is opened
+        self.preview_widget_container.observe(
+            lambda _: self._redraw_preview(), names="selected_index"
+        )
+
         child_widgets = [
             self.preview_widget_container,
             self.rbm_widget_container,
@@ -1268,23 +1860,38 @@ class DataFrameWidgetController(object):
 
         self.widget = ipywidgets.VBox(child_widgets)
 
-    def _redraw_preview(self, dataframe):
-        self.preview_widget.clear_output(wait=True)
-        with self.preview_widget:
-            display(
-                dataframe.style.set_caption(
-                    "Preview up to the current pipeline step"
-                )
-            )
+    def _redraw_preview(self):
+        if self.preview_widget_container.selected_index is None:
+            return
+
+        self.preview_widget.value = self.preview.block_html()
+
+        rows, columns = self.preview.bounds()
+        self.preview_label.value = (
+            "Preview up to the current pipeline step: rows {}-{} of {}, "
+            "columns {}-{} of {}"
+        ).format(rows[0] + 1, rows[1], rows[2], columns[0] + 1, *columns[1:])
 
-    def render_widget(self, dataframe, step=None):
+    def _move_preview(self, rows, columns):
+        self.preview.move(rows, columns)
+        self._redraw_preview()
+
+    def render_widget(
+        self, dataframe, step=None, refresh_rbm=True, version=None
+    ):
         self.dataframe = dataframe
-        self._redraw_preview(dataframe)
-        self.rbm_widget_controller.load_data(dataframe)
-        self.rbm_widget_controller.reset_controls()
-        self.rbm_widget_container.children = tuple(
-            [self.rbm_widget_controller.render_widget(step)]
-        )
+
+        # version identifies dataframe, so its blocks are cached
+        self.preview.load(dataframe, version)
+        self._redraw_preview()
+
+        # the RBM controls only show the columns and their types
+        if refresh_rbm:
+            self.rbm_widget_controller.load_data(dataframe)
+            self.rbm_widget_controller.reset_controls()
+            self.rbm_widget_container.children = tuple(
+                [self.rbm_widget_controller.render_widget(step)]
+            )
 
         # if we are currently modifying a non column-specific step
         if step and not hasattr(step, "colname"):
@@ -1297,6 +1904,10 @@ class DataFrameWidgetController(object):
     def display_pipeline(self):
         self.pipeline_widget_container.selected_index = 0
 
+    def close(self):
+        self.rbm_widget_controller.close()
+        close_widgets(vars(self).values())
+
 
 class PipelineWidgetController(object):
     """Container widget for a view of the processing pipeline"""
@@ -1422,6 +2033,14 @@ class PipelineWidgetController(object):
     def display_message(self, message):
         self.info_label.value = message
 
+    def close(self):
+        for pipeline_step_widget in getattr(
+            self, "pipeline_step_widgets", []
+        ):
+            close_widgets([pipeline_step_widget.widget])
+
+        close_widgets(vars(self).values())
+
 
 class PipelineStepWidgetController(object):
     """Container widget for a single step of the processing pipeline"""
@@ -25,16 +25,16 @@ setup(
     long_description=read_long_description(),
     data_files=[("share/jupyter/nbextensions/ipydataclean", STATIC_JS_FILES)],
     packages=["dataclean"],
+    python_requires=">=3.5",
     install_requires=[
-        "future",
         "ipython",
         "ipywidgets>=7.0.0",
         "matplotlib",
-        "numpy",
+        "numpy>=1.17",
         "pandas",
         "scikit-learn",
         "scipy",
         "boltzmannclean",
-        'funcsigs;python_version<"3.0"',
     ],
+    extras_require={"parquet": ["pyarrow"]},
 )
@@ -0,0 +1,53 @@
+import numpy as np
+import pandas as pd
+
+from dataclean.cache import PrefixCache, dataframe_nbytes, freeze
+
+
+def test_freeze_compares_by_value():
+    value = {"b": [1, np.arange(3)], "a": (2.0, {"c": None})}
+    same = {"a": (2.0, {"c": None}), "b": [1, np.arange(3)]}
+
+    assert hash(freeze(value)) == hash(freeze(same))
+    assert freeze(value) == freeze(same)
+    assert freeze({"b": [1, np.arange(4)]}) != freeze({"b": [1, np.arange(3)]})
+
+
+def test_prefix_cache_evicts_least_recently_used():
+    cache = PrefixCache(max_bytes=10)
+    cache.put("a", 1, 4)
+    cache.put("b", 2, 4)
+    assert cache.get("a") == 1
+
+    cache.put("c", 3, 4)
+
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3
+    assert cache.stats()["nbytes"] == 8
+
+
+def test_prefix_cache_skips_values_over_budget():
+    cache = PrefixCache(max_bytes=10)
+    cache.put("a", 1, 4)
+    cache.put("a", 2, 11)
+
+    assert len(cache) == 0
+    assert cache.nbytes == 0
+
+
+def test_dataframe_nbytes_counts_objects():
+    n_rows = 5000
+    dataframe = pd.DataFrame(
+        {
+            "text": pd.Series(
+                ["value {0}".format(i) for i in range(n_rows)], dtype=object
+            ),
+            "number": np.arange(n_rows, dtype=float),
+        }
+    )
+
+    deep = dataframe.memory_usage(index=True, deep=True).sum()
+
+    assert dataframe_nbytes(dataframe) > dataframe.memory_usage().sum()
+    assert abs(dataframe_nbytes(dataframe) - deep) < 0.01 * deep
@@ -0,0 +1,146 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from dataclean import cleaning
+
+# The cleaning functions as written before the kernels were added, which
+# the kernels must match exactly
+
+
+def _is_numeric(x):
+    return isinstance(x, (int, float))
+
+
+def outlier_removal_mean(dataframe, colname, low_cut, high_cut):
+    col = dataframe[colname]
+    col_numerics = col.loc[
+        col.apply(lambda x: _is_numeric(x) and low_cut <= x <= high_cut)
+    ]
+    dataframe.loc[
+        col.apply(lambda x: _is_numeric(x) and (x < low_cut or x > high_cut)),
+        colname,
+    ] = col_numerics.mean()
+    return dataframe
+
+
+def outlier_removal_nearest_cut(dataframe, colname, low_cut, high_cut):
+    col = dataframe[colname]
+    dataframe.loc[
+        col.apply(lambda x: _is_numeric(x) and x < low_cut), colname
+    ] = low_cut
+    dataframe.loc[
+        col.apply(lambda x: _is_numeric(x) and x > high_cut), colname
+    ] = high_cut
+    return dataframe
+
+
+def outlier_removal_drop(dataframe, colname, low_cut, high_cut):
+    col = dataframe[colname]
+    return dataframe.loc[
+        col.isnull()
+        | col.apply(
+            lambda x: not _is_numeric(x) or (low_cut <= x <= high_cut)
+        ),
+        :,
+    ]
+
+
+def null_removal_median(dataframe, colname):
+    col = dataframe[colname]
+    col_numerics = col.loc[col.apply(_is_numeric)]
+    dataframe[colname] = col.fillna(col_numerics.median())
+    return dataframe
+
+
+def type_convert_median(dataframe, colname, data_type):
+    col = dataframe[colname]
+    col_numerics = col.loc[col.apply(_is_numeric)]
+    dataframe.loc[
+        col.notnull() & col.apply(lambda x: not isinstance(x, data_type)),
+        colname,
+    ] = col_numerics.median()
+    return dataframe
+
+
+def type_convert_mode(dataframe, colname, data_type):
+    col = dataframe[colname]
+    col_this_type = col.loc[col.apply(lambda x: isinstance(x, data_type))]
+    dataframe.loc[
+        col.notnull() & col.apply(lambda x: not isinstance(x, data_type)),
+        colname,
+    ] = col_this_type.mode().get(0, None)
+    return dataframe
+
+
+def type_convert_drop(dataframe, colname, data_type):
+    col = dataframe[colname]
+    return dataframe.loc[
+        col.isnull() | col.apply(lambda x: isinstance(x, data_type)), :
+    ]
+
+
+COLUMNS = {
+    "float": pd.Series([1.0, np.nan, 5.0, -3.0, 10.0, 2.5]),
+    "int": pd.Series([1, 7, 5, -3, 10, 2]),
+    "bool": pd.Series([True, False, True, True, False, True]),
+    "mixed": pd.Series([1, "a", None, 7.5, -2, np.nan], dtype=object),
+    "nullable int": pd.Series([1, None, 5, -3, 10, 2], dtype="Int64"),
+    "nullable float": pd.Series([1.5, None, 5, -3, 10, 2], dtype="Float64"),
+}
+
+CASES = [
+    (outlier_removal_mean, cleaning.outlier_removal_mean, (0, 6)),
+    (
+        outlier_removal_nearest_cut,
+        cleaning.outlier_removal_nearest_cut,
+        (0, 6),
+    ),
+    (outlier_removal_drop, cleaning.outlier_removal_drop, (0, 6)),
+    (null_removal_median, cleaning.null_removal_median, ()),
+    (type_convert_median, cleaning.type_convert_median, (int,)),
+    (type_convert_median, cleaning.type_convert_median, (float,)),
+    (type_convert_mode, cleaning.type_convert_mode, (int,)),
+    (type_convert_mode, cleaning.type_convert_mode, (str,)),
+    (type_convert_drop, cleaning.type_convert_drop, (int,)),
+    (type_convert_drop, cleaning.type_convert_drop, (float,)),
+]
+
+
+def _run(function, column, args):
+    dataframe = pd.DataFrame({"c": column.copy(), "other": range(len(column))})
+    try:
+        return function(dataframe, "c", *args)
+    except Exception as error:
+        return type(error)
+
+
+@pytest.mark.parametrize("column_name", sorted(COLUMNS))
+@pytest.mark.parametrize("reference, function, args", CASES)
+def test_matches_apply_implementation(column_name, reference, function, args):
+    expected = _run(reference, COLUMNS[column_name], args)
+    result = _run(function, COLUMNS[column_name], args)
+
+    if isinstance(expected, type):
+        assert result is expected
+    else:
+        pd.testing.assert_frame_equal(result, expected)
+
+
+def test_type_convert_cast_matches_apply():
+    column = pd.Series(["1", 2.5, np.nan, "x", 4, True], dtype=object)
+
+    for data_type in (int, float, str, bool):
+
+        def try_cast(x):
+            try:
+                return data_type(x)
+            except ValueError:
+                return x
+
+        expected = pd.DataFrame({"c": column.apply(try_cast)})
+        result = cleaning.type_convert_cast(
+            pd.DataFrame({"c": column.copy()}), "c", data_type
+        )
+
+        pd.testing.assert_frame_equal(result, expected)
@@ -0,0 +1,71 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from dataclean.kernels import (
+    ABOVE_CUT,
+    BELOW_CUT,
+    IN_RANGE,
+    NON_NUMERIC,
+    cast_values,
+    classify_outliers,
+    instance_mask,
+    kde_sample,
+    spawn_random_states,
+)
+
+COLUMNS = [
+    pd.Series([1.0, np.nan, 5.0]),
+    pd.Series([1, 7, -3]),
+    pd.Series([True, False]),
+    pd.Series([1, "a", None, 7.5, True], dtype=object),
+    pd.Series(["a", None, "b"], dtype="string"),
+    pd.Series([1, None, 3], dtype="Int64"),
+    pd.Series(["a", "b", "a"], dtype="category"),
+]
+
+
+@pytest.mark.parametrize(
+    "column", COLUMNS, ids=lambda column: str(column.dtype)
+)
+@pytest.mark.parametrize("types", [int, float, (int, float), str, bool])
+def test_instance_mask_matches_apply(column, types):
+    expected = column.apply(lambda x: isinstance(x, types)).values
+
+    np.testing.assert_array_equal(instance_mask(column, types), expected)
+
+
+def test_classify_outliers():
+    column = pd.Series([-5, 0, 5, 10, "a", None, np.nan], dtype=object)
+
+    np.testing.assert_array_equal(
+        classify_outliers(column, 0, 5),
+        [BELOW_CUT, IN_RANGE, IN_RANGE, ABOVE_CUT]
+        + [NON_NUMERIC, NON_NUMERIC, NON_NUMERIC],
+    )
+
+
+def test_cast_values_keeps_uncastable_values():
+    column = pd.Series(["1", "x", 2.5, np.nan], dtype=object)
+
+    assert cast_values(column, int).tolist()[:3] == [1, "x", 2]
+    assert cast_values(column, float).tolist()[:3] == [1.0, "x", 2.5]
+
+
+def test_kde_sample_is_reproducible():
+    data = [1.0, 2.0, 3.0]
+
+    first = kde_sample(data, 10, random_state=0)
+
+    np.testing.assert_array_equal(first, kde_sample(data, 10, random_state=0))
+    assert not np.array_equal(first, kde_sample(data, 10, random_state=1))
+
+
+def test_spawned_random_states_are_independent_and_reproducible():
+    first, second = spawn_random_states(0, 2)
+    again, _ = spawn_random_states(0, 2)
+
+    samples = kde_sample([0.0], 5, first)
+
+    np.testing.assert_array_equal(samples, kde_sample([0.0], 5, again))
+    assert not np.array_equal(samples, kde_sample([0.0], 5, second))
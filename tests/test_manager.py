@@ -0,0 +1,182 @@
+import gc
+import sys
+import types
+import weakref
+
+import numpy as np
+import pandas as pd
+
+from dataclean.cleaning import NullRemovalMethod
+from dataclean.manager import DataCleaner, DataframeManager
+from dataclean.pipeline import NullRemovalStep
+
+
+class ColumnController(object):
+    """Records the data loaded into a column widget"""
+
+    def __init__(self):
+        self.loads = 0
+        self.step_being_modified = None
+
+    def load_data(self, column, dataframe, step=None):
+        self.loads += 1
+        self.column = column
+        self.step_being_modified = step
+
+    def render_widget(self):
+        pass
+
+    def nbytes(self):
+        return 0
+
+
+class DataFrameController(object):
+    """Records whether the RBM controls were refreshed"""
+
+    def __init__(self):
+        self.refresh_rbm = []
+
+    def render_widget(self, dataframe, step=None, refresh_rbm=True, **kwargs):
+        self.refresh_rbm.append(refresh_rbm)
+
+
+def make_manager():
+    dataframe = pd.DataFrame(
+        {
+            "a": [1.0, np.nan, 3.0],
+            "b": [np.nan, 2.0, 3.0],
+            "c": [1.0, 2.0, np.nan],
+        }
+    )
+    manager = DataframeManager(dataframe, "dataframe")
+    manager._dataframe_widget_controller = DataFrameController()
+
+    controllers = {}
+    for col_id, column in manager.column_by_id.items():
+        controllers[column.name] = ColumnController()
+        manager.column_widget_controller_by_id[col_id] = controllers[
+            column.name
+        ]
+
+    return dataframe, manager, controllers
+
+
+def null_step(colname, method):
+    return NullRemovalStep(colname=colname, replacement_method=method)
+
+
+def test_refresh_loads_only_changed_columns():
+    dataframe, manager, controllers = make_manager()
+
+    manager._new_step(null_step("a", NullRemovalMethod.MEAN))
+
+    assert manager.last_refresh == {"refreshed": ["a"], "skipped": ["b", "c"]}
+    assert controllers["a"].column.tolist() == [1.0, 2.0, 3.0]
+    assert controllers["b"].loads == 0
+
+    # dropping rows may change every column
+    manager._new_step(null_step("b", NullRemovalMethod.DROP))
+
+    assert sorted(manager.last_refresh["refreshed"]) == ["a", "b", "c"]
+    assert controllers["c"].column.index.tolist() == [1, 2]
+
+    manager._refresh_colwidgets()
+
+    assert manager.last_refresh["refreshed"] == []
+
+
+def test_refresh_updates_unchanged_columns_for_the_active_step():
+    dataframe, manager, controllers = make_manager()
+    step = null_step("a", NullRemovalMethod.MEAN)
+    manager._new_step(step)
+    loads = controllers["b"].loads
+
+    manager._refresh_colwidgets(step=step)
+
+    assert controllers["b"].loads == loads
+    assert controllers["b"].step_being_modified is step
+    assert manager._dataframe_widget_controller.refresh_rbm[-1]
+
+
+def test_refresh_skips_rbm_controls_when_columns_keep_their_types():
+    dataframe, manager, controllers = make_manager()
+
+    manager._new_step(null_step("a", NullRemovalMethod.MEAN))
+    manager._new_step(null_step("c", NullRemovalMethod.MEDIAN))
+
+    assert manager._dataframe_widget_controller.refresh_rbm[-1] is False
+
+
+def test_export_writes_values_fitted_by_execute():
+    dataframe, manager, controllers = make_manager()
+    step = null_step("a", NullRemovalMethod.MEAN)
+    manager._new_step(step)
+    executed, exported = [], []
+    manager.execute_callback.register_callback(
+        lambda new_dataframe, name: executed.append(new_dataframe)
+    )
+    manager.export_callback.register_callback(exported.append)
+
+    manager._execute_pipeline()
+    manager._export_pipeline()
+
+    assert executed[0]["a"].tolist() == [1.0, 2.0, 3.0]
+    assert ".fillna(2.0)" in exported[-1]
+    assert not step.is_fitted
+
+    # the fitted values are not exported once the steps change
+    manager._new_step(null_step("b", NullRemovalMethod.MEAN))
+    manager._export_pipeline()
+
+    assert ".fillna(2.0)" not in exported[-1]
+
+
+def test_refresh_releases_managers_of_deleted_dataframes(monkeypatch):
+    namespace = types.ModuleType("__main__")
+    monkeypatch.setitem(sys.modules, "__main__", namespace)
+    namespace.first = pd.DataFrame({"x": [1.0, np.nan]})
+    namespace.second = pd.DataFrame({"y": [np.nan, 2.0]})
+
+    cleaner = DataCleaner()
+    manager = cleaner.manager_for_id(id(namespace.first))
+    cleaner.refresh()
+
+    assert cleaner.manager_for_id(id(namespace.first)) is manager
+
+    # renaming a DataFrame keeps its manager
+    renamed = cleaner.manager_for_id(id(namespace.second))
+    namespace.third = namespace.second
+    del namespace.second
+    cleaner.refresh()
+
+    assert cleaner.manager_for_id(id(namespace.third)) is renamed
+    assert renamed.name == "third"
+
+    first = weakref.ref(namespace.first)
+    del namespace.first
+    cleaner.refresh()
+    gc.collect()
+
+    assert first() is None
+    assert manager.full_dataframe is None
+    assert len(manager.dataframe.columns) == 0
+    assert list(cleaner.dataframe_managers) == [id(namespace.third)]
+
+
+def test_refresh_keeps_names_of_dataframes_bound_twice(monkeypatch):
+    namespace = types.ModuleType("__main__")
+    monkeypatch.setitem(sys.modules, "__main__", namespace)
+    namespace.first = pd.DataFrame({"x": [1.0, np.nan]})
+
+    cleaner = DataCleaner()
+    manager = cleaner.manager_for_id(id(namespace.first))
+    namespace.alias = namespace.first
+    namespace.second = pd.DataFrame({"y": [np.nan, 2.0]})
+    cleaner.refresh()
+    cleaner.refresh()
+
+    assert cleaner.manager_for_id(id(namespace.first)) is manager
+    assert manager.name == "first"
+    assert sorted(
+        manager.name for manager in cleaner.dataframe_managers.values()
+    ) == ["first", "second"]
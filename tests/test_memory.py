@@ -0,0 +1,49 @@
+import numpy as np
+import pandas as pd
+
+from dataclean.cleaning import NullRemovalMethod
+from dataclean.manager import DataframeManager
+from dataclean.memory import MemoryAccountant
+from dataclean.pipeline import NullRemovalStep
+
+
+def test_accountant_evicts_least_recently_used_evictable_entries():
+    evicted = []
+    memory = MemoryAccountant(max_bytes=10)
+
+    memory.track("pinned", 6, group="a")
+    memory.track("old", 3, lambda: evicted.append("old"), group="a")
+    memory.track("new", 3, lambda: evicted.append("new"), group="b")
+
+    assert evicted == ["old"]
+    assert memory.nbytes == 9
+    assert memory.group_nbytes("a") == 6
+    assert "old" not in memory
+
+    memory.forget_group("a")
+
+    assert memory.nbytes == 3
+    assert memory.stats()["evictions"] == 1
+
+
+def test_manager_accounts_for_pipeline_cache():
+    dataframe = pd.DataFrame({"x": np.r_[np.arange(500.0), [np.nan] * 500]})
+    memory = MemoryAccountant()
+    manager = DataframeManager(dataframe, "dataframe", memory=memory)
+    sample_nbytes = memory.nbytes
+
+    manager.pipeline.append(
+        NullRemovalStep(colname="x", replacement_method=NullRemovalMethod.MEAN)
+    )
+    manager.pipeline.execute(manager.dataframe)
+    manager._track_pipeline_cache()
+
+    assert manager.pipeline.cache.nbytes > 0
+    assert memory.nbytes == sample_nbytes + manager.pipeline.cache.nbytes
+
+    # the cached previews are freed once over budget
+    memory.max_bytes = sample_nbytes
+    memory.track("other", 0, group="other")
+
+    assert len(manager.pipeline.cache) == 0
+    assert memory.nbytes == sample_nbytes
@@ -0,0 +1,163 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from dataclean.cleaning import (
+    NullRemovalMethod,
+    OutlierRemovalMethod,
+    TypeConvertMethod,
+)
+from dataclean.optimizer import plan
+from dataclean.pipeline import (
+    NullRemovalStep,
+    OutlierRemovalStep,
+    Pipeline,
+    TypeConversionStep,
+)
+
+
+def make_dataframe():
+    rng = np.random.default_rng(0)
+    x = rng.normal(size=200)
+    x[rng.random(200) < 0.2] = np.nan
+    y = rng.normal(size=200)
+    y[:5] = 100.0
+    z = pd.Series(rng.normal(size=200), dtype=object)
+    z[::7] = "a"
+    # only rows with a null x have outliers
+    n = np.where(np.isnan(x), 100, rng.integers(-3, 4, size=200))
+
+    return pd.DataFrame({"x": x, "y": y, "z": z, "n": n})
+
+
+def null_step(method, colname="x"):
+    return NullRemovalStep(colname=colname, replacement_method=method)
+
+
+def outlier_step(method, colname="y"):
+    return OutlierRemovalStep(
+        colname=colname, low_cut=-3, high_cut=3, replacement_method=method
+    )
+
+
+def type_step(method, colname="z"):
+    return TypeConversionStep(
+        colname=colname, data_type=float, replacement_method=method
+    )
+
+
+def test_plan_removes_no_ops_and_repeats():
+    steps = [
+        null_step(NullRemovalMethod.NONE),
+        null_step(NullRemovalMethod.DROP),
+        null_step(NullRemovalMethod.DROP),
+    ]
+
+    planned = plan(steps)
+
+    assert planned.steps == [steps[1]]
+    assert len(planned.notes) == 2
+
+
+def test_plan_hoists_row_drops_past_independent_steps():
+    steps = [
+        null_step(NullRemovalMethod.MEAN),
+        outlier_step(OutlierRemovalMethod.DROP),
+    ]
+    dataframe = make_dataframe()
+    steps[0].fit(dataframe)
+
+    planned = plan(steps, dataframe.dtypes)
+
+    assert planned.steps == steps[::-1]
+    assert "Moved row dropping step" in planned.explain()
+    assert plan(steps).steps == steps
+
+
+def test_plan_keeps_row_drops_after_steps_upcasting_columns():
+    steps = [
+        outlier_step(OutlierRemovalMethod.MEAN, "n"),
+        null_step(NullRemovalMethod.DROP),
+    ]
+    dataframe = make_dataframe()
+    steps[0].fit(dataframe)
+
+    assert plan(steps, dataframe.dtypes).steps == steps
+
+
+def test_plan_keeps_row_drops_after_steps_they_read():
+    steps = [
+        null_step(NullRemovalMethod.MEAN, "y"),
+        outlier_step(OutlierRemovalMethod.DROP, "y"),
+    ]
+
+    assert plan(steps).steps == steps
+
+
+def test_plan_keeps_consecutive_steps_on_one_column():
+    steps = [
+        type_step(TypeConvertMethod.MEDIAN),
+        null_step(NullRemovalMethod.MODE, "z"),
+    ]
+
+    assert plan(steps).steps == steps
+
+
+def test_explain_lists_each_step():
+    steps = [
+        null_step(NullRemovalMethod.DROP),
+        type_step(TypeConvertMethod.CAST),
+    ]
+
+    explained = plan(steps).explain().splitlines()
+
+    assert explained == [
+        "1. " + steps[0].description,
+        "2. " + steps[1].description,
+    ]
+    assert plan([]).explain() == "No steps to execute."
+
+
+PIPELINES = [
+    [
+        null_step(NullRemovalMethod.NONE),
+        null_step(NullRemovalMethod.MEAN),
+        null_step(NullRemovalMethod.MEAN),
+        outlier_step(OutlierRemovalMethod.DROP),
+    ],
+    [
+        type_step(TypeConvertMethod.CAST),
+        type_step(TypeConvertMethod.MEDIAN),
+        null_step(NullRemovalMethod.MODE, "z"),
+        outlier_step(OutlierRemovalMethod.NEAREST_CUT),
+        null_step(NullRemovalMethod.DROP),
+    ],
+    [
+        outlier_step(OutlierRemovalMethod.MEDIAN),
+        type_step(TypeConvertMethod.DROP),
+        null_step(NullRemovalMethod.MEDIAN),
+        outlier_step(OutlierRemovalMethod.NULL, "x"),
+        null_step(NullRemovalMethod.DROP, "z"),
+    ],
+    [
+        outlier_step(OutlierRemovalMethod.MEAN, "n"),
+        outlier_step(OutlierRemovalMethod.NEAREST_CUT, "y"),
+        type_step(TypeConvertMethod.CAST),
+        null_step(NullRemovalMethod.DROP),
+    ],
+]
+
+
+@pytest.mark.parametrize("steps", PIPELINES)
+def test_planned_execution_matches_unoptimised(steps):
+    dataframe = make_dataframe()
+    pipeline = Pipeline()
+    for step in steps:
+        pipeline.append(step)
+    pipeline.fit(dataframe)
+
+    expected = dataframe
+    for step in pipeline.steps:
+        expected = step.execute(expected, preview=True)
+
+    pd.testing.assert_frame_equal(pipeline.transform(dataframe), expected)
@@ -0,0 +1,115 @@
+import numpy as np
+import pandas as pd
+
+import dataclean.pipeline
+from dataclean.cleaning import NullRemovalMethod
+from dataclean.pipeline import (
+    SHARES_UNWRITTEN_COLUMNS,
+    NullRemovalStep,
+    Pipeline,
+    RbmStep,
+)
+
+
+def test_preview_copies_only_written_columns():
+    dataframe = pd.DataFrame({"x": [1.0, np.nan, 3.0], "y": [4.0, 5.0, 6.0]})
+    original = dataframe.copy()
+    step = NullRemovalStep(
+        colname="x", replacement_method=NullRemovalMethod.MEAN
+    )
+
+    cleaned = step.execute(dataframe, preview=True)
+
+    assert cleaned["x"].tolist() == [1.0, 2.0, 3.0]
+    pd.testing.assert_frame_equal(dataframe, original)
+    if SHARES_UNWRITTEN_COLUMNS:
+        assert np.shares_memory(cleaned["y"].values, dataframe["y"].values)
+
+
+def test_copy_fits_without_changing_pipeline():
+    dataframe = pd.DataFrame({"x": [1.0, np.nan, 3.0]})
+    pipeline = Pipeline()
+    pipeline.append(
+        NullRemovalStep(colname="x", replacement_method=NullRemovalMethod.MEAN)
+    )
+    preview = pipeline.execute(dataframe)
+
+    fitted = pipeline.copy().fit(dataframe)
+
+    assert fitted.is_fitted
+    assert not pipeline.is_fitted
+    assert pipeline.cache.stats()["entries"] == 1
+    assert fitted.cache.stats()["entries"] == 0
+    pd.testing.assert_frame_equal(fitted.transform(dataframe), preview)
+
+
+class FillingRbm(object):
+    """Stands in for a trained RBM, filling missing values with 0.5"""
+
+    def transform(self, array):
+        return np.where(np.isnan(array), 0.5, array)
+
+
+def test_rbm_step_uses_numerical_columns_as_clean_does(monkeypatch):
+    monkeypatch.setattr(
+        dataclean.pipeline.boltzmannclean,
+        "train_rbm",
+        lambda array, tune_hyperparameters: FillingRbm(),
+        raising=False,
+    )
+    dataframe = pd.DataFrame(
+        {
+            "number": [1.0, np.nan, 3.0, 5.0],
+            "text": pd.Series(["a", "b", None, "c"], dtype=object),
+            "flag": [True, False, True, False],
+            "empty": [np.nan] * 4,
+            "nullable": pd.array([1, None, 3, 4], dtype="Int64"),
+            "category": ["p", None, "q", "p"],
+        }
+    )
+
+    step = RbmStep(
+        numerical_columns=["number", "text", "flag", "empty", "nullable"],
+        categorical_columns=["category"],
+    ).fit(dataframe)
+    cleaned = step.execute(dataframe)
+
+    assert step.fitted_params["numerical_columns"] == ["number", "nullable"]
+    assert cleaned["number"].tolist() == [1.0, 3.0, 3.0, 5.0]
+    assert cleaned["nullable"].tolist() == [1, 2, 3, 4]
+    assert cleaned["category"].tolist() == ["p", "p", "q", "p"]
+    pd.testing.assert_frame_equal(
+        cleaned[["text", "flag", "empty"]],
+        dataframe[["text", "flag", "empty"]],
+    )
+
+
+def test_cached_previews_match_uncached():
+    dataframe = pd.DataFrame(
+        {"x": [1.0, np.nan, 3.0, 100.0], "y": [np.nan, 2.0, 2.0, 5.0]}
+    )
+    original = dataframe.copy()
+    pipeline = Pipeline()
+    for colname in "xy":
+        pipeline.append(
+            NullRemovalStep(
+                colname=colname, replacement_method=NullRemovalMethod.MEAN
+            )
+        )
+    pipeline.execute(dataframe)
+
+    pipeline.replace(
+        pipeline.steps[1],
+        NullRemovalStep(
+            colname="y", replacement_method=NullRemovalMethod.DROP
+        ),
+    )
+    misses = pipeline.cache.misses
+    preview = pipeline.execute(dataframe)
+
+    uncached = Pipeline(cache_max_bytes=0)
+    uncached.steps = pipeline.steps
+    pd.testing.assert_frame_equal(preview, uncached.execute(dataframe))
+    pd.testing.assert_frame_equal(dataframe, original)
+    # the preview after the unchanged first step is reused
+    assert pipeline.cache.misses == misses + 1
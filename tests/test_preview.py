@@ -0,0 +1,66 @@
+import numpy as np
+import pandas as pd
+
+from dataclean.preview import ColumnPreview, DataFramePreview, page_count
+
+
+def test_page_count():
+    assert page_count(0, 8) == 1
+    assert page_count(8, 8) == 1
+    assert page_count(9, 8) == 2
+
+
+def test_column_preview_marks_changed_and_dropped_rows():
+    column = pd.Series([1.0, np.nan, 3.0, np.nan], index=list("abcd"))
+    col_modified = pd.Series([1.0, 2.0, 3.0], index=list("abc"))
+
+    preview = ColumnPreview(column, col_modified)
+
+    assert list(preview.changed) == [False, True, False, True]
+    assert list(preview.rows()) == [1, 3]
+    assert list(preview.rows(changed_only=False)) == [0, 1, 2, 3]
+    assert list(preview.after) == ["1.0", "2.0", "3.0", ""]
+    assert preview.nbytes > 0
+
+
+def test_column_preview_escapes_html():
+    preview = ColumnPreview(pd.Series(["<b>"]))
+
+    assert "&lt;b&gt;" in preview.page_html(preview.rows(False))
+    assert "<b>" not in preview.page_html(preview.rows(False))
+
+
+def test_dataframe_preview_moves_within_bounds():
+    dataframe = pd.DataFrame(np.zeros((45, 10)))
+    preview = DataFramePreview(block_rows=20, block_columns=8)
+    preview.load(dataframe)
+
+    preview.move(rows=5, columns=5)
+
+    assert preview.bounds() == ((40, 45, 45), (8, 10, 10))
+
+    preview.move(rows=-10, columns=-10)
+
+    assert preview.bounds() == ((0, 20, 45), (0, 8, 10))
+    assert preview.block_html().count("<tr>") == 21
+
+
+def test_dataframe_preview_caches_blocks_by_version():
+    dataframe = pd.DataFrame({"x": [1, 2]})
+    preview = DataFramePreview(cache_size=1)
+
+    preview.load(dataframe, version=1)
+    html = preview.block_html()
+    preview.load(pd.DataFrame({"x": [3, 4]}), version=1)
+
+    assert preview.block_html() is html
+
+    preview.load(pd.DataFrame({"x": [3, 4]}), version=2)
+
+    assert "3" in preview.block_html()
+    assert len(preview._blocks) == 1
+
+    preview.load(pd.DataFrame({"x": [5, 6]}))
+
+    assert "5" in preview.block_html()
+    assert len(preview._blocks) == 1
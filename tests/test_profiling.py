@@ -0,0 +1,177 @@
+import numpy as np
+import pandas as pd
+
+import dataclean.profiling
+from dataclean.manager import DataframeManager
+from dataclean.profiling import (
+    ColumnProfile,
+    HyperLogLog,
+    approximate_distinct,
+    column_fingerprint,
+    describe_columns,
+    sample_null_fraction,
+)
+from dataclean.widget import CategoricalTypes, is_categorical
+
+
+def test_fingerprint_changes_with_replaced_or_resized_column():
+    column = pd.Series(np.arange(1000, dtype=float))
+
+    assert column_fingerprint(column) == column_fingerprint(column)
+    assert column_fingerprint(column) != column_fingerprint(column.copy())
+    assert column_fingerprint(column) != column_fingerprint(column[:-1])
+    assert column_fingerprint(column) != column_fingerprint(column.astype(int))
+
+
+def test_fingerprint_misses_unsampled_in_place_edit():
+    values = np.arange(10000, dtype=float)
+    column = pd.Series(values, copy=False)
+    before = column_fingerprint(column)
+
+    values[1] = np.nan
+
+    assert column_fingerprint(column) == before
+
+
+def test_describe_columns():
+    dataframe = pd.DataFrame(
+        {"a": [1.0, np.nan, 1.0, 2.0], "b": ["x", "y", None, None]}
+    )
+
+    described = describe_columns(dataframe)
+
+    assert [d["null_percentage"] for d in described] == ["25%", "50%"]
+    assert [d["distinct"] for d in described] == [2, 2]
+
+
+def test_approximate_description_bounds_exact_values():
+    rng = np.random.default_rng(0)
+    column = pd.Series(rng.integers(0, 5000, 100000).astype(float))
+    column[rng.random(len(column)) < 0.1] = np.nan
+
+    distinct, distinct_error = approximate_distinct(column)
+    null_fraction, null_error = sample_null_fraction(column)
+
+    exact_distinct = column.nunique()
+    assert abs(distinct - exact_distinct) <= 3 * distinct_error * (
+        exact_distinct
+    )
+    assert abs(null_fraction - column.isnull().mean()) <= 3 * null_error
+
+
+def test_hyperloglog_merge_matches_single_sketch():
+    values = pd.Series(np.arange(20000))
+    whole = HyperLogLog()
+    whole.update(values)
+    first, second = HyperLogLog(), HyperLogLog()
+    first.update(values[:10000])
+    second.update(values[10000:])
+
+    first.merge(second)
+
+    np.testing.assert_array_equal(first.registers, whole.registers)
+
+
+def test_column_profile_counts_types():
+    profile = ColumnProfile(pd.Series([1, 2.5, "a", None], dtype=object))
+
+    assert profile.type_counts == {int: 1, float: 1, str: 1}
+    assert list(profile.numeric) == [1, 2.5]
+
+
+def test_cleared_caches_describe_in_place_edits():
+    dataframe = pd.DataFrame(
+        {
+            "a": np.arange(10000, dtype=float),
+            "b": pd.Series(["x"] * 10000, dtype=object),
+        }
+    )
+    manager = DataframeManager(dataframe, "dataframe")
+
+    description = manager.metadata()["dfCols"][0]["description"]
+    assert description["distinct"] == 10000
+    assert is_categorical(dataframe["b"]) == CategoricalTypes.CATEGORICAL
+
+    dataframe.loc[1:10, "a"] = 0.0
+    dataframe.loc[1:10000, "b"] = 1.0
+
+    manager.clear_metadata_cache()
+
+    description = manager.metadata()["dfCols"][0]["description"]
+    assert description["distinct"] == 9990
+    assert is_categorical(dataframe["b"]) == CategoricalTypes.CONTINUOUS
+
+
+def test_listing_describes_in_place_edits():
+    dataframe = pd.DataFrame({"a": np.arange(10000, dtype=float)})
+    manager = DataframeManager(dataframe, "dataframe")
+
+    description = manager.metadata()["dfCols"][0]["description"]
+    assert description["null_percentage"] == "0%"
+
+    dataframe.loc[1:5000, "a"] = np.nan
+
+    description = manager.metadata()["dfCols"][0]["description"]
+    assert description["null_percentage"] == "50%"
+    assert description["distinct"] == 5000
+
+
+def test_listing_reuses_distinct_counts_of_unchanged_columns():
+    dataframe = pd.DataFrame({"a": np.arange(10000, dtype=float)})
+    manager = DataframeManager(dataframe, "dataframe")
+    manager.metadata()
+
+    # the edit misses the sampled positions of the fingerprint
+    dataframe.loc[1:100, "a"] = np.nan
+    description = manager.metadata()["dfCols"][0]["description"]
+
+    assert description["null_percentage"] == "1%"
+    assert description["distinct"] == 10000
+
+    manager.clear_metadata_cache()
+    description = manager.metadata()["dfCols"][0]["description"]
+
+    assert description["distinct"] == 9900
+
+
+def test_approximate_listing_reuses_distinct_counts(monkeypatch):
+    monkeypatch.setattr(DataframeManager, "APPROXIMATE_METADATA_ROWS", 100)
+    dataframe = pd.DataFrame({"a": np.arange(10000, dtype=float)})
+    manager = DataframeManager(dataframe, "dataframe")
+    sketched = []
+
+    def counted(column, *args, **kwargs):
+        sketched.append(column.name)
+        return approximate_distinct(column, *args, **kwargs)
+
+    monkeypatch.setattr(dataclean.profiling, "approximate_distinct", counted)
+
+    manager.metadata()
+    dataframe.loc[1:100, "a"] = np.nan
+    description = manager.metadata()["dfCols"][0]["description"]
+
+    assert sketched == ["a"]
+    assert description["null_percentage"].startswith("1%")
+
+    # the fingerprint samples values changed by a larger edit
+    dataframe.loc[1:5000, "a"] = np.nan
+    description = manager.metadata()["dfCols"][0]["description"]
+
+    assert sketched == ["a", "a"]
+    assert description["null_percentage"].startswith("50%")
+
+
+def test_column_profile_counts_values_outside_cuts():
+    rng = np.random.default_rng(0)
+    values = np.round(rng.normal(size=1000), 1)
+    profile = ColumnProfile(pd.Series(values))
+    outside = (values < -1) | (values > 0.5)
+
+    np.testing.assert_array_equal(
+        profile.histogram, np.histogram(values, profile.bins)[0]
+    )
+    assert profile.count_outside(-1, 0.5) == np.count_nonzero(outside)
+    np.testing.assert_array_equal(
+        profile.histogram_outside(-1, 0.5),
+        np.histogram(values[outside], profile.bins)[0],
+    )
@@ -0,0 +1,58 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from dataclean.sampling import (
+    TailPreservingSampler,
+    UniformSampler,
+    reservoir_positions,
+)
+
+
+@pytest.mark.parametrize("n_rows, size", [(10, 20), (10, 0), (1000, 10)])
+def test_reservoir_positions_are_sorted_and_distinct(n_rows, size):
+    positions = reservoir_positions(n_rows, size, random_state=0)
+
+    assert len(positions) == min(n_rows, size)
+    assert len(np.unique(positions)) == len(positions)
+    assert np.all(np.diff(positions) > 0)
+    assert positions.min(initial=0) >= 0
+    assert positions.max(initial=0) < n_rows
+
+
+def test_reservoir_positions_are_uniform():
+    counts = np.zeros(20)
+    for seed in range(2000):
+        counts[reservoir_positions(20, 5, random_state=seed)] += 1
+
+    expected = 2000 * 5 / 20
+    assert np.all(np.abs(counts - expected) < 5 * np.sqrt(expected))
+
+
+def test_uniform_sampler_keeps_row_order():
+    dataframe = pd.DataFrame({"x": np.arange(1000)})
+
+    sample = UniformSampler(random_state=0).sample(dataframe, 100)
+
+    assert len(sample) == 100
+    assert sample.index.is_monotonic_increasing
+    assert UniformSampler().sample(dataframe, 1000) is dataframe
+
+
+def test_tail_preserving_sampler_keeps_dirty_values():
+    rng = np.random.default_rng(0)
+    values = pd.Series(rng.normal(size=100000), dtype=object)
+    values[[10, 20000]] = np.nan
+    values[[30, 40000]] = "mistyped"
+    values[50000] = 1000.0
+    values[60000] = -1000.0
+    dataframe = pd.DataFrame({"x": values, "y": np.arange(100000)})
+
+    sample = TailPreservingSampler(random_state=0).sample(dataframe, 1000)
+
+    assert len(sample) == 1000
+    assert sample.index.is_unique
+    assert sample.index.is_monotonic_increasing
+    assert sample["x"].isnull().sum() == 2
+    assert (sample["x"] == "mistyped").sum() == 2
+    assert {50000, 60000, 0, 99999} <= set(sample.index)
@@ -0,0 +1,219 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from dataclean.cleaning import (
+    NullRemovalMethod,
+    OutlierRemovalMethod,
+    TypeConvertMethod,
+)
+from dataclean.pipeline import (
+    NullRemovalStep,
+    OutlierRemovalStep,
+    Pipeline,
+    TypeConversionStep,
+)
+from dataclean.scheduler import ProcessPoolStepExecutor, ThreadPoolStepExecutor
+
+
+def _numeric_columns():
+    rng = np.random.default_rng(0)
+    dataframe = pd.DataFrame(
+        {"x": rng.normal(size=1000), "y": rng.normal(size=1000)}
+    )
+    dataframe.loc[::5, "x"] = np.nan
+
+    steps = [
+        NullRemovalStep(
+            colname="x", replacement_method=NullRemovalMethod.MEAN
+        ),
+        OutlierRemovalStep(
+            colname="y",
+            low_cut=-1,
+            high_cut=1,
+            replacement_method=OutlierRemovalMethod.NEAREST_CUT,
+        ),
+    ]
+
+    return dataframe, steps
+
+
+def _object_column_of_mostly_numbers():
+    # fillna infers float64 for partitions without strings in them, which
+    # would then have their ints replaced too
+    values = [40, 40, 2.5, np.nan, "7", 2.5, 1, "x", 1, np.nan]
+    dataframe = pd.DataFrame({"b": pd.Series(values, dtype=object)})
+
+    steps = [
+        NullRemovalStep(
+            colname="b", replacement_method=NullRemovalMethod.MODE_NUMERIC
+        ),
+        TypeConversionStep(
+            colname="b",
+            data_type=int,
+            replacement_method=TypeConvertMethod.MEDIAN,
+        ),
+    ]
+
+    return dataframe, steps
+
+
+@pytest.mark.parametrize(
+    "make_case", [_numeric_columns, _object_column_of_mostly_numbers]
+)
+def test_process_pool_matches_serial_execution(make_case):
+    dataframe, steps = make_case()
+
+    pipeline = Pipeline()
+    for step in steps:
+        pipeline.append(step)
+    expected = pipeline.fit_transform(dataframe)
+
+    executor = ProcessPoolStepExecutor(max_workers=2, n_partitions=3)
+
+    pd.testing.assert_frame_equal(
+        pipeline.transform(dataframe, executor=executor), expected
+    )
+    pd.testing.assert_frame_equal(
+        pipeline.fit_transform(dataframe, executor=executor), expected
+    )
+
+
+def test_process_partitions_sample_different_replacements():
+    dataframe = pd.DataFrame({"x": np.r_[np.arange(100.0), [np.nan] * 100]})
+    dataframe = dataframe.iloc[np.r_[0:50, 100:150, 50:100, 150:200]]
+    dataframe.index = range(200)
+
+    step = NullRemovalStep(
+        colname="x",
+        replacement_method=NullRemovalMethod.SAMPLE,
+        random_state=0,
+    ).fit(dataframe)
+
+    executor = ProcessPoolStepExecutor(max_workers=2, n_partitions=2)
+    cleaned = executor.execute([step], dataframe)
+
+    first = cleaned["x"].values[50:100]
+    second = cleaned["x"].values[150:200]
+
+    assert not np.isnan(cleaned["x"].values).any()
+    assert not np.array_equal(first, second)
+    np.testing.assert_array_equal(
+        cleaned["x"].values, executor.execute([step], dataframe)["x"].values
+    )
+
+
+def test_process_pool_runs_planned_steps_on_one_column():
+    rng = np.random.default_rng(0)
+    values = pd.Series(rng.normal(size=1000), dtype=object)
+    values[::5] = np.nan
+    values[::7] = "a"
+    values[:3] = 100.0
+    dataframe = pd.DataFrame({"x": values, "y": np.arange(1000.0)})
+
+    pipeline = Pipeline()
+    pipeline.append(
+        TypeConversionStep(
+            colname="x",
+            data_type=float,
+            replacement_method=TypeConvertMethod.MEDIAN,
+        )
+    )
+    pipeline.append(
+        NullRemovalStep(colname="x", replacement_method=NullRemovalMethod.MEAN)
+    )
+    pipeline.append(
+        OutlierRemovalStep(
+            colname="x",
+            low_cut=-3,
+            high_cut=3,
+            replacement_method=OutlierRemovalMethod.DROP,
+        )
+    )
+    pipeline.fit(dataframe)
+
+    cleaned = pipeline.transform(
+        dataframe,
+        executor=ProcessPoolStepExecutor(max_workers=2, n_partitions=3),
+    )
+
+    pd.testing.assert_frame_equal(cleaned, pipeline.transform(dataframe))
+
+
+def test_process_pool_runs_steps_needing_no_fit():
+    dataframe = pd.DataFrame({"x": [1.0, np.nan, 3.0, 100.0] * 50})
+    step = OutlierRemovalStep(
+        colname="x",
+        low_cut=0,
+        high_cut=10,
+        replacement_method=OutlierRemovalMethod.DROP,
+    )
+
+    executor = ProcessPoolStepExecutor(max_workers=2, n_partitions=2)
+
+    pd.testing.assert_frame_equal(
+        executor.execute([step], dataframe), step.execute(dataframe)
+    )
+
+
+def test_process_pool_fits_steps_before_partitioning():
+    rng = np.random.default_rng(0)
+    dataframe = pd.DataFrame({"x": rng.normal(size=1000)})
+    dataframe.loc[::5, "x"] = np.nan
+
+    pipeline = Pipeline()
+    pipeline.append(
+        NullRemovalStep(colname="x", replacement_method=NullRemovalMethod.MEAN)
+    )
+    expected = pipeline.fit_transform(dataframe)
+    serial_params = [step.fitted_params for step in pipeline.steps]
+
+    cleaned = pipeline.fit_transform(
+        dataframe,
+        executor=ProcessPoolStepExecutor(max_workers=2, n_partitions=3),
+    )
+
+    pd.testing.assert_frame_equal(cleaned, expected)
+    assert [step.fitted_params for step in pipeline.steps] == serial_params
+
+
+def test_thread_pool_matches_serial_execution():
+    rng = np.random.default_rng(0)
+    dataframe = pd.DataFrame(
+        {colname: rng.normal(size=500) for colname in "abcd"}
+    )
+    dataframe[dataframe > 2] = np.nan
+
+    steps = [
+        NullRemovalStep(colname=colname, replacement_method=method)
+        for colname, method in zip(
+            "abcd",
+            [
+                NullRemovalMethod.MEAN,
+                NullRemovalMethod.MEDIAN,
+                NullRemovalMethod.MODE_NUMERIC,
+                NullRemovalMethod.MEAN,
+            ],
+        )
+    ]
+    steps.append(
+        OutlierRemovalStep(
+            colname="a",
+            low_cut=-1,
+            high_cut=1,
+            replacement_method=OutlierRemovalMethod.NEAREST_CUT,
+        )
+    )
+
+    pipeline = Pipeline()
+    for step in steps:
+        pipeline.append(step)
+    expected = pipeline.fit_transform(dataframe)
+    serial_params = [step.fitted_params for step in steps]
+
+    cleaned = pipeline.fit_transform(
+        dataframe, executor=ThreadPoolStepExecutor(max_workers=4)
+    )
+
+    pd.testing.assert_frame_equal(cleaned, expected)
+    assert [step.fitted_params for step in steps] == serial_params
@@ -0,0 +1,296 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import dataclean.streaming
+from dataclean.cleaning import (
+    KDE_MAX_POINTS,
+    NullRemovalMethod,
+    TypeConvertMethod,
+    fit_mode,
+)
+from dataclean.pipeline import NullRemovalStep, Pipeline, TypeConversionStep
+from dataclean.streaming import (
+    KdeAccumulator,
+    ModeAccumulator,
+    QuantileSketch,
+    RowSampleAccumulator,
+    _FileWriter,
+    clean_file,
+    execute_chunks,
+    fit_chunks,
+    read_row_groups,
+)
+
+pa = pytest.importorskip("pyarrow")
+pq = pytest.importorskip("pyarrow.parquet")
+
+
+def make_dataframe(n_rows=200):
+    rng = np.random.default_rng(0)
+    x = rng.normal(size=n_rows)
+    x[rng.random(n_rows) < 0.2] = np.nan
+    name = pd.Series(rng.choice(["a", "b", "c"], n_rows), dtype=object)
+    name[::9] = None
+    notes = pd.Series(["note {0}".format(i) for i in range(n_rows)])
+    notes[: n_rows // 2] = None
+
+    return pd.DataFrame({"x": x, "name": name, "notes": notes})
+
+
+def make_pipeline():
+    pipeline = Pipeline()
+    pipeline.append(
+        NullRemovalStep(colname="x", replacement_method=NullRemovalMethod.MEAN)
+    )
+    pipeline.append(
+        NullRemovalStep(
+            colname="name", replacement_method=NullRemovalMethod.MODE
+        )
+    )
+    return pipeline
+
+
+def write_file(dataframe, path, file_format, rows_per_group=50):
+    table = pa.Table.from_pandas(dataframe, preserve_index=False)
+
+    if file_format == "parquet":
+        pq.write_table(table, path, row_group_size=rows_per_group)
+    else:
+        with pa.ipc.new_file(path, table.schema) as writer:
+            writer.write_table(table, max_chunksize=rows_per_group)
+
+
+def read_file(path):
+    return pd.concat(read_row_groups(path))
+
+
+def as_objects(dataframe):
+    return dataframe.astype(object).where(dataframe.notnull(), None)
+
+
+@pytest.mark.parametrize("file_format", ["parquet", "arrow"])
+def test_clean_file_round_trips_string_columns(tmp_path, file_format):
+    dataframe = make_dataframe()
+    source = str(tmp_path / "source")
+    destination = str(tmp_path / "destination")
+    write_file(dataframe, source, file_format)
+
+    pipeline = make_pipeline()
+    n_rows = clean_file(pipeline, source, destination)
+
+    expected = pipeline.transform(read_file(source))
+    assert n_rows == len(dataframe)
+    pd.testing.assert_frame_equal(
+        as_objects(read_file(destination)), as_objects(expected)
+    )
+
+
+@pytest.mark.parametrize("file_format", ["parquet", "arrow"])
+def test_file_writer_infers_types_of_object_columns(tmp_path, file_format):
+    dataframe = make_dataframe().astype({"notes": object})
+    path = str(tmp_path / "cleaned")
+    schema = pa.Table.from_pandas(dataframe, preserve_index=False).schema
+
+    writer = _FileWriter(path, file_format, False, schema)
+    writer.write(dataframe.iloc[:0])
+    for start in range(0, len(dataframe), 50):
+        writer.write(dataframe.iloc[start : start + 50])
+    writer.close()
+
+    pd.testing.assert_frame_equal(
+        as_objects(read_file(path)), as_objects(dataframe)
+    )
+
+
+def test_file_writer_writes_empty_file(tmp_path):
+    path = str(tmp_path / "cleaned")
+
+    writer = _FileWriter(path, "parquet", False)
+    writer.write(pd.DataFrame({"x": pd.Series([], dtype=float)}))
+    writer.close()
+
+    assert list(pd.read_parquet(path).columns) == ["x"]
+
+
+def test_chunked_execution_matches_whole_dataframe():
+    dataframe = make_dataframe()
+    chunks = [
+        dataframe.iloc[start : start + 50] for start in range(0, 200, 50)
+    ]
+
+    pipeline = fit_chunks(make_pipeline(), chunks)
+    cleaned = pd.concat(execute_chunks(pipeline, chunks))
+
+    expected = make_pipeline().fit_transform(dataframe)
+    pd.testing.assert_frame_equal(cleaned, expected)
+
+
+def test_chunked_mode_breaks_ties_as_whole_dataframe():
+    # the tied modes cannot be sorted, so the first to appear is used
+    values = ["7", 1, 1, np.nan, "7", np.nan]
+    dataframe = pd.DataFrame({"b": pd.Series(values, dtype=object)})
+    chunks = [dataframe.iloc[:3], dataframe.iloc[3:]]
+
+    def make_mode_pipeline():
+        pipeline = Pipeline()
+        pipeline.append(
+            NullRemovalStep(
+                colname="b", replacement_method=NullRemovalMethod.MODE
+            )
+        )
+        pipeline.append(
+            TypeConversionStep(
+                colname="b",
+                data_type=int,
+                replacement_method=TypeConvertMethod.DROP,
+            )
+        )
+        return pipeline
+
+    cleaned = pd.concat(execute_chunks(make_mode_pipeline(), chunks))
+
+    expected = make_mode_pipeline().fit_transform(dataframe)
+    assert cleaned["b"].tolist() == [1, 1]
+    pd.testing.assert_frame_equal(cleaned, expected)
+
+
+def test_chunked_execution_rejects_dtypes_inferred_per_chunk():
+    # fillna downcasts the first chunk to float64, which has no strings
+    values = [40, 40, 2.5, np.nan, "7", 2.5, 1, "x", 1, np.nan]
+    dataframe = pd.DataFrame({"b": pd.Series(values, dtype=object)})
+    chunks = [dataframe.iloc[:4], dataframe.iloc[4:8], dataframe.iloc[8:]]
+
+    pipeline = Pipeline()
+    pipeline.append(
+        NullRemovalStep(
+            colname="b", replacement_method=NullRemovalMethod.MODE_NUMERIC
+        )
+    )
+    pipeline.append(
+        TypeConversionStep(
+            colname="b",
+            data_type=int,
+            replacement_method=TypeConvertMethod.MEDIAN,
+        )
+    )
+
+    with pytest.raises(
+        ValueError, match="'b' is float64 in one chunk but object"
+    ):
+        list(execute_chunks(pipeline, chunks))
+
+
+@pytest.mark.parametrize(
+    "chunks",
+    [[["7", 1, 1], ["7", 40]], [[1, 2.5]], [[True, 2], [1.0, 1, 2]]],
+)
+def test_mode_accumulator_matches_series_mode(chunks):
+    accumulator = ModeAccumulator()
+    for chunk in chunks:
+        accumulator.update(pd.Series(chunk, dtype=object))
+
+    fill_value = accumulator.result()["fill_value"]
+
+    whole = pd.Series(sum(chunks, []), dtype=object)
+    expected = fit_mode(whole)["fill_value"]
+    assert fill_value == expected
+    assert type(fill_value) is type(expected)
+
+
+def write_changing_types(path, later_values):
+    # the first row group has no nulls in n, so it is read as int64, and
+    # only nulls in notes, so its type is unknown until the second
+    table = pa.table(
+        {
+            "n": pa.array([1, 3] * 25 + later_values * 25, type=pa.int64()),
+            "notes": pa.array([None] * 50 + ["note"] * 50, type=pa.string()),
+        }
+    )
+    pq.write_table(table, path, row_group_size=50)
+
+
+def test_clean_file_casts_row_groups_to_the_first_schema(tmp_path):
+    source = str(tmp_path / "source")
+    destination = str(tmp_path / "destination")
+    write_changing_types(source, [None, 2])
+
+    pipeline = Pipeline()
+    pipeline.append(
+        NullRemovalStep(colname="n", replacement_method=NullRemovalMethod.MEAN)
+    )
+    clean_file(pipeline, source, destination)
+
+    cleaned = pq.read_table(destination)
+    assert cleaned.schema.field("n").type == pa.int64()
+    assert cleaned.schema.field("notes").type == pa.string()
+    assert cleaned.column("n").to_pylist() == [1, 3] * 25 + [2] * 50
+    assert cleaned.column("notes").to_pylist() == [None] * 50 + ["note"] * 50
+
+
+def test_clean_file_refuses_to_truncate_later_row_groups(tmp_path):
+    source = str(tmp_path / "source")
+    destination = str(tmp_path / "destination")
+    write_changing_types(source, [None, 3])
+
+    pipeline = Pipeline()
+    pipeline.append(
+        NullRemovalStep(colname="n", replacement_method=NullRemovalMethod.MEAN)
+    )
+
+    with pytest.raises(ValueError, match="n \\(int64 to double\\)"):
+        clean_file(pipeline, source, destination)
+
+
+def test_quantile_sketch_is_exact_until_compacted():
+    sketch = QuantileSketch()
+    sketch.update([3.0, np.nan, 1.0, 2.0])
+
+    assert sketch.result() == {"fill_value": 2.0}
+    assert np.isnan(QuantileSketch().quantile(0.5))
+
+
+def test_merged_quantile_sketches_approximate_median():
+    values = np.random.default_rng(0).normal(size=100000)
+    first = QuantileSketch(capacity=1024, random_state=0)
+    second = QuantileSketch(capacity=1024, random_state=1)
+    for start in range(0, 50000, 10000):
+        first.update(values[start : start + 10000])
+        second.update(values[50000 + start : 60000 + start])
+
+    first.merge(second)
+
+    assert len(first.levels) > 1
+    assert abs(np.mean(values <= first.quantile(0.5)) - 0.5) < 0.01
+
+
+def test_kde_accumulator_merge_samples_in_proportion_to_values_seen():
+    first = KdeAccumulator(random_state=0)
+    first.update(np.zeros(3 * KDE_MAX_POINTS))
+    second = KdeAccumulator(random_state=1)
+    second.update(np.ones(KDE_MAX_POINTS))
+
+    first.merge(second)
+    points = np.array(first.result()["kde_points"])
+
+    assert len(points) == KDE_MAX_POINTS
+    assert first.reservoir.seen == 4 * KDE_MAX_POINTS
+    assert abs(points.mean() - 0.25) < 0.05
+
+
+def test_row_sample_accumulator_keeps_whole_rows(monkeypatch):
+    monkeypatch.setattr(dataclean.streaming, "RBM_SAMPLE_ROWS", 100)
+    dataframe = pd.DataFrame(
+        {"a": np.arange(1000), "b": np.arange(1000) * 2.0, "c": "c"}
+    )
+
+    accumulator = RowSampleAccumulator(["a", "b"], random_state=0)
+    for start in range(0, 1000, 300):
+        accumulator.update(dataframe.iloc[start : start + 300])
+    rows = accumulator.rows
+
+    assert list(rows.columns) == ["a", "b"]
+    assert len(rows) == 100
+    assert rows["a"].is_unique
+    assert (rows["b"] == rows["a"] * 2.0).all()
+    assert rows["a"].max() >= 900
@@ -0,0 +1,254 @@
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+import pytest
+from matplotlib import pyplot
+
+import dataclean.widget
+from dataclean.profiling import ColumnProfile
+from dataclean.widget import (
+    CategoricalTypes,
+    PlotWidgetController,
+    PreviewWorker,
+    is_categorical,
+)
+
+
+def apply_is_categorical(series, categorical_threshold=0.8):
+    """is_categorical as written before the dtype checks and sampling"""
+
+    type_counts = {str: 0, bool: 0}
+    type_counts.update(series.dropna().apply(type).value_counts().to_dict())
+
+    n_values = sum(type_counts.values())
+    fraction = (
+        (type_counts[str] + type_counts[bool]) / n_values if n_values else 0
+    )
+
+    if fraction >= categorical_threshold:
+        return CategoricalTypes.CATEGORICAL
+    return CategoricalTypes.CONTINUOUS
+
+
+def mixed_column(n_values, n_strings):
+    values = np.arange(n_values, dtype=float).astype(object)
+    values[np.random.default_rng(0).permutation(n_values)[:n_strings]] = "a"
+    return pd.Series(values)
+
+
+COLUMNS = {
+    "float": pd.Series([1.0, np.nan, 3.0]),
+    "int": pd.Series([1, 2, 3]),
+    "bool": pd.Series([True, False, True]),
+    "empty": pd.Series([], dtype=object),
+    "nulls": pd.Series([None, np.nan], dtype=object),
+    "strings": pd.Series(["a", None, "b"], dtype=object),
+    "string dtype": pd.Series(["a", None, "b"], dtype="string"),
+    "category": pd.Series(["a", "b", "a"], dtype="category"),
+    "nullable int": pd.Series([1, None, 3], dtype="Int64"),
+    "mixed categorical": mixed_column(100, 90),
+    "mixed continuous": mixed_column(100, 50),
+    "sampled categorical": mixed_column(20000, 19000),
+    "sampled continuous": mixed_column(20000, 2000),
+    "near threshold": mixed_column(20000, 16100),
+}
+
+
+class Key(object):
+    """A weakly referenceable widget key"""
+
+
+def run_now(callback):
+    callback()
+
+
+def test_preview_worker_discards_superseded_requests():
+    worker = PreviewWorker(schedule=run_now)
+    key = Key()
+    started = threading.Event()
+    release = threading.Event()
+    finished = threading.Event()
+    displayed = []
+    polled = []
+
+    def slow(is_stale):
+        started.set()
+        release.wait(5)
+        polled.append(is_stale())
+        return "slow"
+
+    def display(result):
+        displayed.append(result)
+        finished.set()
+
+    worker.submit(key, slow, display)
+    assert started.wait(5)
+
+    # replaces the pending request, and supersedes the one in flight
+    worker.submit(key, lambda is_stale: "pending", display)
+    worker.submit(key, lambda is_stale: "latest", display)
+    release.set()
+
+    assert finished.wait(5)
+    assert displayed == ["latest"]
+    assert polled == [True]
+
+
+def test_preview_worker_cancel_discards_in_flight_request():
+    worker = PreviewWorker(schedule=run_now)
+    key = Key()
+    started = threading.Event()
+    release = threading.Event()
+    done = threading.Event()
+    displayed = []
+
+    def compute(is_stale):
+        started.set()
+        release.wait(5)
+        return "result"
+
+    def check(is_stale):
+        done.set()
+
+    worker.submit(key, compute, displayed.append)
+    assert started.wait(5)
+    worker.cancel(key)
+    worker.submit(Key(), check, lambda result: None)
+    release.set()
+
+    assert done.wait(5)
+    assert displayed == []
+
+
+def test_preview_worker_shows_errors_from_compute_and_display():
+    errors = []
+    done = threading.Event()
+
+    def show_error(error):
+        errors.append(error)
+        if len(errors) == 2:
+            done.set()
+
+    def fail(result):
+        raise KeyError(result)
+
+    worker = PreviewWorker(schedule=run_now)
+    worker.submit(Key(), lambda is_stale: 1 / 0, print, show_error)
+    worker.submit(Key(), lambda is_stale: "result", fail, show_error)
+
+    assert done.wait(5)
+    assert sorted(type(error).__name__ for error in errors) == [
+        "KeyError",
+        "ZeroDivisionError",
+    ]
+
+
+def test_preview_worker_displays_in_caller_without_event_loop():
+    worker = PreviewWorker()
+    threads = []
+
+    def compute(is_stale):
+        threads.append(threading.current_thread())
+        return "result"
+
+    def display(result):
+        threads.append(threading.current_thread())
+
+    worker.submit(Key(), compute, display)
+
+    assert threads == [threading.current_thread()] * 2
+    assert worker._thread is None
+
+
+@pytest.mark.parametrize("column_name", sorted(COLUMNS))
+def test_is_categorical_matches_apply(monkeypatch, column_name):
+    monkeypatch.setattr(dataclean.widget, "_categorical_cache", OrderedDict())
+    column = COLUMNS[column_name]
+
+    assert is_categorical(column) == apply_is_categorical(column)
+
+
+def test_is_categorical_remembers_unchanged_columns(monkeypatch):
+    monkeypatch.setattr(dataclean.widget, "_categorical_cache", OrderedDict())
+    fraction_categorical = dataclean.widget._fraction_categorical
+    calls = []
+
+    def counted(*args):
+        calls.append(args)
+        return fraction_categorical(*args)
+
+    monkeypatch.setattr(dataclean.widget, "_fraction_categorical", counted)
+    column = mixed_column(100, 90)
+
+    is_categorical(column)
+    is_categorical(column)
+    assert len(calls) == 1
+
+    is_categorical(column.copy())
+    assert len(calls) == 2
+
+
+@pytest.fixture
+def plot_controller(monkeypatch):
+    # later matplotlib versions renamed the seaborn style the plots use
+    if "seaborn" not in pyplot.style.library:
+        monkeypatch.setitem(
+            pyplot.style.library,
+            "seaborn",
+            pyplot.style.library["seaborn-v0_8"],
+        )
+    displayed = []
+    monkeypatch.setattr(dataclean.widget, "display", displayed.append)
+
+    controller = PlotWidgetController()
+    yield controller, displayed
+    pyplot.close(controller.fig)
+
+
+def test_plot_updates_bars_in_place_while_bins_are_unchanged(plot_controller):
+    controller, displayed = plot_controller
+    column = pd.Series(np.arange(100.0), name="x")
+    controller.load_data(ColumnProfile(column))
+    controller.reset_plots(CategoricalTypes.CONTINUOUS)
+    main_bars = controller._bars["main"][1]
+
+    modified = column.copy()
+    modified[:10] = 50.0
+    controller.update_plots(col_mod=modified)
+    mod_bars = controller._bars["mod"][1]
+    heights = [bar.get_height() for bar in mod_bars]
+
+    modified[:20] = 50.0
+    controller.update_plots(col_mod=modified)
+
+    assert controller._bars["main"][1] is main_bars
+    assert controller._bars["mod"][1] is mod_bars
+    assert [bar.get_height() for bar in mod_bars] != heights
+
+    # an unchanged figure is not rendered again
+    n_displayed = len(displayed)
+    controller.update_plots(col_mod=modified.copy())
+    assert len(displayed) == n_displayed
+
+
+def test_plot_redraws_bars_when_categories_change(plot_controller):
+    controller, displayed = plot_controller
+    column = pd.Series(["a", "b", "b", None], name="x", dtype=object)
+    controller.load_data(ColumnProfile(column))
+    controller.reset_plots(CategoricalTypes.CATEGORICAL)
+    main_bars = controller._bars["main"][1]
+
+    controller.update_plots(col_mod=column.fillna("c"))
+    labels = [
+        label.get_text() for label in controller.ax_mod.get_xticklabels()
+    ]
+
+    assert controller._bars["main"][1] is main_bars
+    assert labels == ["a", "b", "c"]
+    assert [bar.get_height() for bar in controller._bars["delta"][1]] == [
+        0,
+        0,
+        1,
+    ]